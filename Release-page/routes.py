@@ -1,4 +1,4 @@
-from flask import Blueprint, send_from_directory, send_file, jsonify, request
+from flask import Blueprint, send_from_directory, send_file, jsonify, request, make_response
 import os
 import json
 
@@ -12,11 +12,25 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INDEX_HTML = 'index.html'
 RELEASES_FILE = os.path.join(BASE_DIR, 'releases.json')
 
+# Fingerprinted styles.css/script.js links when mounted in the dashboard
+try:
+    from services.assets import IMMUTABLE, AssetManifest
+    # url_prefix '.': index.html links its assets relative to the page
+    assets = AssetManifest(BASE_DIR, '.')
+except ImportError:  # running standalone
+    assets = None
+
 @release_bp.route('/')
 def health_check():
     """Health check endpoint - serves the main HTML"""
     print("🔍 Release page accessed")
-    return send_file(os.path.join(BASE_DIR, INDEX_HTML))
+    if assets is None:
+        return send_file(os.path.join(BASE_DIR, INDEX_HTML))
+    with open(os.path.join(BASE_DIR, INDEX_HTML), encoding='utf-8') as f:
+        response = make_response(assets.rewrite_html(f.read()))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
 @release_bp.route('/status')
 def app_status():
@@ -94,7 +108,13 @@ def get_backup():
 def serve_static(filename):
     """Serve static files (CSS, JS, etc.)"""
     try:
-        return send_from_directory(BASE_DIR, filename)
+        if assets is None:
+            return send_from_directory(BASE_DIR, filename)
+        name, immutable = assets.resolve(filename)
+        response = send_from_directory(BASE_DIR, name)
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
     except FileNotFoundError:
         # If file not found, serve the main HTML (for SPA behavior)
         return send_file(os.path.join(BASE_DIR, INDEX_HTML))
@@ -22,6 +22,14 @@ Includes a stub to trigger a PR creation webhook for pipeline integration.
 
  
 
+import base64
+
+ 
+
+import hashlib
+
+ 
+
 import json
 
  
@@ -30,11 +38,19 @@ import os
 
  
 
+import threading
+
+ 
+
+import time
+
+ 
+
 import uuid
 
  
 
-from datetime import datetime
+from datetime import datetime, timezone
 
  
 
@@ -80,7 +96,61 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
  
 
-from services.github_pr_service import create_utility_pr
+from services.github_pr_service import REPO_LOCK_WAIT, create_batch_pr, create_utility_pr, git_plumbing, github_client, pipeline_metrics, repo_lock, worktree_pool
+
+ 
+
+from services.utility_catalog import UtilityCatalog
+
+ 
+
+from services.repo_lock import LockTimeout
+
+ 
+
+from services.repo_sync import RepoSyncWorker
+
+ 
+
+from services.utility_search import SearchIndex
+
+ 
+
+from services.compression import CompressionCache, MIN_SIZE, ENCODINGS, compress, is_compressible, negotiate, variant_etag
+
+ 
+
+from services.pr_jobs import FAILED as JOB_FAILED, PRJobQueue, QueueFull
+
+ 
+
+from services.idempotency import DONE as IDEMPOTENCY_DONE, MISMATCH as IDEMPOTENCY_MISMATCH, PENDING as IDEMPOTENCY_PENDING
+
+ 
+
+from services.idempotency import IdempotencyStore, fingerprint as payload_fingerprint
+
+ 
+
+from services.webhook_outbox import WebhookOutbox
+
+ 
+
+from services.pr_events import PREventLog, parse_since
+
+ 
+
+from services.icon_store import IconStore, IconTooLarge, InvalidIcon
+
+ 
+
+from services.assets import IMMUTABLE, AssetManifest
+
+ 
+
+from services.json_provider import FastJSONProvider
+
+ 
 
  
 
@@ -118,6 +188,16 @@ ICONS_DIR = os.path.join(STATIC_DIR, 'icons')
 
  
 
+ 
+
+# Compiled catalog snapshot (single-read cold start); set to '' to disable
+
+ 
+
+CATALOG_SNAPSHOT_PATH = os.getenv('AUTON_CATALOG_SNAPSHOT', os.path.join(BASE_DIR, '.cache', 'utilities.snapshot.json'))
+
+ 
+
 # Ensure icons directory exists
 
  
@@ -414,6 +494,18 @@ app = Flask(__name__,
 
  
 
+# jsonify() and request.get_json() use orjson when installed (see services/fast_json.py)
+
+ 
+
+app.json = FastJSONProvider(app)
+
+ 
+
+ 
+
+ 
+
 # Add response handler to prevent JSON downloads
 
 @app.after_request
@@ -426,6 +518,56 @@ def after_request(response):
         response.headers['Content-Type'] = 'application/json; charset=utf-8'
     return response
 
+# Compressed variants of static files and API bodies, keyed by path + validator
+_compression_cache = CompressionCache(int(float(os.getenv('AUTON_COMPRESSION_CACHE_MB', '64')) * 1024 * 1024))
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode compressible GET bodies, reusing cached variants.
+
+    Responses carrying an ETag (static files, catalog API) are cached under
+    (path, ETag) and re-labelled with a per-encoding ETag; others are
+    compressed on the fly. Bodies under MIN_SIZE are left alone.
+    """
+    if (request.method != 'GET' or response.status_code != 200
+            or 'Content-Encoding' in response.headers or not is_compressible(response.mimetype)):
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+    if encoding is None or (response.content_length is not None and response.content_length < MIN_SIZE):
+        return response
+    original = response.response
+
+    def read_body():
+        response.direct_passthrough = False
+        return response.get_data()
+    etag, weak = response.get_etag()
+    if etag:
+        encoded_etag = variant_etag(etag, encoding)
+        if request.if_none_match.contains(encoded_etag):
+            not_modified = app.response_class(status=304)
+            for header in ('Cache-Control', 'Last-Modified', 'Vary'):
+                if header in response.headers:
+                    not_modified.headers[header] = response.headers[header]
+            not_modified.set_etag(encoded_etag, weak)
+            response.close()
+            return not_modified
+        body = _compression_cache.get_or_compress((request.path, etag), read_body, encoding)
+        response.set_etag(encoded_etag, weak)
+    else:
+        data = read_body()
+        if len(data) < MIN_SIZE:
+            return response
+        body = compress(data, encoding)
+    if hasattr(original, 'close') and original is not response.response:
+        original.close()
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 # Register Release App Blueprint (if successfully imported)
 
  
@@ -470,99 +612,87 @@ else:
 
  
 
-@app.route("/")
+# Fingerprinted asset URLs (name.<hash>.ext); browsers keep those responses for a year.
 
  
 
-@app.route(f"/{APP_NAME}")
+# Uploaded icons and utility files are hashed on first use rather than at startup.
 
  
 
-@app.route(f"/{APP_NAME}/home.html")
+_static_assets = AssetManifest(STATIC_DIR, f"/{APP_NAME}/static", exclude=('icons', 'utilities'))
 
  
 
-def index():
+_lttd_assets = AssetManifest(os.path.join(BASE_DIR, 'LTTD-page'), f"/{APP_NAME}/lttd")
 
  
 
-    return render_template('index.html', app_name=APP_NAME)
+for _assets in (_static_assets, _lttd_assets):
 
  
 
- 
+    _assets.build()
 
  
 
-@app.route(f"/{APP_NAME}/lttd")
-
-def lttd_page():
-
-    """Serve the LTTD metrics page."""
-
-    return send_from_directory('LTTD-page', 'index.html')
-
  
 
-@app.route(f"/{APP_NAME}/lttd/<path:filename>")
-
-def lttd_static(filename):
-
-    """Serve LTTD page static files."""
+ 
 
-    return send_from_directory('LTTD-page', filename)
+@app.template_global()
 
  
 
-@app.route(f"/{APP_NAME}/add")
+def asset_url(name: str) -> str:
 
  
 
-def add_utility_form():
+    """Fingerprinted URL of a file under static/ ('static/...' as stored in icon_url is accepted)."""
 
  
 
-    repo_url = os.getenv('AUTON_REPO_URL', '')
+    if name.startswith('static/'):
 
  
 
-    return render_template('add_utility.html', app_name=APP_NAME, repo_url=repo_url)
+        name = name[len('static/'):]
 
  
 
- 
+    return _static_assets.url(name)
 
  
 
-def _ensure_dirs():
+ 
 
  
 
-    os.makedirs(UTILITIES_DIR, exist_ok=True)
+def _send_asset(assets: AssetManifest, filename: str):
 
  
 
- 
+    """Send a file, marking it immutable when the path carries its current fingerprint."""
 
  
 
-def _normalize_item(item: dict) -> dict:
+    name, immutable = assets.resolve(filename)
 
  
 
-    # Map utility_tools_number -> mcp_tools_number to keep frontend compatible
+    response = send_from_directory(assets.directory, name)
 
  
 
-    if 'utility_tools_number' in item and 'mcp_tools_number' not in item:
+    if immutable:
 
  
 
-        item['mcp_tools_number'] = item['utility_tools_number']
+        response.headers['Cache-Control'] = IMMUTABLE
 
  
 
-    return item
+    return response
 
  
 
@@ -570,71 +700,65 @@ def _normalize_item(item: dict) -> dict:
 
  
 
-def _read_per_utility_files() -> list:
+@app.route("/")
 
  
 
-    """Read all JSON files from static/utilities and return list of objects."""
+@app.route(f"/{APP_NAME}")
 
  
 
-    _ensure_dirs()
+@app.route(f"/{APP_NAME}/home.html")
 
  
 
-    items = []
+def index():
 
  
 
-    for name in sorted(os.listdir(UTILITIES_DIR)):
+    return render_template('index.html', app_name=APP_NAME)
 
  
 
-        if not name.lower().endswith('.json'):
-
  
 
-            continue
-
  
 
-        path = os.path.join(UTILITIES_DIR, name)
-
- 
+@app.route(f"/{APP_NAME}/lttd")
 
-        try:
+def lttd_page():
 
  
 
-            with open(path, 'r', encoding='utf-8') as f:
+    """Serve the LTTD metrics page, with its asset links fingerprinted."""
 
  
 
-                obj = json.load(f)
+    with open(os.path.join(_lttd_assets.directory, 'index.html'), encoding='utf-8') as f:
 
  
 
-                if isinstance(obj, dict):
+        html = _lttd_assets.rewrite_html(f.read())
 
  
 
-                    items.append(_normalize_item(obj))
+    response = app.response_class(html, mimetype='text/html')
 
  
 
-        except Exception:
+    # The page itself is revalidated, so a deploy is picked up on the next visit
 
  
 
-            # Skip malformed files
+    response.headers['Cache-Control'] = 'no-cache'
 
  
 
-            continue
+    response.add_etag()
 
  
 
-    return items
+    return response.make_conditional(request)
 
  
 
@@ -642,207 +766,211 @@ def _read_per_utility_files() -> list:
 
  
 
-def _current_branch() -> str:
+@app.route(f"/{APP_NAME}/lttd/<path:filename>")
 
  
 
-    """Return current git branch name if available, else empty string."""
+def lttd_static(filename):
 
  
 
-    try:
+    """Serve LTTD page static files."""
 
  
 
-        # Read from .git/HEAD for speed and no subprocess
+    return _send_asset(_lttd_assets, filename)
 
  
 
-        repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+@app.route(f"/{APP_NAME}/add")
 
  
 
-        head_path = os.path.join(repo_root, '.git', 'HEAD')
+def add_utility_form():
 
  
 
-        with open(head_path, 'r', encoding='utf-8') as f:
+    repo_url = os.getenv('AUTON_REPO_URL', '')
 
  
 
-            head = f.read().strip()
+    return render_template('add_utility.html', app_name=APP_NAME, repo_url=repo_url)
 
  
 
-        if head.startswith('ref: '):
+ 
 
  
 
-            ref = head.split(' ', 1)[1]
+def _ensure_dirs():
 
  
 
-            return os.path.basename(ref)
+    os.makedirs(UTILITIES_DIR, exist_ok=True)
 
  
 
-        return ''
+ 
 
  
 
-    except Exception:
+def _normalize_item(item: dict) -> dict:
 
  
 
-        return ''
+    # Map utility_tools_number -> mcp_tools_number to keep frontend compatible
 
  
 
- 
+    if 'utility_tools_number' in item and 'mcp_tools_number' not in item:
 
  
 
-def _refresh_repo_if_on_target(target_branch: str) -> None:
+        item['mcp_tools_number'] = item['utility_tools_number']
 
  
 
-    """If the server is running from the target branch, perform a lightweight pull.
+    return item
 
  
 
-    This enables near real-time updates after merges without restarting the app.
+ 
 
  
 
-    Controlled by AUTON_REFRESH_ON_GET (default: true).
+# Parsed, normalized per-utility files; revalidated by file mtime/size
 
  
 
-    """
+_catalog = UtilityCatalog(UTILITIES_DIR, normalize=_normalize_item,
 
  
 
-    refresh_flag = os.getenv('AUTON_REFRESH_ON_GET', 'true').lower() in ('1', 'true', 'yes')
+                          check_interval=float(os.getenv('AUTON_CATALOG_CHECK_INTERVAL', '1.0')),
 
  
 
-    if not refresh_flag:
+                          snapshot_path=CATALOG_SNAPSHOT_PATH or None,
 
  
 
-        return
+                          load_workers=int(os.getenv('AUTON_CATALOG_LOAD_WORKERS', '8')))
 
  
 
-    try:
+ 
 
  
 
-        current = _current_branch()
+def _catalog_response(snap, build_payload, variant: str = '', headers: dict = None):
 
  
 
-        if current and current == target_branch:
+    """Serve catalog-derived JSON with a strong ETag and Last-Modified.
 
- 
+    snap is a _catalog.snapshot() (or the one yielded by _catalog.reading());
 
-            import subprocess
+    the ETag is its version and build_payload must only serialize data taken
 
- 
+    from that same snapshot, so a reload between the two can never pair one
 
-            repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+    version's tag with another version's body. A matching If-None-Match (or,
 
- 
+    absent that, a current If-Modified-Since) gets a bodiless 304 and
 
-            # Fetch and fast-forward pull; ignore output/errors (best-effort)
+    build_payload is never called.
 
- 
+    variant distinguishes representations of the same version (e.g. a filtered page).
 
-            subprocess.run(['git', '--no-pager', '-C', repo_root, 'fetch', 'origin', target_branch],
+    """
 
  
 
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    etag = snap.version
 
  
 
-            subprocess.run(['git', '--no-pager', '-C', repo_root, 'pull', '--ff-only'],
+    if variant:
 
  
 
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        etag = hashlib.sha256(f"{etag}:{variant}".encode('utf-8')).hexdigest()
 
  
 
-    except Exception:
+    last_modified = datetime.fromtimestamp(int(snap.last_modified), tz=timezone.utc)
 
  
 
-        # Non-fatal; just skip refresh
+    # Clients holding a compressed copy send the per-encoding ETag (see compress_response)
 
  
 
-        pass
+    known_tags = (etag,) + tuple(variant_etag(etag, enc) for enc in ENCODINGS)
 
  
 
+    matched_tag = next((tag for tag in known_tags if request.if_none_match.contains(tag)), None)
+
  
 
+    if request.if_none_match:
+
  
 
-def _get_last_commit_message() -> str:
+        not_modified = matched_tag is not None
 
  
 
-    """Return the last git commit subject if available; else empty string.
+    else:
 
  
 
-    Works when the app is running from a checked-out repo. In containers without git,
+        not_modified = bool(request.if_modified_since and last_modified <= request.if_modified_since)
 
  
 
-    falls back gracefully.
+    if not_modified:
 
  
 
-    """
+        resp = app.response_class(status=304, mimetype='application/json')
 
  
 
-    try:
+    else:
 
  
 
-        import subprocess
+        resp = jsonify(build_payload())
 
  
 
-        repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+    resp.set_etag(matched_tag or etag)
 
  
 
-        out = subprocess.check_output(['git', '--no-pager', '-C', repo_root, 'log', '-1', '--pretty=%s'],
+    resp.last_modified = last_modified
 
  
 
-                                      stderr=subprocess.STDOUT)
+    # Let browsers keep the body but revalidate it on every use
 
  
 
-        msg = out.decode('utf-8', errors='ignore').strip()
+    resp.cache_control.no_cache = True
 
  
 
-        return msg
+    for name, value in (headers or {}).items():
 
  
 
-    except Exception:
+        resp.headers[name] = value
 
  
 
-        return ''
+    return resp
 
  
 
@@ -850,15 +978,15 @@ def _get_last_commit_message() -> str:
 
  
 
-def _write_merged_utilities(items: list) -> None:
+# Query parameters accepted by GET /api/utilities
 
  
 
-    """No-op: merged utilities.json is deprecated; per-file JSONs are authoritative."""
+_CATALOG_QUERY_PARAMS = ('type', 'source_language', 'q', 'limit', 'cursor', 'fields')
 
  
 
-    return None
+_CATALOG_MAX_LIMIT = 500
 
  
 
@@ -866,47 +994,47 @@ def _write_merged_utilities(items: list) -> None:
 
  
 
-def _load_utilities_merged() -> list:
+def _encode_cursor(version: str, offset: int) -> str:
 
  
 
-    """Only read per-utility files from utilities/ folder."""
+    return base64.urlsafe_b64encode(f"v:{version}:o:{offset}".encode('utf-8')).decode('ascii').rstrip('=')
 
  
 
-    return _read_per_utility_files()
+def _decode_cursor(cursor: str):
 
  
 
- 
+    """(catalog version, offset) of a cursor; ('', 0) for the first page."""
 
  
 
-def _validate_new_utility(payload: dict):
+    if not cursor:
 
  
 
-    required = ['title','description','committer','source_code_url','playbook']
+        return '', 0
 
  
 
-    missing = [f for f in required if not payload.get(f)]
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
 
  
 
-    if missing:
+    parts = raw.split(':')
 
  
 
-        return False, f"Missing required field(s): {', '.join(missing)}"
+    if len(parts) != 4 or parts[0] != 'v' or parts[2] != 'o' or not parts[3].isdigit():
 
  
 
-    # Validate JSON in config field
+        raise ValueError('malformed cursor')
 
  
 
-    return True, ''
+    return parts[1], int(parts[3])
 
  
 
@@ -914,188 +1042,197 @@ def _validate_new_utility(payload: dict):
 
  
 
-def _auto_icon_url(payload: dict) -> str:
+def _query_utilities(args):
 
  
 
-    """Decide icon_url if missing based on type or source_language."""
+    """Filter, paginate and project the catalog for GET /api/utilities.
 
  
 
-    icon = (payload.get('icon_url') or '').strip()
+    type/source_language/q are evaluated against the catalog index; limit/cursor
 
  
 
-    if icon:
+    page through the matches (next page in X-Next-Cursor and Link headers) and
 
  
 
-        return icon
+    fields=a,b keeps only those keys (plus id). The body stays a plain list.
 
  
 
-    # Heuristics
+    A cursor is bound to the catalog version it was issued for; once the
 
  
 
-    type_val = (payload.get('type') or '').lower()
+    catalog changes it gets 410 with resync=true (like /api/utilities/changes)
 
  
 
-    lang_val = (payload.get('source_language') or '').lower()
+    and the client restarts from the first page instead of skipping or
 
  
 
-    if 'ci/cd' in type_val:
+    repeating items.
 
  
 
-        return 'static/jenkins.svg'
+    """
 
- 
+    try:
 
-    if 'mcp' in type_val:
+        cursor_version, offset = _decode_cursor(args.get('cursor', ''))
 
- 
+        limit = int(args['limit']) if args.get('limit') else None
 
-        return 'static/mcphub.png'
+    except ValueError:
+
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
 
  
 
-    if 'python' in lang_val:
+    snap = _catalog.snapshot()
 
  
 
-        return 'static/python.svg'
+    if cursor_version and cursor_version != snap.version:
 
  
 
-    # Default placeholder
+        return jsonify({'error': 'Cursor is from an older catalog version; restart from the first page',
 
  
 
-    return 'static/placeholder.svg'
+                        'version': snap.version, 'resync': True}), 410
 
  
 
- 
+    if limit is not None:
 
  
 
-def _generate_id(existing_ids: set, title: str) -> str:
+        limit = max(1, min(limit, _CATALOG_MAX_LIMIT))
 
  
 
-    # Try a slug from title, fallback to UUID
+    matches = snap.index.filter(type_=args.get('type'),
 
  
 
-    base = (title or '').strip().lower().replace(' ', '-')[:40] or str(uuid.uuid4())
+                                source_language=args.get('source_language'),
 
  
 
-    candidate = base
+                                q=args.get('q'))
 
  
 
-    i = 1
+    page = matches[offset:offset + limit] if limit else matches[offset:]
 
  
 
-    while candidate in existing_ids:
+    fields = [f.strip() for f in (args.get('fields') or '').split(',') if f.strip()]
 
  
 
-        candidate = f"{base}-{i}"
+    headers = {'X-Total-Count': str(len(matches))}
 
  
 
-        i += 1
+    if limit and offset + limit < len(matches):
 
  
 
-    return candidate
+        next_cursor = _encode_cursor(snap.version, offset + limit)
 
  
 
- 
+        headers['X-Next-Cursor'] = next_cursor
 
  
 
-def _sanitize_filename(title: str) -> str:
+        next_args = args.to_dict()
 
  
 
-    """Convert utility title to a safe filename."""
+        next_args['cursor'] = next_cursor
 
  
 
-    # Remove or replace unsafe characters
+        headers['Link'] = f'<{request.path}?{urllib.parse.urlencode(next_args)}>; rel="next"'
 
  
 
-    safe_title = title.lower()
+ 
+
+    def build():
 
  
 
-    safe_title = safe_title.replace(' ', '_')
+        if not fields:
 
  
 
-    safe_title = ''.join(c for c in safe_title if c.isalnum() or c in ('_', '-'))
+            return page
 
  
 
-    # Limit length
+        keep = set(fields) | {'id'}
 
  
 
-    safe_title = safe_title[:100]
+        return [{k: v for k, v in item.items() if k in keep} for item in page]
 
  
 
-    return safe_title
+    variant = urllib.parse.urlencode(sorted((k, args.get(k)) for k in _CATALOG_QUERY_PARAMS if k in args))
 
+ 
 
+    return _catalog_response(snap, build, variant=variant, headers=headers)
 
+ 
 
-def _write_per_utility_file(item: dict) -> str:
+ 
 
  
 
-    """Persist single utility JSON file under static/utilities/<title>.json."""
+# Ranked keyword index, updated incrementally on every catalog reload
 
  
 
-    _ensure_dirs()
+_search_index = SearchIndex()
 
  
 
-    # Use sanitized title as filename
+_catalog.subscribe(_search_index.update)
 
  
 
-    safe_title = _sanitize_filename(item.get('title', item['id']))
+ 
 
  
 
-    filename = f"{safe_title}.json"
+def _read_per_utility_files() -> list:
 
  
 
-    path = os.path.join(UTILITIES_DIR, filename)
+    """Return all utilities from static/utilities via the in-process catalog cache.
 
  
 
-    with open(path, 'w', encoding='utf-8') as f:
+    Only files whose mtime/size changed since the last check are re-read;
+
+    malformed files are reported in the catalog stats and skipped.
 
  
 
-        json.dump(item, f, indent=2)
+    """
 
  
 
-    return filename
+    return _catalog.items()
 
  
 
@@ -1103,47 +1240,235 @@ def _write_per_utility_file(item: dict) -> str:
 
  
 
-def _trigger_pr_stub(branch: str, files_changed: list, author: str):
+def _current_branch() -> str:
 
  
 
-    """Stub: record a PR trigger event; in CI this can call a webhook or git CLI."""
+    """Return current git branch name if available, else empty string."""
 
  
 
-    from datetime import UTC
+    try:
 
  
 
-    event = {
+        # Read from .git/HEAD for speed and no subprocess
 
  
 
-        'action': 'create_pr',
+        repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
 
  
 
-        'target_branch': branch,
+        head_path = os.path.join(repo_root, '.git', 'HEAD')
 
  
 
-        'files_changed': files_changed,
+        with open(head_path, 'r', encoding='utf-8') as f:
 
  
 
-        'author': author,
+            head = f.read().strip()
 
  
 
-        'timestamp': datetime.now(UTC).isoformat()
+        if head.startswith('ref: '):
 
  
 
-    }
+            ref = head.split(' ', 1)[1]
+
+ 
+
+            return os.path.basename(ref)
+
+ 
+
+        return ''
+
+ 
+
+    except Exception:
+
+ 
+
+        return ''
+
+ 
+
+ 
+
+ 
+
+def _refresh_repo_if_on_target(target_branch: str):
+
+ 
+
+    """If the server is running from the target branch, perform a lightweight pull.
+
+ 
+
+    This enables near real-time updates after merges without restarting the app.
+
+ 
+
+    Runs on the background sync worker, never on the request path.
+
+ 
+
+    Returns (ok, message).
+
+ 
+
+    """
+
+ 
+
+    current = _current_branch()
+
+ 
+
+    if not current or current != target_branch:
+
+ 
+
+        return True, f"skipped: running from '{current or 'unknown'}', not '{target_branch}'"
+
+ 
+
+    import subprocess
+
+ 
+
+    repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+ 
+
+    timeout = float(os.getenv('AUTON_SYNC_TIMEOUT', '60'))
+
+ 
+
+    # Fetch and fast-forward pull, queued with the PR pipeline's other .git writers
+
+ 
+
+    try:
+
+ 
+
+        with repo_lock().hold(REPO_LOCK_WAIT):
+
+ 
+
+            for args in (['fetch', 'origin', target_branch], ['pull', '--ff-only']):
+
+ 
+
+                try:
+
+ 
+
+                    proc = subprocess.run(['git', '--no-pager', '-C', repo_root] + args,
+
+ 
+
+                                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+
+ 
+
+                                          timeout=timeout, check=False)
+
+ 
+
+                except subprocess.TimeoutExpired:
+
+ 
+
+                    return False, f"git {args[0]} timed out after {timeout:g}s"
+
+ 
+
+                if proc.returncode != 0:
+
+ 
+
+                    return False, f"git {args[0]} failed: {proc.stdout.decode('utf-8', errors='ignore').strip()}"
+
+ 
+
+    except LockTimeout as e:
+
+ 
+
+        return False, str(e)
+
+ 
+
+    return True, 'fetched and fast-forwarded'
+
+ 
+
+ 
+
+ 
+
+# Background git sync; GET handlers only ever read the in-memory catalog.
+
+ 
+
+# AUTON_REPO_SYNC (falls back to legacy AUTON_REFRESH_ON_GET) enables it.
+
+ 
+
+# auton-sync.lock only makes other processes skip a sync already in progress;
+
+ 
+
+# the git commands themselves take the shared repo lock.
+
+ 
+
+_repo_sync = RepoSyncWorker(
+
+ 
+
+    lambda: _refresh_repo_if_on_target(os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962')),
+
+ 
+
+    interval=float(os.getenv('AUTON_SYNC_INTERVAL', '60')),
+
+ 
+
+    on_success=lambda: _catalog.revalidate(force=True),
+
+ 
+
+    lock_path=os.path.join(os.path.abspath(os.path.join(BASE_DIR, os.pardir)), '.git', 'auton-sync.lock'))
+
+ 
+
+ 
+
+ 
+
+def _get_last_commit_message() -> str:
+
+ 
+
+    """Return the last git commit subject if available; else empty string.
+
+ 
+
+    Works when the app is running from a checked-out repo. In containers without git,
+
+ 
+
+    falls back gracefully.
 
  
 
-    # Write an event log under static for visibility (non-secret info only)
+    """
 
  
 
@@ -1151,11 +1476,27 @@ def _trigger_pr_stub(branch: str, files_changed: list, author: str):
 
  
 
-        with open(os.path.join(STATIC_DIR, 'last_pr_event.json'), 'w', encoding='utf-8') as f:
+        import subprocess
+
+ 
+
+        repo_root = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+ 
+
+        out = subprocess.check_output(['git', '--no-pager', '-C', repo_root, 'log', '-1', '--pretty=%s'],
+
+ 
+
+                                      stderr=subprocess.STDOUT)
+
+ 
+
+        msg = out.decode('utf-8', errors='ignore').strip()
 
  
 
-            json.dump(event, f, indent=2)
+        return msg
 
  
 
@@ -1163,7 +1504,7 @@ def _trigger_pr_stub(branch: str, files_changed: list, author: str):
 
  
 
-        pass
+        return ''
 
  
 
@@ -1171,15 +1512,15 @@ def _trigger_pr_stub(branch: str, files_changed: list, author: str):
 
  
 
-def _send_ci_webhook(event: dict):
+def _write_merged_utilities(items: list) -> None:
 
  
 
-    """Optionally send a webhook to CI to create/update a PR.
+    """Rewrite the compiled catalog snapshot; per-file JSONs stay authoritative.
 
  
 
-    Controlled by env AUTON_PR_WEBHOOK_URL and AUTON_PR_WEBHOOK_TOKEN (optional).
+    The catalog already rewrites it whenever per-utility files change; items is ignored.
 
  
 
@@ -1187,207 +1528,1746 @@ def _send_ci_webhook(event: dict):
 
  
 
-    url = os.getenv('AUTON_PR_WEBHOOK_URL')
+    _catalog.write_snapshot()
 
  
 
-    if not url:
+ 
 
  
 
-        return False, 'Webhook URL not configured'
+def _load_utilities_merged() -> list:
 
  
 
-    token = os.getenv('AUTON_PR_WEBHOOK_TOKEN')
+    """Read utilities via the catalog: compiled snapshot first, per-file parse for stale entries."""
 
  
 
-    headers = {'Content-Type': 'application/json'}
+    return _read_per_utility_files()
 
  
 
-    if token:
+ 
 
  
 
-        headers['Authorization'] = f'Bearer {token}'
+def _validate_new_utility(payload: dict):
 
  
 
-    data = json.dumps(event).encode('utf-8')
+    required = ['title','description','committer','source_code_url','playbook']
 
  
 
-    req = urllib.request.Request(url, data=data, headers=headers, method='POST')
+    missing = [f for f in required if not payload.get(f)]
 
  
 
-    try:
+    if missing:
 
  
 
-        with urllib.request.urlopen(req, timeout=10) as resp:
+        return False, f"Missing required field(s): {', '.join(missing)}"
 
  
 
-            status = resp.getcode()
+    # Validate JSON in config field
 
  
 
-            return (200 <= status < 300), f'Webhook status {status}'
+    return True, ''
 
  
 
-    except urllib.error.HTTPError as e:
+ 
 
  
 
-        return False, f'Webhook HTTP error {e.code}: {e.read().decode(errors="ignore")}'
+def _auto_icon_url(payload: dict) -> str:
 
  
 
-    except Exception as e:
+    """Decide icon_url if missing based on type or source_language."""
 
  
 
-        return False, f'Webhook error: {e}'
+    icon = (payload.get('icon_url') or '').strip()
 
  
 
+    if icon:
+
  
 
+        return icon
+
  
 
-@app.route(f"/{APP_NAME}/api/utilities", methods=['GET','POST'])
+    # Heuristics
 
  
 
-def get_or_create_utilities():
+    type_val = (payload.get('type') or '').lower()
 
  
 
-    if request.method == 'GET':
+    lang_val = (payload.get('source_language') or '').lower()
 
  
 
-        # Return the merged list of utilities
+    if 'ci/cd' in type_val:
 
  
 
-        try:
+        return 'static/jenkins.svg'
 
  
 
-            # Best-effort repo refresh to surface merged changes without restart
+    if 'mcp' in type_val:
 
  
 
-            target_branch = os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962')
+        return 'static/mcphub.png'
 
  
 
-            _refresh_repo_if_on_target(target_branch)
+    if 'python' in lang_val:
 
  
 
-            data = _load_utilities_merged()
+        return 'static/python.svg'
 
  
 
-            data = [_normalize_item(d) for d in data]
+    # Default placeholder
 
  
 
-            return jsonify(data), 200
+    return 'static/placeholder.svg'
 
  
 
-        except Exception as e:
+ 
 
  
 
-            return jsonify({'error': str(e)}), 500
+def _generate_id(existing_ids, title: str) -> str:
 
  
 
-    # POST: create a new utility entry
+    # existing_ids: the catalog index id set (O(1) membership, no reload)
+
+ 
+
+    # Try a slug from title, fallback to UUID
+
+ 
+
+    base = (title or '').strip().lower().replace(' ', '-')[:40] or str(uuid.uuid4())
+
+ 
+
+    candidate = base
+
+ 
+
+    i = 1
+
+ 
+
+    while candidate in existing_ids:
+
+ 
+
+        candidate = f"{base}-{i}"
+
+ 
+
+        i += 1
+
+ 
+
+    return candidate
+
+ 
+
+ 
+
+ 
+
+def _sanitize_filename(title: str) -> str:
+
+ 
+
+    """Convert utility title to a safe filename."""
+
+ 
+
+    # Remove or replace unsafe characters
+
+ 
+
+    safe_title = title.lower()
+
+ 
+
+    safe_title = safe_title.replace(' ', '_')
+
+ 
+
+    safe_title = ''.join(c for c in safe_title if c.isalnum() or c in ('_', '-'))
+
+ 
+
+    # Limit length
+
+ 
+
+    safe_title = safe_title[:100]
+
+ 
+
+    return safe_title
+
+
+
+
+def _write_per_utility_file(item: dict) -> str:
+
+ 
+
+    """Persist single utility JSON file under static/utilities/<title>.json."""
+
+ 
+
+    _ensure_dirs()
+
+ 
+
+    # Use sanitized title as filename
+
+ 
+
+    safe_title = _sanitize_filename(item.get('title', item['id']))
+
+ 
+
+    filename = f"{safe_title}.json"
+
+ 
+
+    path = os.path.join(UTILITIES_DIR, filename)
+
+ 
+
+    with open(path, 'w', encoding='utf-8') as f:
+
+ 
+
+        json.dump(item, f, indent=2)
+
+ 
+
+    return filename
+
+ 
+
+ 
+
+ 
+
+# PR triggers and attempts are appended to a bounded SQLite event log
+
+ 
+
+# (GET /api/pr/events) instead of overwriting static/last_pr_event.json.
+
+ 
+
+_pr_events = PREventLog(os.getenv('AUTON_PR_EVENTS_DB', os.path.join(BASE_DIR, '.cache', 'pr_events.sqlite3')),
+
+ 
+
+                        max_events=int(os.getenv('AUTON_PR_EVENTS_MAX', '5000')))
+
+ 
+
+ 
+
+ 
+
+def _trigger_pr_stub(branch: str, files_changed: list, author: str, utility_ids=()):
+
+ 
+
+    """Stub: record a PR trigger event; in CI this can call a webhook or git CLI."""
+
+ 
+
+    from datetime import UTC
+
+ 
+
+    event = {
+
+ 
+
+        'action': 'create_pr',
+
+ 
+
+        'target_branch': branch,
+
+ 
+
+        'files_changed': files_changed,
+
+ 
+
+        'author': author,
+
+ 
+
+        'timestamp': datetime.now(UTC).isoformat()
+
+ 
+
+    }
+
+ 
+
+    # Append to the event log for visibility (non-secret info only)
+
+ 
+
+    try:
+
+ 
+
+        _pr_events.append('pr_trigger', event, utility_ids)
+
+ 
+
+    except Exception as e:
+
+ 
+
+        print(f"⚠️ Could not record PR trigger event: {e}")
+
+ 
+
+ 
+
+ 
+
+# CI webhooks go through a SQLite outbox: the job that raises an event only
+
+ 
+
+# commits it, and a background dispatcher delivers it with retries and backoff.
+
+ 
+
+_webhooks = WebhookOutbox(os.getenv('AUTON_WEBHOOK_OUTBOX_DB', os.path.join(BASE_DIR, '.cache', 'webhook_outbox.sqlite3')),
+
+ 
+
+                          workers=int(os.getenv('AUTON_WEBHOOK_WORKERS', '2')),
+
+ 
+
+                          max_attempts=int(os.getenv('AUTON_WEBHOOK_MAX_ATTEMPTS', '8')),
+
+ 
+
+                          base_delay=float(os.getenv('AUTON_WEBHOOK_RETRY_DELAY', '5')),
+
+ 
+
+                          max_delay=float(os.getenv('AUTON_WEBHOOK_RETRY_MAX', '600')))
+
+ 
+
+ 
+
+ 
+
+def _send_ci_webhook(event: dict):
+
+ 
+
+    """Queue a webhook to CI to create/update a PR; delivery happens in the background.
+
+    Controlled by env AUTON_PR_WEBHOOK_URL and AUTON_PR_WEBHOOK_TOKEN (optional).
+
+    """
+
+ 
+
+    url = os.getenv('AUTON_PR_WEBHOOK_URL')
+
+ 
+
+    if not url:
+
+ 
+
+        return False, 'Webhook URL not configured'
+
+ 
+
+    try:
+
+ 
+
+        delivery_id = _webhooks.enqueue(url, event)
+
+ 
+
+    except Exception as e:
+
+ 
+
+        return False, f'Webhook not queued: {e}'
+
+ 
+
+    return True, f'Webhook queued: {delivery_id}'
+
+ 
+
+ 
+
+ 
+
+def _pr_summary(pr_result: dict) -> dict:
+
+ 
+
+    return {
+
+ 
+
+        'ok': pr_result.get('ok', False),
+
+ 
+
+        'error': pr_result.get('error'),
+
+ 
+
+        'steps': pr_result.get('steps', []),
+
+ 
+
+        'timings': pr_result.get('timings', []),
+
+ 
+
+        'pr': pr_result.get('pr'),
+
+ 
+
+        'pr_raw': pr_result.get('pr_raw')
+
+ 
+
+    }
+
+ 
+
+ 
+
+ 
+
+def _pr_succeeded(pr_result: dict) -> bool:
+
+ 
+
+    # Fallback steps (e.g. 'git disabled') mark pr_result not ok even when the PR was opened
+
+ 
+
+    return bool(pr_result.get('ok') or pr_result.get('pr'))
+
+ 
+
+ 
+
+ 
+
+def _record_pr_attempt(status: str, payload: dict, pr_result: dict) -> None:
+
+ 
+
+    """Append a diagnostic snapshot of PR steps to the PR event log."""
+
+ 
+
+    try:
+
+ 
+
+        diag = {
+
+ 
+
+            'status': status,
+
+ 
+
+            'id': payload.get('id') or payload.get('ids'),
+
+ 
+
+            'file': payload.get('file') or payload.get('files_changed'),
+
+ 
+
+            'source_branch': payload['source_branch'],
+
+ 
+
+            'target_branch': payload['target_branch'],
+
+ 
+
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+
+ 
+
+            'pr_result': pr_result
+
+ 
+
+        }
+
+ 
+
+        _pr_events.append(status, diag, payload.get('ids') or [payload.get('id')])
+
+ 
+
+    except Exception as e:
+
+ 
+
+        print(f"⚠️ Could not record PR attempt: {e}")
+
+ 
+
+ 
+
+ 
+
+def _run_pr_job(kind: str, payload: dict, on_step) -> dict:
+
+ 
+
+    """Background job body: create the PR, record diagnostics, notify CI for new utilities."""
+
+ 
+
+    try:
+
+ 
+
+        pr_result = create_utility_pr(new_util=payload['utility'],
+
+ 
+
+                                      new_id=payload['id'],
+
+ 
+
+                                      file_rel_path=payload['file'],
+
+ 
+
+                                      source_branch=payload['source_branch'],
+
+ 
+
+                                      target_branch=payload['target_branch'],
+
+ 
+
+                                      commit_message=payload['commit_message'],
+
+ 
+
+                                      on_step=on_step)
+
+ 
+
+    except Exception as e:
+
+ 
+
+        pr_result = {'ok': False, 'error': str(e)}
+
+ 
+
+    _record_pr_attempt('pr_update_attempt' if kind == 'update' else 'pr_attempt', payload, pr_result)
+
+ 
+
+    # Same shape as the former synchronous response, for UI/diagnostics
+
+ 
+
+    response = {'ok': _pr_succeeded(pr_result),
+
+ 
+
+                'status': 'updated' if kind == 'update' else 'submitted-for-review',
+
+ 
+
+                'id': payload['id'],
+
+ 
+
+                'file': payload['file'],
+
+ 
+
+                'source_branch': payload['source_branch'],
+
+ 
+
+                'target_branch': payload['target_branch'],
+
+ 
+
+                'files_changed': payload['files_changed'],
+
+ 
+
+                'repository': payload['repository'],
+
+ 
+
+                'commit_message': payload['commit_message'],
+
+ 
+
+                'error': pr_result.get('error'),
+
+ 
+
+                'pr': _pr_summary(pr_result)}
+
+ 
+
+    if kind == 'create':
+
+ 
+
+        # Optional webhook for CI orchestration
+
+ 
+
+        pr_event = {
+
+ 
+
+            'action': 'create_pr',
+
+ 
+
+            'target_branch': payload['target_branch'],
+
+ 
+
+            'source_branch': payload['source_branch'],
+
+ 
+
+            'repository': payload['repository'],
+
+ 
+
+            'files_changed': payload['files_changed'],
+
+ 
+
+            'commit_message': payload['commit_message'],
+
+ 
+
+            'author': payload['author'],
+
+ 
+
+            'utility': payload['utility']
+
+ 
+
+        }
+
+ 
+
+        webhook_ok, webhook_msg = _send_ci_webhook(pr_event)
+
+ 
+
+        response['webhook'] = {'ok': webhook_ok, 'message': webhook_msg}
+
+ 
+
+    return response
+
+ 
+
+ 
+
+ 
+
+def _batch_payload(items: list) -> dict:
+
+ 
+
+    """Combine new-utility job payloads into one batch job payload."""
+
+ 
+
+    ids = [item['id'] for item in items]
+
+ 
+
+    files_changed = [item['file'] for item in items]
+
+ 
+
+    return {'items': items,
+
+ 
+
+            'ids': ids,
+
+ 
+
+            # Stable for the same set of utilities, so a retried batch reuses its branch
+
+ 
+
+            'batch_id': hashlib.sha1('\n'.join(sorted(ids)).encode('utf-8')).hexdigest()[:10],
+
+ 
+
+            'files_changed': files_changed,
+
+ 
+
+            'source_branch': items[0]['source_branch'],
+
+ 
+
+            'target_branch': items[0]['target_branch'],
+
+ 
+
+            'repository': items[0]['repository'],
+
+ 
+
+            'commit_message': f"CDMS-6962:Add {len(items)} utilities",
+
+ 
+
+            'author': ', '.join(sorted({item['author'] for item in items}))}
+
+ 
+
+ 
+
+ 
+
+def _run_pr_batch_job(payload: dict, on_step) -> dict:
+
+ 
+
+    """Background job body for a batch: one branch, one commit and one PR for all utilities."""
+
+ 
+
+    items = payload['items']
+
+ 
+
+    try:
+
+ 
+
+        pr_result = create_batch_pr([(item['utility'], item['file']) for item in items],
+
+ 
+
+                                    batch_id=payload['batch_id'],
+
+ 
+
+                                    source_branch=payload['source_branch'],
+
+ 
+
+                                    target_branch=payload['target_branch'],
+
+ 
+
+                                    commit_message=payload['commit_message'],
+
+ 
+
+                                    on_step=on_step)
+
+ 
+
+    except Exception as e:
+
+ 
+
+        pr_result = {'ok': False, 'error': str(e)}
+
+ 
+
+    _record_pr_attempt('pr_batch_attempt', payload, pr_result)
+
+ 
+
+    pr_event = {
+
+ 
+
+        'action': 'create_pr',
+
+ 
+
+        'target_branch': payload['target_branch'],
+
+ 
+
+        'source_branch': payload['source_branch'],
+
+ 
+
+        'repository': payload['repository'],
+
+ 
+
+        'files_changed': payload['files_changed'],
+
+ 
+
+        'commit_message': payload['commit_message'],
+
+ 
+
+        'author': payload['author'],
+
+ 
+
+        'utilities': [item['utility'] for item in items]
+
+ 
+
+    }
+
+ 
+
+    webhook_ok, webhook_msg = _send_ci_webhook(pr_event)
+
+ 
+
+    return {'ok': _pr_succeeded(pr_result),
+
+ 
+
+            'status': 'submitted-for-review',
+
+ 
+
+            'ids': payload['ids'],
+
+ 
+
+            'source_branch': payload['source_branch'],
+
+ 
+
+            'target_branch': payload['target_branch'],
+
+ 
+
+            'files_changed': payload['files_changed'],
+
+ 
+
+            'repository': payload['repository'],
+
+ 
+
+            'commit_message': payload['commit_message'],
+
+ 
+
+            'error': pr_result.get('error'),
+
+ 
+
+            'pr': _pr_summary(pr_result),
+
+ 
+
+            'webhook': {'ok': webhook_ok, 'message': webhook_msg}}
+
+ 
+
+ 
+
+ 
+
+def _run_coalesced_create_jobs(payloads: list, on_step) -> list:
+
+ 
+
+    """Batch handler for 'create' jobs arriving within the coalescing window."""
+
+ 
+
+    result = _run_pr_batch_job(_batch_payload(payloads), on_step)
+
+ 
+
+    return [dict(result, id=payload['id'], file=payload['file']) for payload in payloads]
+
+ 
+
+ 
+
+ 
+
+# PR creation runs on a bounded pool of background workers; jobs persist in SQLite.
+
+ 
+
+# AUTON_PR_COALESCE_WINDOW > 0 merges new-utility submissions arriving within that
+
+ 
+
+# many seconds into one branch, commit and PR.
+
+ 
+
+_pr_jobs = PRJobQueue(os.getenv('AUTON_PR_JOBS_DB', os.path.join(BASE_DIR, '.cache', 'pr_jobs.sqlite3')),
+
+ 
+
+                      workers=int(os.getenv('AUTON_PR_WORKERS', '2')),
+
+ 
+
+                      max_pending=int(os.getenv('AUTON_PR_QUEUE_MAX', '100')))
+
+ 
+
+_PR_BATCH_MAX = int(os.getenv('AUTON_PR_BATCH_MAX', '50'))
+
+ 
+
+_pr_jobs.register('create', lambda payload, on_step: _run_pr_job('create', payload, on_step),
+
+ 
+
+                  batch_handler=_run_coalesced_create_jobs,
+
+ 
+
+                  batch_window=float(os.getenv('AUTON_PR_COALESCE_WINDOW', '0')),
+
+ 
+
+                  batch_max=_PR_BATCH_MAX)
+
+ 
+
+_pr_jobs.register('update', lambda payload, on_step: _run_pr_job('update', payload, on_step))
+
+ 
+
+_pr_jobs.register('batch', _run_pr_batch_job)
+
+ 
+
+ 
+
+ 
+
+def _queue_pr_job(kind: str, payload: dict):
+
+ 
+
+    """Enqueue a PR job and answer 202 with where to poll for its progress."""
+
+ 
+
+    try:
+
+ 
+
+        job_id = _pr_jobs.submit(kind, payload)
+
+ 
+
+    except QueueFull as e:
+
+ 
+
+        return jsonify({'error': f'Too many PR submissions in progress: {e}'}), 503, {'Retry-After': '30'}
+
+ 
+
+    job_url = f"/{APP_NAME}/api/pr/jobs/{job_id}"
+
+ 
+
+    body = {key: value for key, value in payload.items() if key not in ('utility', 'items', 'author')}
+
+ 
+
+    body.update({'status': 'queued', 'job': {'id': job_id, 'status': 'queued', 'url': job_url}})
+
+ 
+
+    return jsonify(body), 202, {'Location': job_url}
+
+ 
+
+ 
+
+ 
+
+# Repeated submissions (double-clicks, browser retries) replay the first response instead
+
+ 
+
+# of queuing another PR. An Idempotency-Key header is honoured for AUTON_IDEMPOTENCY_TTL
+
+ 
+
+# seconds; without one, identical payloads are matched for AUTON_DEDUP_WINDOW seconds.
+
+ 
+
+_idempotency = IdempotencyStore(os.getenv('AUTON_IDEMPOTENCY_DB', os.path.join(BASE_DIR, '.cache', 'idempotency.sqlite3')))
+
+ 
+
+_IDEMPOTENCY_TTL = float(os.getenv('AUTON_IDEMPOTENCY_TTL', '86400'))
+
+ 
+
+_DEDUP_WINDOW = float(os.getenv('AUTON_DEDUP_WINDOW', '600'))
+
+ 
+
+ 
+
+ 
+
+def _submit_once(scope: str, body, submit):
+
+ 
+
+    """Run submit() (which queues a PR job) once per Idempotency-Key or payload fingerprint.
+
+    A repeat gets the first 202 back with Idempotent-Replayed: true, unless that job failed.
+
+    The client-generated id is left out of the fingerprint; it changes on every click.
+
+    """
+
+ 
+
+    key = (request.headers.get('Idempotency-Key') or '').strip()
+
+ 
+
+    if len(key) > 255:
+
+ 
+
+        return jsonify({'error': 'Idempotency-Key must be at most 255 characters'}), 400
+
+ 
+
+    if not key and _DEDUP_WINDOW <= 0:
+
+ 
+
+        return submit()
+
+ 
+
+    fp = payload_fingerprint(body)
+
+ 
+
+    entry = f"{scope}:key:{key}" if key else f"{scope}:payload:{fp}"
+
+ 
+
+    deadline = time.monotonic() + 5
+
+ 
+
+    while True:
+
+ 
+
+        state, stored = _idempotency.claim(entry, fp, _IDEMPOTENCY_TTL if key else _DEDUP_WINDOW)
+
+ 
+
+        if state == IDEMPOTENCY_MISMATCH:
+
+ 
+
+            return jsonify({'error': 'Idempotency-Key was already used for a different submission'}), 422
+
+ 
+
+        if state == IDEMPOTENCY_PENDING:
+
+ 
+
+            # The first request is still queuing its job; that takes milliseconds
+
+ 
+
+            if time.monotonic() >= deadline:
+
+ 
+
+                return jsonify({'error': 'The same submission is already in progress'}), 409, {'Retry-After': '1'}
+
+ 
+
+            time.sleep(0.1)
+
+ 
+
+            continue
+
+ 
+
+        if state == IDEMPOTENCY_DONE:
+
+ 
+
+            job = _pr_jobs.get((stored['response'].get('job') or {}).get('id', ''))
+
+ 
+
+            if job is not None and job['status'] == JOB_FAILED:
+
+ 
+
+                # Let the user retry a submission whose PR could not be created
+
+ 
+
+                _idempotency.release(entry)
+
+ 
+
+                continue
+
+ 
+
+            headers = {'Idempotent-Replayed': 'true'}
+
+ 
+
+            if stored['response'].get('job'):
+
+ 
+
+                headers['Location'] = stored['response']['job']['url']
+
+ 
+
+            return jsonify(stored['response']), stored['status_code'], headers
+
+ 
+
+        break
+
+ 
+
+    try:
+
+ 
+
+        resp = app.make_response(submit())
+
+ 
+
+    except Exception:
+
+ 
+
+        _idempotency.release(entry)
+
+ 
+
+        raise
+
+ 
+
+    if resp.status_code == 202:
+
+ 
+
+        _idempotency.complete(entry, resp.status_code, resp.get_json())
+
+ 
+
+    else:
+
+ 
+
+        # Errors are not remembered; the next attempt runs again
+
+ 
+
+        _idempotency.release(entry)
+
+ 
+
+    return resp
+
+ 
+
+ 
+
+ 
+
+def _new_utility_payload(new_util: dict, taken_ids) -> dict:
+
+ 
+
+    """Assign icon and a unique id to a validated new utility; returns its PR job payload."""
+
+ 
+
+    new_util['icon_url'] = _auto_icon_url(new_util)
+
+ 
+
+    new_id = new_util.get('id') or _generate_id(taken_ids, new_util.get('title', ''))
+
+ 
+
+    while new_id in taken_ids:
+
+ 
+
+        new_id = f"{new_id}-{uuid.uuid4().hex[:6]}"
+
+ 
+
+    new_util['id'] = new_id
+
+ 
+
+    if 'utility_tools_number' not in new_util and 'mcp_tools_number' in new_util:
+
+ 
+
+        new_util['utility_tools_number'] = new_util['mcp_tools_number']
+
+ 
+
+    # Defer writing to local dashboard; changes via PR service only
+
+ 
+
+    files_changed = [f"automation_ui/static/utilities/{new_id}.json"]
+
+ 
+
+    return {'utility': new_util,
+
+ 
+
+            'id': new_id,
+
+ 
+
+            'file': files_changed[0],
+
+ 
+
+            'files_changed': files_changed,
+
+ 
+
+            'source_branch': os.getenv('AUTON_SOURCE_BRANCH', 'utility-test'),
+
+ 
+
+            'target_branch': os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962'),
+
+ 
+
+            'repository': os.getenv('AUTON_REPO_URL', 'https://alm-github.systems.uk.hsbc/GDT-CDMS/automation_utilities'),
+
+ 
+
+            # Commit message doubles as the PR title
+
+ 
+
+            'commit_message': f"CDMS-6962:{new_util.get('title') or new_id}",
+
+ 
+
+            'author': str(new_util.get('committer') or 'unknown')}
+
+ 
+
+ 
+
+ 
+
+@app.route(f"/{APP_NAME}/api/utilities", methods=['GET','POST'])
+
+ 
+
+def get_or_create_utilities():
+
+ 
+
+    if request.method == 'GET':
+
+ 
+
+        # Return the merged list of utilities (kept fresh by the background sync worker)
+
+ 
+
+        try:
+
+ 
+
+            if any(k in request.args for k in _CATALOG_QUERY_PARAMS):
+
+ 
+
+                return _query_utilities(request.args)
+
+ 
+
+            snap = _catalog.snapshot()
+
+ 
+
+            return _catalog_response(snap, lambda: snap.items)
+
+ 
+
+        except Exception as e:
+
+ 
+
+            return jsonify({'error': str(e)}), 500
+
+ 
+
+    # POST: create a new utility entry
+
+ 
+
+    try:
+
+ 
+
+        new_util = request.get_json(force=True)
+
+ 
+
+        if not isinstance(new_util, dict):
+
+ 
+
+            return jsonify({'error': 'Invalid payload'}), 400
+
+ 
+
+        ok, err = _validate_new_utility(new_util)
+
+ 
+
+        if not ok:
+
+ 
+
+            return jsonify({'error': err}), 400
+
+ 
+
+    except Exception as e:
+
+ 
+
+        import traceback
+
+ 
+
+        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+
+ 
+
+ 
+
+    def submit():
+
+ 
+
+        try:
+
+ 
+
+            payload = _new_utility_payload(new_util, _catalog.index().ids)
+
+ 
+
+        except Exception as e:
+
+ 
+
+            import traceback
+
+ 
+
+            return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+
+ 
+
+        _trigger_pr_stub(payload['target_branch'], payload['files_changed'], payload['author'], [payload['id']])
+
+ 
+
+        # Create the PR in the background; the client polls the job for steps and PR metadata
+
+ 
+
+        return _queue_pr_job('create', payload)
+
+ 
+
+ 
+
+    # A double-click or browser retry replays the first job instead of opening another PR
+
+ 
+
+    return _submit_once('create', new_util, submit)
+
+ 
+
+ 
+
+ 
+
+ 
+
+@app.route(f"/{APP_NAME}/api/utilities/batch", methods=['POST'])
+
+ 
+
+def create_utilities_batch():
+
+ 
+
+    """Submit several new utilities as one branch, one commit and one PR.
+
+ 
+
+    Body: {"utilities": [{...}, ...]} (or a bare list). Every entry is validated
+
+    like POST /api/utilities and one invalid entry rejects the whole batch.
+
+    """
+
+ 
+
+    body = request.get_json(force=True, silent=True)
+
+ 
+
+    utilities = body.get('utilities') if isinstance(body, dict) else body
+
+ 
+
+    if not isinstance(utilities, list) or not utilities:
+
+ 
+
+        return jsonify({'error': 'Expected a non-empty list of utilities'}), 400
+
+ 
+
+    if len(utilities) > _PR_BATCH_MAX:
+
+ 
+
+        return jsonify({'error': f'At most {_PR_BATCH_MAX} utilities per batch'}), 400
+
+ 
+
+    errors = {}
+
+ 
+
+    for pos, new_util in enumerate(utilities):
+
+ 
+
+        ok, err = _validate_new_utility(new_util) if isinstance(new_util, dict) else (False, 'Invalid payload')
+
+ 
+
+        if not ok:
+
+ 
+
+            errors[pos] = err
+
+ 
+
+    if errors:
+
+ 
+
+        return jsonify({'error': 'Invalid utilities in batch', 'errors': errors}), 400
+
+ 
+
+    def submit():
+
+ 
+
+        # Ids must be unique against the catalog and within the batch
+
+ 
+
+        taken_ids = set(_catalog.index().ids)
+
+ 
+
+        items = []
+
+ 
+
+        for new_util in utilities:
+
+ 
+
+            item = _new_utility_payload(new_util, taken_ids)
+
+ 
+
+            taken_ids.add(item['id'])
+
+ 
+
+            items.append(item)
+
+ 
+
+        payload = _batch_payload(items)
+
+ 
+
+        _trigger_pr_stub(payload['target_branch'], payload['files_changed'], payload['author'], payload['ids'])
+
+ 
+
+        return _queue_pr_job('batch', payload)
+
+ 
+
+ 
+
+    return _submit_once('batch', utilities, submit)
+
+ 
+
+ 
+
+ 
+
+# Icon upload endpoint removed
+
+ 
+
+ 
+
+ 
+
+@app.route(f"/{APP_NAME}/api/pr/trigger", methods=['POST'])
+
+ 
+
+def trigger_pr():
+
+ 
+
+    """Optional endpoint to be called by UI or CI to trigger PR creation.
+
+ 
+
+    This is a stub that records the intent. Wire this to your pipeline.
+
+ 
+
+    """
+
+ 
+
+    payload = request.get_json(force=True) or {}
+
+ 
+
+    branch = payload.get('branch') or os.getenv('AUTOMATION_PR_BRANCH', 'DataP_automation_utility_dashboard')
+
+ 
+
+    files = payload.get('files_changed') or []
+
+ 
+
+    author = payload.get('author') or 'unknown'
+
+ 
+
+    _trigger_pr_stub(branch, files, author)
+
+ 
+
+    return jsonify({'status': 'queued', 'branch': branch, 'files_changed': files}), 202
+
+ 
+
+ 
+
+ 
+
+@app.route(f"/{APP_NAME}/api/catalog/stats")
+
+ 
+
+def catalog_stats():
+
+ 
+
+    """Expose catalog cache hit/miss/reload counters and per-file parse errors."""
+
+ 
+
+    data = _catalog.stats()
+
+ 
+
+    data['compression'] = _compression_cache.stats()
+
+ 
+
+    return jsonify(data), 200
+
+ 
+
+ 
 
  
 
-    try:
+@app.route(f"/{APP_NAME}/api/sync/status")
 
  
 
-        new_util = request.get_json(force=True)
+def sync_status():
 
  
 
-        if not isinstance(new_util, dict):
+    """Report last background git sync time, duration and outcome."""
 
  
 
-            return jsonify({'error': 'Invalid payload'}), 400
+    return jsonify(_repo_sync.status()), 200
 
  
 
-        ok, err = _validate_new_utility(new_util)
+ 
 
  
 
-        if not ok:
+@app.route(f"/{APP_NAME}/api/pr/pool")
 
  
 
-            return jsonify({'error': err}), 400
+def pr_pool_status():
 
  
 
-        new_util['icon_url'] = _auto_icon_url(new_util)
+    """Report worktree pool usage, fetch rate limiting, per-phase timings and git plumbing counters."""
 
  
 
-        existing = _load_utilities_merged()
+    return jsonify(dict(worktree_pool().stats(), plumbing=git_plumbing().stats())), 200
 
  
 
-        existing_ids = {str(u.get('id')) for u in existing if u.get('id')}
+ 
 
  
 
-        new_id = new_util.get('id') or _generate_id(existing_ids, new_util.get('title', ''))
+@app.route(f"/{APP_NAME}/api/github/stats")
 
  
 
-        while new_id in existing_ids:
+def github_api_stats():
 
  
 
-            new_id = f"{new_id}-{uuid.uuid4().hex[:6]}"
+    """Per-endpoint GitHub API call counts, retries and latency, plus the last rate-limit headers."""
 
  
 
-        new_util['id'] = new_id
+    return jsonify(github_client().stats()), 200
 
  
 
-        if 'utility_tools_number' not in new_util and 'mcp_tools_number' in new_util:
+ 
 
  
 
-            new_util['utility_tools_number'] = new_util['mcp_tools_number']
+@app.route(f"/{APP_NAME}/api/pr/metrics")
 
  
 
-    except Exception as e:
+def pr_pipeline_metrics():
 
  
 
-        import traceback
+    """p50/p95/p99 latency per PR pipeline step (fetch, commit, push, create PR, ...) and per submission."""
 
  
 
-        return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
+    return jsonify({'stages': pipeline_metrics().snapshot(), 'jobs': _pr_jobs.stats()}), 200
 
  
 
@@ -1395,91 +3275,95 @@ def get_or_create_utilities():
 
  
 
-    # Defer writing to local dashboard; changes via PR service only
+@app.route(f"/{APP_NAME}/api/webhooks/deliveries")
 
  
 
-    source_branch = os.getenv('AUTON_SOURCE_BRANCH', 'utility-test')
+def list_webhook_deliveries():
 
  
 
-    target_branch = os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962')
+    """Recent CI webhook deliveries with their attempts; ?status=pending|failed|delivered filters."""
 
  
 
-    author = str(new_util.get('committer') or 'unknown')
+    status = request.args.get('status') or None
 
  
 
-    files_changed = [f"automation_ui/static/utilities/{new_id}.json"]
+    if status not in (None, 'pending', 'delivering', 'delivered', 'failed'):
 
  
 
-    _trigger_pr_stub(target_branch, files_changed, author)
+        return jsonify({'error': f'Invalid status: {status}'}), 400
 
  
 
- 
+    try:
 
  
 
-    # Derive commit message for PR title: prefer last commit; fallback to utility title
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
 
  
 
-    commit_title = f"CDMS-6962:{new_util.get('title') or new_id}"
+    except ValueError:
 
  
 
- 
+        return jsonify({'error': 'Invalid limit'}), 400
 
  
 
-    # Create PR using fresh GitHub PR logic
+    return jsonify({'deliveries': _webhooks.deliveries(status, limit), 'stats': _webhooks.stats()}), 200
 
  
 
-    try:
+ 
 
  
 
-        pr_result = create_utility_pr(new_util=new_util,
+@app.route(f"/{APP_NAME}/api/webhooks/deliveries/<delivery_id>/retry", methods=['POST'])
 
  
 
-                                      new_id=new_id,
+def retry_webhook_delivery(delivery_id: str):
 
  
 
-                                      file_rel_path=files_changed[0],
+    """Queue a failed delivery again with a fresh attempt budget."""
 
  
 
-                                      source_branch=source_branch,
+    if not _webhooks.retry(delivery_id):
 
  
 
-                                      target_branch=target_branch,
+        return jsonify({'error': f'No failed delivery: {delivery_id}'}), 404
 
  
 
-                                      commit_message=commit_title)
+    return jsonify({'id': delivery_id, 'status': 'pending'}), 202
 
  
 
-    except Exception as e:
+ 
 
  
 
-        pr_result = {'ok': False, 'error': str(e)}
+@app.route(f"/{APP_NAME}/api/pr/events")
 
  
 
+def list_pr_events():
+
  
 
+    """Recent PR triggers and attempts, newest first; ?utility=<id> and ?since=<ISO time or epoch> filter."""
+
  
 
-    # Persist a diagnostic snapshot of PR steps to static for quick inspection
+    since = request.args.get('since')
 
  
 
@@ -1487,523 +3371,531 @@ def get_or_create_utilities():
 
  
 
-        diag = {
+        since = parse_since(since) if since else None
 
  
 
-            'status': 'pr_attempt',
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
 
  
 
-            'id': new_id,
+    except ValueError:
 
  
 
-            'file': files_changed[0],
+        return jsonify({'error': 'Invalid since or limit'}), 400
 
  
 
-            'source_branch': source_branch,
+    events = _pr_events.events(request.args.get('utility') or None, since, limit)
 
  
 
-            'target_branch': target_branch,
+    return jsonify({'events': events, 'stats': _pr_events.stats()}), 200
 
  
 
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+ 
 
  
 
-            'pr_result': pr_result
+@app.route(f"/{APP_NAME}/api/pr/jobs")
 
  
 
-        }
+def list_pr_jobs():
 
  
 
-        with open(os.path.join(STATIC_DIR, 'last_pr_event.json'), 'w', encoding='utf-8') as f:
+    """Most recent PR jobs (without payloads) and queue counters."""
 
  
 
-            json.dump(diag, f, indent=2)
+    try:
 
  
 
-    except Exception:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
 
  
 
-        pass
+    except ValueError:
 
  
 
- 
+        return jsonify({'error': 'Invalid limit'}), 400
 
  
 
-    # Optional webhook for CI orchestration
+    return jsonify({'jobs': _pr_jobs.recent(limit), 'stats': _pr_jobs.stats()}), 200
 
  
 
-    repo_url = os.getenv('AUTON_REPO_URL', 'https://alm-github.systems.uk.hsbc/GDT-CDMS/automation_utilities')
+ 
 
  
 
-    pr_event = {
+@app.route(f"/{APP_NAME}/api/pr/jobs/<job_id>")
 
  
 
-        'action': 'create_pr',
+def get_pr_job(job_id: str):
 
  
 
-        'target_branch': target_branch,
+    """Status, live steps and (once finished) the PR result of one submission."""
 
  
 
-        'source_branch': source_branch,
+    job = _pr_jobs.get(job_id)
 
  
 
-        'repository': repo_url,
+    if job is None:
 
  
 
-        'files_changed': files_changed,
+        return jsonify({'error': f'PR job not found: {job_id}'}), 404
 
  
 
-        'commit_message': commit_title,
+    job.pop('payload', None)
 
  
 
-        'author': author,
+    return jsonify(job), 200
 
  
 
-        'utility': new_util
+ 
 
  
 
-    }
+@app.route(f"/{APP_NAME}/static/<path:filename>")
 
  
 
-    webhook_ok, webhook_msg = _send_ci_webhook(pr_event)
+def static_proxy(filename):
 
  
 
- 
+    return _send_asset(_static_assets, filename)
 
  
 
-    # Shape the response to include PR steps and any errors for UI/diagnostics
+ 
 
  
 
-    return jsonify({'status': 'submitted-for-review',
+# Flask's own static rule matches the same URLs first; serve them through static_proxy too
 
  
 
-                    'id': new_id,
+app.view_functions['static'] = static_proxy
 
  
 
-                    'file': files_changed[0],
+ 
 
  
 
-                    'source_branch': source_branch,
+def _load_utilities():
 
  
 
-                    'target_branch': target_branch,
+    # Legacy helper kept for details view; now delegates to merged loader
 
  
 
-                    'files_changed': files_changed,
+    return _load_utilities_merged()
 
  
 
-                    'repository': repo_url,
+ 
 
  
 
-                    'commit_message': commit_title,
+@app.route(f"/{APP_NAME}/api/utilities/search")
 
  
 
-                    'pr': {
+def search_utilities():
 
  
 
-                        'ok': pr_result.get('ok', False),
+    """Ranked keyword search (BM25, prefix matching) with <mark> highlights."""
 
  
 
-                        'error': pr_result.get('error'),
+    q = (request.args.get('q') or '').strip()
 
  
 
-                        'steps': pr_result.get('steps', []),
+    if not q:
 
  
 
-                        'pr': pr_result.get('pr'),
+        return jsonify({'error': 'Missing query parameter: q'}), 400
 
  
 
-                        'pr_raw': pr_result.get('pr_raw')
+    try:
 
  
 
-                    },
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
 
  
 
-                    'webhook': {'ok': webhook_ok, 'message': webhook_msg}}), 201
+    except ValueError:
 
  
 
- 
+        return jsonify({'error': 'Invalid limit'}), 400
 
  
 
-# Icon upload endpoint removed
+    # Listeners bring the search index up to date on revalidation; holding the
 
  
 
- 
+    # catalog lock keeps the index at the snapshot's version while we search
 
  
 
-@app.route(f"/{APP_NAME}/api/pr/trigger", methods=['POST'])
+    with _catalog.reading() as snap:
 
  
 
-def trigger_pr():
+        hits = _search_index.search(q, limit=limit)
 
  
 
-    """Optional endpoint to be called by UI or CI to trigger PR creation.
+    def build():
 
  
 
-    This is a stub that records the intent. Wire this to your pipeline.
+        return {'query': q,
 
  
 
-    """
+                'count': len(hits),
 
  
 
-    payload = request.get_json(force=True) or {}
+                'results': [{'id': hit['item'].get('id'),
 
  
 
-    branch = payload.get('branch') or os.getenv('AUTOMATION_PR_BRANCH', 'DataP_automation_utility_dashboard')
+                             'score': hit['score'],
 
  
 
-    files = payload.get('files_changed') or []
+                             'highlights': hit['highlights'],
 
  
 
-    author = payload.get('author') or 'unknown'
+                             'utility': hit['item']} for hit in hits]}
 
  
 
-    _trigger_pr_stub(branch, files, author)
+    return _catalog_response(snap, build, variant=f"search:{limit}:{q}")
 
  
 
-    return jsonify({'status': 'queued', 'branch': branch, 'files_changed': files}), 202
-
  
 
  
 
  
 
-@app.route(f"/{APP_NAME}/static/<path:filename>")
+@app.route(f"/{APP_NAME}/api/utilities/changes")
 
  
 
-def static_proxy(filename):
+def utility_changes():
 
  
 
-    return send_from_directory(app.static_folder, filename)
+    """Delta between the catalog version a client holds and the current one.
 
  
 
- 
+    `since` is a version previously returned as the ETag / `version`. Added and
+
+    modified utilities are returned in full, removed ones by id. If `since` has
+
+    aged out of the catalog history the response carries resync=true and the
+
+    client should re-fetch /api/utilities.
 
  
 
-def _load_utilities():
+    """
 
  
 
-    # Legacy helper kept for details view; now delegates to merged loader
+    since = (request.args.get('since') or '').strip().strip('"')
 
  
 
-    return _load_utilities_merged()
+    if not since:
 
  
 
+        return jsonify({'error': 'Missing query parameter: since'}), 400
+
  
 
+    with _catalog.reading() as snap:
+
  
 
-@app.route(f"/{APP_NAME}/api/utilities/<utility_id>", methods=['PUT'])
+        delta = _catalog.changes_since(since, snap)
 
  
 
-def update_utility(utility_id: str):
+    if delta is None:
 
  
 
-    """Update an existing utility and create a PR with the changes."""
+        return jsonify({'since': since, 'version': snap.version, 'resync': True})
 
  
 
-    try:
+    def build():
 
  
 
-        update_data = request.get_json(force=True)
+        index = snap.index
 
  
 
-        if not isinstance(update_data, dict):
+        return {'since': since,
 
  
 
-            return jsonify({'error': 'Invalid payload'}), 400
+                'version': delta['version'],
 
  
 
-        # Validate required fields
+                'resync': False,
 
  
 
-        ok, err = _validate_new_utility(update_data)
+                'added': [index.by_id[uid] for uid in delta['added'] if uid in index.by_id],
 
  
 
-        if not ok:
+                'modified': [index.by_id[uid] for uid in delta['modified'] if uid in index.by_id],
 
  
 
-            return jsonify({'error': err}), 400
+                'removed': delta['removed']}
 
  
 
-        # Ensure the ID matches
+    return _catalog_response(snap, build, variant=f"changes:{since}")
 
  
 
-        update_data['id'] = utility_id
+ 
 
  
 
-        # Auto-set icon if missing
+@app.route(f"/{APP_NAME}/api/utilities/<utility_id>", methods=['GET'])
 
  
 
-        update_data['icon_url'] = _auto_icon_url(update_data)
+def get_utility(utility_id: str):
 
  
 
-        # Prepare for PR creation
+    """Return a single utility by id, title or slug."""
 
  
 
-        source_branch = os.getenv('AUTON_SOURCE_BRANCH', 'utility-test')
+    snap = _catalog.snapshot()
 
  
 
-        target_branch = os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962')
+    util = snap.index.get(utility_id)
 
  
 
-        author = str(update_data.get('committer') or 'unknown')
+    if util is None:
 
  
 
-        files_changed = [f"automation_ui/static/utilities/{utility_id}.json"]
+        return jsonify({'error': f'Utility not found: {utility_id}'}), 404
 
  
 
-        # Commit message for update
+    return _catalog_response(snap, lambda: util)
 
  
 
-        commit_title = f"CDMS-6962:EDIT:{update_data.get('title') or utility_id}"
+ 
 
  
 
-        # Create PR using GitHub PR service
+@app.route(f"/{APP_NAME}/api/utilities/<utility_id>", methods=['PUT'])
 
  
 
-        try:
+def update_utility(utility_id: str):
 
  
 
-            pr_result = create_utility_pr(new_util=update_data,
+    """Update an existing utility and create a PR with the changes."""
 
  
 
-                                          new_id=utility_id,
+    try:
 
  
 
-                                          file_rel_path=files_changed[0],
+        update_data = request.get_json(force=True)
 
  
 
-                                          source_branch=source_branch,
+        if not isinstance(update_data, dict):
 
  
 
-                                          target_branch=target_branch,
+            return jsonify({'error': 'Invalid payload'}), 400
 
  
 
-                                          commit_message=commit_title)
+        # Validate required fields
 
  
 
-        except Exception as e:
+        ok, err = _validate_new_utility(update_data)
 
  
 
-            pr_result = {'ok': False, 'error': str(e)}
+        if not ok:
 
  
 
-        # Save diagnostic info
+            return jsonify({'error': err}), 400
 
  
 
-        try:
+        # Resolve id/title/slug to the stored utility via the catalog index
 
  
 
-            diag = {
+        existing = _catalog.index().get(utility_id)
 
  
 
-                'status': 'pr_update_attempt',
+        if existing is None:
 
  
 
-                'id': utility_id,
+            return jsonify({'error': f'Utility not found: {utility_id}'}), 404
 
  
 
-                'file': files_changed[0],
+        utility_id = str(existing.get('id'))
 
  
 
-                'source_branch': source_branch,
+        # Ensure the ID matches
 
  
 
-                'target_branch': target_branch,
+        update_data['id'] = utility_id
 
  
 
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
+        # Auto-set icon if missing
 
  
 
-                'pr_result': pr_result
+        update_data['icon_url'] = _auto_icon_url(update_data)
 
  
 
-            }
+        # Prepare for PR creation
 
  
 
-            with open(os.path.join(STATIC_DIR, 'last_pr_event.json'), 'w', encoding='utf-8') as f:
+        source_branch = os.getenv('AUTON_SOURCE_BRANCH', 'utility-test')
 
  
 
-                json.dump(diag, f, indent=2)
+        target_branch = os.getenv('AUTON_TARGET_BRANCH', 'CDMS-6962')
 
  
 
-        except Exception:
+        author = str(update_data.get('committer') or 'unknown')
 
  
 
-            pass
+        files_changed = [f"automation_ui/static/utilities/{utility_id}.json"]
 
  
 
-        repo_url = os.getenv('AUTON_REPO_URL', 'https://alm-github.systems.uk.hsbc/GDT-CDMS/automation_utilities')
+        # Commit message for update
 
  
 
-        return jsonify({'status': 'updated',
+        commit_title = f"CDMS-6962:EDIT:{update_data.get('title') or utility_id}"
 
  
 
-                        'id': utility_id,
+        repo_url = os.getenv('AUTON_REPO_URL', 'https://alm-github.systems.uk.hsbc/GDT-CDMS/automation_utilities')
 
  
 
-                        'file': files_changed[0],
+        # Create the PR in the background; the client polls the job for steps and PR metadata
 
  
 
-                        'source_branch': source_branch,
+        # (once per Idempotency-Key / identical edit, so a resent PUT does not open a second PR)
 
  
 
-                        'target_branch': target_branch,
+        return _submit_once(f'update:{utility_id}', update_data,
 
  
 
-                        'repository': repo_url,
+                            lambda: _queue_pr_job('update', {'utility': update_data,
 
  
 
-                        'commit_message': commit_title,
+                                                             'id': utility_id,
 
  
 
-                        'pr': {
+                                                             'file': files_changed[0],
 
  
 
-                            'ok': pr_result.get('ok', False),
+                                                             'files_changed': files_changed,
 
  
 
-                            'error': pr_result.get('error'),
+                                                             'source_branch': source_branch,
 
  
 
-                            'steps': pr_result.get('steps', []),
+                                                             'target_branch': target_branch,
 
  
 
-                            'pr': pr_result.get('pr'),
+                                                             'repository': repo_url,
 
  
 
-                            'pr_raw': pr_result.get('pr_raw')
+                                                             'commit_message': commit_title,
 
  
 
-                        }}), 200
+                                                             'author': author}))
 
  
 
@@ -2031,43 +3923,46 @@ def utility_details(utility_id: str):
 
  
 
-    data = _load_utilities()
+    util = _catalog.index().get(utility_id)
 
  
 
-    util = None
+    return render_template('utility_details.html', utility=util, app_name=APP_NAME)
 
- 
 
-    for item in data:
 
- 
 
-        if str(item.get('id')) == utility_id or item.get('title') == utility_id:
+def allowed_file(filename):
 
  
 
-            util = item
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
  
 
-            break
+ 
 
  
 
-    return render_template('utility_details.html', utility=util, app_name=APP_NAME)
+# Icons are stored once per content hash, with a downscaled variant for the cards
 
+ 
 
+_icons = IconStore(ICONS_DIR,
 
+ 
 
-def allowed_file(filename):
+                   max_bytes=int(os.getenv('AUTON_ICON_MAX_BYTES', str(2 * 1024 * 1024))),
 
  
 
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+                   size=int(os.getenv('AUTON_ICON_SIZE', '128')))
 
+ 
 
+ 
 
+ 
 
 @app.route(f"/{APP_NAME}/api/upload-icon", methods=['POST'])
 
@@ -2077,7 +3972,21 @@ def upload_icon():
 
  
 
-    """Handle icon image upload and return the URL."""
+    """Handle icon image upload and return the URL (the existing one for a duplicate)."""
+
+ 
+
+    # Refuse oversized bodies before the multipart parser spools them
+
+ 
+
+    if request.content_length and request.content_length > _icons.max_bytes + 64 * 1024:
+
+ 
+
+        return jsonify({'error': f'File too large. Maximum size is {_icons.max_bytes // 1024} KB.'}), 413
+
+ 
 
  
 
@@ -2089,16 +3998,12 @@ def upload_icon():
 
  
 
-   
-
  
 
     file = request.files['icon']
 
  
 
-   
-
  
 
     if file.filename == '':
@@ -2109,8 +4014,6 @@ def upload_icon():
 
  
 
-   
-
  
 
     if not allowed_file(file.filename):
@@ -2121,91 +4024,83 @@ def upload_icon():
 
  
 
-   
-
  
 
     try:
 
  
 
-        # Generate unique filename
-
- 
-
-        filename = secure_filename(file.filename)
+        icon = _icons.save(file.stream, secure_filename(file.filename))
 
  
 
-        name, ext = os.path.splitext(filename)
+    except IconTooLarge as e:
 
  
 
-        unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
+        return jsonify({'error': str(e)}), 413
 
  
 
-       
+    except InvalidIcon as e:
 
  
 
-        # Save file
+        return jsonify({'error': str(e)}), 400
 
  
 
-        filepath = os.path.join(ICONS_DIR, unique_filename)
+    except Exception as e:
 
  
 
-        file.save(filepath)
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
  
 
-       
-
  
 
-        # Return URL relative to static directory
+    # URLs are relative to the app root, like before
 
  
 
-        icon_url = f"static/icons/{unique_filename}"
+    return jsonify({
 
  
 
-       
+        'success': True,
 
  
 
-        return jsonify({
+        'url': icon['url'],
 
  
 
-            'success': True,
+        'filename': icon['filename'],
 
  
 
-            'url': icon_url,
+        'original_url': icon['original_url'],
 
  
 
-            'filename': unique_filename
+        'variants': icon['variants'],
 
  
 
-        }), 200
+        'sha256': icon['sha256'],
 
  
 
-   
+        'bytes': icon['bytes'],
 
  
 
-    except Exception as e:
+        'duplicate': icon['duplicate']
 
  
 
-        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+    }), 200
 
  
 
@@ -2979,6 +4874,96 @@ Automation Team
 
  
 
+# Background workers (repo sync, webhook dispatcher, PR job executor) run only in
+
+ 
+
+# a serving process: importing app (tests, scripts, the debug reloader's watcher)
+
+ 
+
+# starts no threads and touches no jobs.
+
+ 
+
+_background_lock = threading.Lock()
+
+ 
+
+_background_started = False
+
+ 
+
+def start_background_workers():
+
+ 
+
+    """Start the repo sync worker, webhook dispatcher and PR job executor, once per process.
+
+    Runs before the first request is handled; a WSGI server that wants them up
+
+    before traffic arrives (e.g. from a gunicorn post_fork hook) can call it directly.
+
+    """
+
+ 
+
+    global _background_started
+
+ 
+
+    with _background_lock:
+
+ 
+
+        if _background_started:
+
+ 
+
+            return
+
+ 
+
+        _background_started = True
+
+ 
+
+    if os.getenv('AUTON_REPO_SYNC', os.getenv('AUTON_REFRESH_ON_GET', 'true')).lower() in ('1', 'true', 'yes'):
+
+ 
+
+        _repo_sync.start()
+
+ 
+
+    _webhooks.start()
+
+ 
+
+    # Resumes jobs left queued by a previous run or orphaned by a dead process
+
+ 
+
+    _pr_jobs.start()
+
+ 
+
+@app.before_request
+
+ 
+
+def _ensure_background_workers():
+
+ 
+
+    if not _background_started:
+
+ 
+
+        start_background_workers()
+
+ 
+
 if __name__ == '__main__':
 
  
@@ -2987,4 +4972,17 @@ if __name__ == '__main__':
 
  
 
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    # With debug=True the reloader re-runs this module in a child process; only the child serves
+
+ 
+
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+
+ 
+
+        start_background_workers()
+
+ 
+
+    app.run(host='0.0.0.0', port=port, debug=True)
+
@@ -0,0 +1,121 @@
+"""Cold-load benchmark for the utility catalog.
+
+Generates N realistic per-utility JSON files in a temp directory and times:
+  legacy      sequential os.listdir + json.load per file (the old loader)
+  serial      UtilityCatalog with one worker and the stdlib json backend
+  parallel    UtilityCatalog with a thread pool and the default backend
+  snapshot    UtilityCatalog cold start from a compiled snapshot
+
+Usage: python benchmarks/bench_catalog_load.py [--sizes 100,1000,10000] [--workers 8]
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import fast_json  # noqa: E402
+from services import utility_catalog  # noqa: E402
+
+
+def _make_item(i: int) -> dict:
+    rng = random.Random(i)
+    words = ['deploy', 'pipeline', 'mcp', 'server', 'report', 'jenkins', 'python', 'data',
+             'release', 'monitor', 'sync', 'backup', 'audit', 'teambook', 'lttd']
+    return {
+        'id': f'util-{i}',
+        'title': f"{rng.choice(words).title()} {rng.choice(words)} {i}",
+        'description': ' '.join(rng.choice(words) for _ in range(60)),
+        'developer': f'team-{i % 40}',
+        'committer': f'user{i % 300}@example.com',
+        'server_url': f'https://example.com/{i}',
+        'source_code_url': f'https://github.example.com/org/repo-{i}',
+        'type': rng.choice(['MCP', 'CI/CD', 'Script', 'Dashboard']),
+        'source_language': rng.choice(['Python', 'Java', 'Groovy', 'Bash']),
+        'status': rng.choice(['active', 'beta', 'deprecated']),
+        'playbook': '\n'.join(f'step {n}: ' + ' '.join(rng.choice(words) for _ in range(12)) for n in range(15)),
+        'likes': rng.randint(0, 500),
+        'utility_tools_number': rng.randint(0, 30),
+    }
+
+
+def _populate(directory: str, count: int) -> None:
+    for i in range(count):
+        with open(os.path.join(directory, f'util_{i:05d}.json'), 'w', encoding='utf-8') as f:
+            json.dump(_make_item(i), f, indent=2)
+
+
+def _legacy_load(directory: str) -> list:
+    items = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                obj = json.load(f)
+            if isinstance(obj, dict):
+                items.append(obj)
+        except Exception:
+            continue
+    return items
+
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _catalog_load(directory: str, workers: int, snapshot_path=None):
+    def run():
+        catalog = utility_catalog.UtilityCatalog(directory, load_workers=workers, snapshot_path=snapshot_path)
+        items = catalog.items()
+        assert items
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    default_backend = fast_json.BACKEND
+    print(f"json backend: {default_backend} (stdlib forced for 'serial'), workers: {args.workers}")
+    print(f"{'files':>7} {'legacy ms':>10} {'serial ms':>10} {'parallel ms':>12} {'snapshot ms':>12}")
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        root = tempfile.mkdtemp(prefix='catalog-bench-')
+        try:
+            directory = os.path.join(root, 'utilities')
+            os.makedirs(directory)
+            _populate(directory, size)
+            legacy = _time(lambda: _legacy_load(directory), args.repeat)
+
+            os.environ['AUTON_JSON_BACKEND'] = 'json'
+            importlib.reload(fast_json)
+            serial = _time(_catalog_load(directory, 1), args.repeat)
+            os.environ.pop('AUTON_JSON_BACKEND')
+            importlib.reload(fast_json)
+
+            parallel = _time(_catalog_load(directory, args.workers), args.repeat)
+
+            snapshot_path = os.path.join(root, 'snapshot.json')
+            _catalog_load(directory, args.workers, snapshot_path)()  # compile once
+            snapshot = _time(_catalog_load(directory, args.workers, snapshot_path), args.repeat)
+            print(f"{size:>7} {legacy:>10.1f} {serial:>10.1f} {parallel:>12.1f} {snapshot:>12.1f}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
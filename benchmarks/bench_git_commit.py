@@ -0,0 +1,155 @@
+"""Process count and wall time of the git side of a PR submission.
+
+Creates a throwaway origin (bare) and clone holding N utility files, then
+commits and pushes one new utility file per submission three ways:
+  legacy      shell=True commands: rev-parse, worktree add into a temp dir,
+              add, diff --cached || commit, push, worktree remove
+  worktree    pooled worktree reset in place (AUTON_GIT_PLUMBING=false)
+  plumbing    objects written in-process, push of the commit id only
+
+Fetch is left out of all three (it is rate-limited and shared).
+Process counts include the shell and every git it runs for shell=True.
+
+Usage: python benchmarks/bench_git_commit.py [--files 2000] [--submissions 20]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.git_plumbing import GitPlumbing, run_git  # noqa: E402
+from services.worktree_pool import WorktreePool  # noqa: E402
+
+_spawned = [0]
+_Popen = subprocess.Popen
+
+
+class _CountingPopen(_Popen):
+    def __init__(self, args, *rest, **kwargs):
+        if kwargs.get('shell'):
+            _spawned[0] += 1 + str(args).count('git ')
+        else:
+            _spawned[0] += 1
+        super().__init__(args, *rest, **kwargs)
+
+
+def _sh(cmd: str, cwd: str) -> bool:
+    try:
+        subprocess.check_output(cmd, cwd=cwd, shell=True, stderr=subprocess.STDOUT)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def _make_repo(root: str, files: int) -> str:
+    origin = os.path.join(root, 'origin.git')
+    repo = os.path.join(root, 'repo')
+    run_git(['init', '--quiet', '--bare', '-b', 'main', origin], root)
+    run_git(['clone', '--quiet', origin, repo], root)
+    directory = os.path.join(repo, 'static', 'utilities')
+    os.makedirs(directory)
+    for i in range(files):
+        with open(os.path.join(directory, f'util_{i:05d}.json'), 'w', encoding='utf-8') as f:
+            json.dump({'id': f'util-{i}', 'title': f'Utility {i}', 'description': 'x' * 400}, f, indent=2)
+    run_git(['add', '.'], repo)
+    run_git(['-c', 'user.name=bench', '-c', 'user.email=bench@example', 'commit', '--quiet', '-m', 'init'], repo)
+    run_git(['push', '--quiet', 'origin', 'main'], repo)
+    return repo
+
+
+def _utility(tag: str, n: int):
+    util = {'id': f'{tag}-{n}', 'title': f'Bench "{tag}" {n}', 'description': 'y' * 400}
+    return util, f'static/utilities/{tag}_{n}.json'
+
+
+def _legacy(repo: str, n: int) -> bool:
+    util, path = _utility('legacy', n)
+    branch = f'main-legacy-{n}'
+    temp_dir = tempfile.mkdtemp(prefix='wt-')
+    shutil.rmtree(temp_dir)
+    _sh('git rev-parse --verify main', repo)
+    if not _sh(f'git worktree add -B {branch} "{temp_dir}" main', repo):
+        return False
+    try:
+        with open(os.path.join(temp_dir, path), 'w', encoding='utf-8') as f:
+            json.dump(util, f, indent=2)
+        _sh(f'git -C "{temp_dir}" add "{path}"', repo)
+        _sh(f'git -C "{temp_dir}" diff --cached --quiet || git -C "{temp_dir}" -c user.name="automation" '
+            f'-c user.email="automation@example" commit -m "chore: add utility {n}"', repo)
+        return _sh(f'git -C "{temp_dir}" push -u origin {branch}', repo)
+    finally:
+        _sh(f'git worktree remove --force "{temp_dir}"', repo)
+
+
+def _pooled(pool: WorktreePool):
+    def submit(repo: str, n: int) -> bool:
+        util, path = _utility('worktree', n)
+        branch = f'main-worktree-{n}'
+        with pool.checkout(branch, 'main') as temp_dir:
+            with open(os.path.join(temp_dir, path), 'w', encoding='utf-8') as f:
+                json.dump(util, f, indent=2)
+            run_git(['add', '--', path], temp_dir)
+            staged, _ = run_git(['diff', '--cached', '--quiet'], temp_dir)
+            if not staged:
+                run_git(['-c', 'user.name=automation', '-c', 'user.email=automation@example',
+                         'commit', '-m', f'chore: add utility {n}'], temp_dir)
+            ok, _ = run_git(['push', 'origin', f'HEAD:refs/heads/{branch}'], temp_dir)
+            return ok
+    return submit
+
+
+def _plumbing(git: GitPlumbing):
+    def submit(repo: str, n: int) -> bool:
+        util, path = _utility('plumbing', n)
+        sha, _ = git.commit_files('refs/remotes/origin/main',
+                                  {path: json.dumps(util, indent=2).encode('utf-8')}, f'chore: add utility {n}')
+        ok, _ = run_git(['push', 'origin', f'{sha}:refs/heads/main-plumbing-{n}'], repo)
+        return ok
+    return submit
+
+
+def _measure(submit, repo: str, count: int):
+    _spawned[0] = 0
+    started = time.perf_counter()
+    for n in range(count):
+        if not submit(repo, n):
+            raise SystemExit(f'submission {n} failed')
+    return (time.perf_counter() - started) * 1000, _spawned[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--submissions', type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='git-bench-')
+    try:
+        repo = _make_repo(root, args.files)
+        pool = WorktreePool(repo, os.path.join(root, 'worktrees'), run_git, size=1)
+        git = GitPlumbing(repo)
+        subprocess.Popen = _CountingPopen
+        try:
+            rows = [('legacy', _measure(_legacy, repo, args.submissions)),
+                    ('worktree', _measure(_pooled(pool), repo, args.submissions)),
+                    ('plumbing', _measure(_plumbing(git), repo, args.submissions))]
+        finally:
+            subprocess.Popen = _Popen
+            git.close()
+        print(f"{args.files} files in repo, {args.submissions} submissions")
+        print(f"{'flow':>9} {'total ms':>10} {'ms/submit':>10} {'processes':>10} {'proc/submit':>12}")
+        for name, (ms, spawned) in rows:
+            print(f"{name:>9} {ms:>10.1f} {ms / args.submissions:>10.1f} {spawned:>10} "
+                  f"{spawned / args.submissions:>12.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Serialization time and size of the largest JSON responses, per provider.
+
+Builds realistic payloads and times jsonify()-equivalent Response creation
+with:
+  flask       Flask's DefaultJSONProvider (stdlib, ASCII-escaped, sorted keys;
+              what the app used before)
+  stdlib      FastJSONProvider with orjson disabled (non-ASCII kept, compact)
+  orjson      FastJSONProvider with orjson (skipped when not installed)
+
+Payloads:
+  lttd        POST /api/lttd/records: records + no_lttd_records + grouped_no_lttd
+  releases    the Release calendar's full release list
+  catalog     GET /api/utilities: every utility in the catalog
+
+Usage: python benchmarks/bench_json_provider.py [--records 2000] [--releases 500]
+           [--utilities 1000] [--repeat 20]
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from benchmarks.bench_catalog_load import _make_item  # noqa: E402
+from services import fast_json  # noqa: E402
+from services.json_provider import FastJSONProvider  # noqa: E402
+
+_SERVICES = ['Payments Gateway', 'Données Clients', 'Risk Engine', 'Zürich Ledger', 'Trade Capture',
+             'Customer 360', 'Ingestion Hub', 'Reporting Mart']
+_HURDLES = ['LTTD Successfully Calculated', 'No linked commits', 'Change not deployed', 'Missing pipeline data']
+
+
+def _lttd_record(rng: random.Random, i: int) -> dict:
+    days = round(rng.uniform(0, 60), 2)
+    return {
+        'change_request_number': f'CR{4_000_000 + i}',
+        'change_title': f'Release {i} of {rng.choice(_SERVICES)} — configuration and schema updates',
+        'business_service': rng.choice(_SERVICES),
+        'l4_business_unit': 'Data Assets&Provisioning Tech',
+        'l7_business_unit': 'Data Assets&Provisioning Tech',
+        'teambook_id': f'TB-{rng.randint(1000, 9999)}',
+        'team_name': f'Squad {rng.randint(1, 40)}',
+        'implementation_start': f'2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T09:30:00Z',
+        'first_commit_date': f'2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T14:12:45Z',
+        'lead_time_to_deploy_numeric_days': days,
+        'lead_time_to_deploy': f'{days} days',
+        'LTTDEligible': rng.random() < 0.7,
+        'CRProcessingHurdle': rng.choice(_HURDLES),
+        'repositories': [f'https://github.example.com/org/repo-{rng.randint(1, 500)}' for _ in range(rng.randint(1, 4))],
+        'commit_count': rng.randint(1, 120),
+        'assignee': f'user{rng.randint(1, 400)}@example.com',
+    }
+
+
+def lttd_payload(count: int) -> dict:
+    """Shaped like fetch_lttd_records()'s response."""
+    rng = random.Random(7)
+    all_records = [_lttd_record(rng, i) for i in range(count)]
+    records = [r for r in all_records if r['lead_time_to_deploy_numeric_days'] > 15]
+    no_lttd = [r for r in all_records if r['LTTDEligible'] and r['CRProcessingHurdle'] != 'LTTD Successfully Calculated']
+    grouped = defaultdict(list)
+    for r in no_lttd:
+        grouped[r['business_service']].append(r)
+    grouped_list = sorted(({'app_name': k, 'count': len(v), 'records': v} for k, v in grouped.items()),
+                          key=lambda x: (-x['count'], x['app_name']))
+    return {'status': 'success', 'records': records, 'count': len(records), 'total_before_filter': count,
+            'no_lttd_records': no_lttd, 'no_lttd_count': len(no_lttd), 'grouped_no_lttd': grouped_list,
+            'filter_applied': 'LTTD Days > 15 AND DTT = "Data Assets&Provisioning Tech"'}
+
+
+def releases_payload(count: int) -> list:
+    """Shaped like Release-page database.get_all_releases()."""
+    rng = random.Random(11)
+    steps = ['codeFreeze', 'dryRunDone', 'changeApproved', 'rollbackPlan', 'smokeTests', 'stakeholdersNotified']
+    return [{
+        'id': f'rel-{i:05d}',
+        'teamName': f'Squad {rng.randint(1, 40)}',
+        'appName': rng.choice(_SERVICES),
+        'releaseDate': f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'dryRunDate': f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'contactPerson': f'Owner {i}',
+        'contactEmail': f'owner{i}@example.com',
+        'additionalNotes': 'Déploiement coordonné avec l’équipe réseau; ' * rng.randint(1, 4),
+        'checklist': {s: rng.random() < 0.5 for s in steps},
+        'createdAt': '2026-01-05T10:00:00',
+        'updatedAt': '2026-02-11T16:45:00',
+        'repositories': [{'name': f'repo-{n}', 'url': f'https://github.example.com/org/repo-{n}'}
+                         for n in rng.sample(range(500), rng.randint(1, 5))],
+    } for i in range(count)]
+
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _providers():
+    """(name, app) pairs; the stdlib one is measured with orjson disabled via AUTON_JSON_BACKEND."""
+    stock = Flask('stock')
+    stock.json = DefaultJSONProvider(stock)
+    yield 'flask', stock
+    fast = Flask('fast')
+    fast.json = FastJSONProvider(fast)
+    os.environ['AUTON_JSON_BACKEND'] = 'json'
+    importlib.reload(fast_json)
+    yield 'stdlib', fast
+    os.environ.pop('AUTON_JSON_BACKEND')
+    importlib.reload(fast_json)
+    if fast_json.BACKEND == 'orjson':
+        yield 'orjson', fast
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=2000, help='LTTD records before filtering')
+    parser.add_argument('--releases', type=int, default=500)
+    parser.add_argument('--utilities', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {'lttd': lttd_payload(args.records),
+                'releases': releases_payload(args.releases),
+                'catalog': [_make_item(i) for i in range(args.utilities)]}
+    print(f"{'payload':>9} {'provider':>9} {'ms':>8} {'KiB':>8} {'speedup':>8}")
+    for name, payload in payloads.items():
+        baseline = None
+        for provider, app in _providers():
+            with app.app_context():
+                ms = _time(lambda: app.json.response(payload), args.repeat)
+                size = len(app.json.response(payload).get_data())
+            baseline = baseline or ms
+            print(f"{name:>9} {provider:>9} {ms:>8.2f} {size / 1024:>8.1f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
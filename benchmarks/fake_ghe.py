@@ -0,0 +1,336 @@
+"""Local stand-in for the GitHub Enterprise REST API used by the PR service.
+
+Serves /api/v3/repos/{owner}/{repo}/... on top of a local bare repository,
+so the git-worktree flow (pushing to the bare repo as `origin`) and the
+API-only flow (REST calls) write to the same branches:
+
+  GET   git/ref/heads/{branch}      ETag / If-None-Match -> 304
+  GET   git/commits/{sha}
+  POST  git/trees, git/commits      (batch submissions)
+  POST  git/refs                    422 "Reference already exists"
+  PATCH git/refs/heads/{branch}
+  GET   contents/{path}?ref=        ETag / If-None-Match -> 304
+  PUT   contents/{path}
+  POST  pulls                       422 if a PR for the head is already open
+
+Every response carries X-RateLimit-* headers; once the budget for the
+current window is spent, requests get 403 "API rate limit exceeded" until
+the window resets (304s are free, as on GitHub). Latency and transient
+errors (502/503 with Retry-After) can be injected.
+
+Usage: python benchmarks/fake_ghe.py --origin /path/to/origin.git [--port 8090]
+           [--latency-ms 50] [--jitter-ms 20] [--error-rate 0.02] [--rate-limit 5000]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.git_plumbing import GitPlumbing, run_git  # noqa: E402
+
+_PATH_RE = re.compile(r'^/api/v3/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/(?P<rest>.+)$')
+
+
+def make_origin(path: str, branch: str = 'main', files=None) -> str:
+    """Create a bare repo at path whose branch holds files ({rel_path: text}); returns path."""
+    run_git(['init', '--quiet', '--bare', '-b', branch, path], os.path.dirname(path) or '.')
+    git = GitPlumbing(path)
+    try:
+        tree = git.write_tree(None, {p: text.encode('utf-8') for p, text in (files or {'README.md': 'seed\n'}).items()})
+        commit = git.write_commit(tree, [], 'seed')
+    finally:
+        git.close()
+    run_git(['update-ref', f'refs/heads/{branch}', commit], path)
+    return path
+
+
+class FakeGHE:
+    """Threaded fake API server; start() returns the base URL to use as GITHUB_API_BASE."""
+
+    def __init__(self, origin: str, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 retry_after: float = 0.0, rate_limit: int = 5000, rate_window: float = 3600.0,
+                 seed=None):
+        self.origin = origin
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.git = GitPlumbing(origin)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Ref updates and PR numbering are serialized like on the real server
+        self._write_lock = threading.Lock()
+        self._window_start = time.time()
+        self._used = 0
+        self._pulls = {}
+        self.counters = {'requests': 0, 'not_modified': 0, 'injected_errors': 0, 'rate_limited': 0}
+        self.by_endpoint = {}
+        handler = type('Handler', (_Handler,), {'server_state': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.git.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, by_endpoint=dict(self.by_endpoint), pulls=len(self._pulls))
+
+    # -- request plumbing -------------------------------------------------
+
+    def count(self, name: str, endpoint: str = None) -> None:
+        with self._lock:
+            self.counters[name] += 1
+            if endpoint:
+                self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def rate_headers(self, spend: bool) -> Tuple[bool, dict]:
+        """Charge one request against the window; (allowed, X-RateLimit-* headers)."""
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._used = now, 0
+            allowed = self._used < self.rate_limit
+            if allowed and spend:
+                self._used += 1
+            headers = {'X-RateLimit-Limit': str(self.rate_limit),
+                       'X-RateLimit-Remaining': str(max(0, self.rate_limit - self._used)),
+                       'X-RateLimit-Used': str(self._used),
+                       'X-RateLimit-Reset': str(int(self._window_start + self.rate_window))}
+        return allowed, headers
+
+    def delay(self) -> None:
+        ms = self.latency_ms + (self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def inject_error(self) -> bool:
+        return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    # -- git state --------------------------------------------------------
+
+    def ref_sha(self, branch: str):
+        return self.git.resolve(f'refs/heads/{branch}')
+
+    def update_ref(self, branch: str, sha: str, old: str = None) -> bool:
+        args = ['update-ref', f'refs/heads/{branch}', sha] + ([old] if old else [])
+        ok, _ = run_git(args, self.origin)
+        return ok
+
+    def open_pull(self, head: str, base: str, title: str):
+        with self._write_lock:
+            if head in self._pulls:
+                return None
+            number = len(self._pulls) + 1
+            self._pulls[head] = {'number': number, 'head': head, 'base': base, 'title': title}
+            return number
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_state: FakeGHE = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def _send(self, status: int, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str):
+        state = self.server_state
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        state.delay()
+        url = urlparse(self.path)
+        m = _PATH_RE.match(url.path)
+        if not m:
+            return self._send(404, {'message': 'Not Found'})
+        rest = unquote(m.group('rest'))
+        endpoint = f"{method} {'/'.join(rest.split('/')[:2]) if rest.startswith('git/') else rest.split('/')[0]}"
+        state.count('requests', endpoint)
+        if state.inject_error():
+            state.count('injected_errors')
+            return self._send(state.error_status, {'message': 'injected failure'},
+                              {'Retry-After': str(state.retry_after)})
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            return self._send(400, {'message': 'Problems parsing JSON'})
+        # Refuse before touching any state, so a rejected write can safely be retried
+        allowed, rate = state.rate_headers(spend=False)
+        if not allowed:
+            state.count('rate_limited')
+            return self._send(403, {'message': 'API rate limit exceeded'}, rate)
+        status, payload, headers = self._route(method, rest, parse_qs(url.query), body)
+        _, rate = state.rate_headers(spend=status != 304)
+        if status == 304:
+            state.count('not_modified')
+        self._send(status, payload, dict(rate, **headers))
+
+    def _conditional(self, etag: str, payload):
+        if self.headers.get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+        return 200, payload, {'ETag': etag}
+
+    def _route(self, method: str, rest: str, query: dict, body: dict):
+        state = self.server_state
+        git = state.git
+        if method == 'GET' and rest.startswith('git/ref/heads/'):
+            branch = rest[len('git/ref/heads/'):]
+            sha = state.ref_sha(branch)
+            if sha is None:
+                return 404, {'message': 'Not Found'}, {}
+            return self._conditional(f'"{sha}"', {'ref': f'refs/heads/{branch}',
+                                                  'object': {'sha': sha, 'type': 'commit'}})
+        if method == 'GET' and rest.startswith('git/commits/'):
+            sha = rest[len('git/commits/'):]
+            tree = git.commit_tree(sha)
+            if tree is None:
+                return 404, {'message': 'Not Found'}, {}
+            return 200, {'sha': sha, 'tree': {'sha': tree}}, {}
+        if method == 'POST' and rest == 'git/trees':
+            files = {e['path']: e.get('content', '').encode('utf-8') for e in body.get('tree', [])}
+            return 201, {'sha': git.write_tree(body.get('base_tree'), files)}, {}
+        if method == 'POST' and rest == 'git/commits':
+            committer = body.get('committer') or {}
+            sha = git.write_commit(body['tree'], body.get('parents', []), body.get('message', ''),
+                                   committer.get('name', 'automation'), committer.get('email', 'automation@example'))
+            return 201, {'sha': sha}, {}
+        if method == 'POST' and rest == 'git/refs':
+            branch = body.get('ref', '')[len('refs/heads/'):]
+            with state._write_lock:
+                if state.ref_sha(branch) is not None:
+                    return 422, {'message': 'Reference already exists'}, {}
+                if not state.update_ref(branch, body.get('sha', '')):
+                    return 422, {'message': 'Object does not exist'}, {}
+            return 201, {'ref': body['ref'], 'object': {'sha': body['sha']}}, {}
+        if method == 'PATCH' and rest.startswith('git/refs/heads/'):
+            branch = rest[len('git/refs/heads/'):]
+            with state._write_lock:
+                if state.ref_sha(branch) is None:
+                    return 422, {'message': 'Reference does not exist'}, {}
+                if not state.update_ref(branch, body.get('sha', '')):
+                    return 422, {'message': 'Update is not a fast forward'}, {}
+            return 200, {'ref': f'refs/heads/{branch}', 'object': {'sha': body['sha']}}, {}
+        if method == 'GET' and rest.startswith('contents/'):
+            path = rest[len('contents/'):]
+            ref = (query.get('ref') or ['main'])[0]
+            found = git.read_file(f'refs/heads/{ref}', path)
+            if found is None:
+                return 404, {'message': 'Not Found'}, {}
+            sha, content = found
+            return self._conditional(f'"{sha}"', {'type': 'file', 'path': path, 'sha': sha, 'encoding': 'base64',
+                                                  'content': base64.b64encode(content).decode('ascii')})
+        if method == 'PUT' and rest.startswith('contents/'):
+            return self._put_contents(rest[len('contents/'):], body)
+        if method == 'POST' and rest == 'pulls':
+            if state.ref_sha(body.get('head', '')) is None:
+                return 422, {'message': 'Validation Failed', 'errors': [{'field': 'head', 'code': 'invalid'}]}, {}
+            number = state.open_pull(body.get('head'), body.get('base'), body.get('title'))
+            if number is None:
+                return 422, {'message': f"A pull request already exists for {body.get('head')}."}, {}
+            return 201, {'number': number, 'html_url': f"{state.url}/pull/{number}",
+                         'url': f"{state.url}/api/v3/pulls/{number}",
+                         'head': {'ref': body.get('head')}, 'base': {'ref': body.get('base')}}, {}
+        return 404, {'message': 'Not Found'}, {}
+
+    def _put_contents(self, path: str, body: dict):
+        state = self.server_state
+        branch = body.get('branch', 'main')
+        with state._write_lock:
+            head = state.ref_sha(branch)
+            if head is None:
+                return 404, {'message': f'Branch {branch} not found'}, {}
+            existing = state.git.read_file(head, path)
+            if existing is not None and body.get('sha') != existing[0]:
+                return 409, {'message': f'{path} does not match {body.get("sha")}'}, {}
+            content = base64.b64decode(body.get('content', ''))
+            tree = state.git.write_tree(state.git.commit_tree(head), {path: content})
+            committer = body.get('committer') or {}
+            commit = state.git.write_commit(tree, [head], body.get('message', ''),
+                                            committer.get('name', 'automation'),
+                                            committer.get('email', 'automation@example'))
+            if not state.update_ref(branch, commit, head):
+                return 409, {'message': 'Reference update failed'}, {}
+        blob = state.git.read_file(commit, path)[0]
+        return 201 if existing is None else 200, {'content': {'path': path, 'sha': blob},
+                                                  'commit': {'sha': commit}}, {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--origin', required=True, help='bare repository (created if missing)')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=5000)
+    parser.add_argument('--rate-window', type=float, default=3600.0)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.origin):
+        make_origin(os.path.abspath(args.origin))
+    server = FakeGHE(os.path.abspath(args.origin), port=args.port, latency_ms=args.latency_ms,
+                     jitter_ms=args.jitter_ms, error_rate=args.error_rate, error_status=args.error_status,
+                     retry_after=args.retry_after, rate_limit=args.rate_limit, rate_window=args.rate_window)
+    print(f"fake GHE on {server.url} (origin {args.origin}); export GITHUB_API_BASE={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), indent=2))
+        server.git.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Throughput and latency of create_utility_pr() against a local fake GHE.
+
+Starts benchmarks/fake_ghe.py on a scratch bare repository and runs
+--submissions new-utility submissions with --concurrency threads through
+each flow:
+  git     local clone of the bare repo as REPO_ROOT (in-process plumbing,
+          or pooled worktrees with --git-mode worktree), push, then PR via API
+  api     no local repo: branch ref, contents API commit and PR via REST
+
+Reports submissions/sec, latency percentiles, failures, and what the fake
+server saw (requests per endpoint, 304s, injected errors, rate limiting) and
+the client did (retries).
+
+Usage: python benchmarks/load_test_pr.py [--flow git|api|both] [--submissions 100]
+           [--concurrency 8] [--latency-ms 40] [--jitter-ms 10] [--error-rate 0.02]
+           [--rate-limit 5000] [--rate-window 3600] [--git-mode plumbing|worktree]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ghe import FakeGHE, make_origin  # noqa: E402
+from services.git_plumbing import GitPlumbing, run_git  # noqa: E402
+from services.http_client import GitHubClient, ResponseCache  # noqa: E402
+from services.pr_metrics import StageMetrics  # noqa: E402
+
+
+def _prepare(service, flow: str, root: str, origin: str, git_mode: str) -> None:
+    """Point the PR service at this run's repository (or none) and a fresh client."""
+    if flow == 'git':
+        repo = os.path.join(root, 'clone')
+        run_git(['clone', '--quiet', origin, repo], root)
+    else:
+        # No .git here, so the service takes the API-only flow
+        repo = os.path.join(root, 'no-repo')
+        os.makedirs(repo)
+    service.REPO_ROOT = repo
+    service.USE_GIT_PLUMBING = git_mode == 'plumbing'
+    service._git.close()
+    service._git = GitPlumbing(repo)
+    service._worktree_pool = None
+    service._github = GitHubClient(cache=ResponseCache(os.path.join(root, 'http_cache.sqlite3')))
+
+
+def _run_flow(service, flow: str, args) -> dict:
+    root = tempfile.mkdtemp(prefix=f'pr-load-{flow}-')
+    origin = make_origin(os.path.join(root, 'origin.git'),
+                         files={'automation_ui/static/utilities/seed.json': '{"id": "seed"}'})
+    server = FakeGHE(origin, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                     retry_after=args.retry_after, rate_limit=args.rate_limit, rate_window=args.rate_window,
+                     seed=args.seed)
+    os.environ['GITHUB_API_BASE'] = server.start()
+    try:
+        _prepare(service, flow, root, origin, args.git_mode)
+        latencies = StageMetrics(window=args.submissions)
+
+        def submit(n: int) -> bool:
+            uid = f'load-{flow}-{n}'
+            started = time.perf_counter()
+            result = service.create_utility_pr({'id': uid, 'title': f'Load {n}', 'description': 'x' * 300}, uid,
+                                               f'automation_ui/static/utilities/{uid}.json', 'main', 'main',
+                                               commit_message=f'CDMS-6962:Load {n}')
+            ok = bool((result.get('pr') or {}).get('number'))
+            latencies.observe('submission', (time.perf_counter() - started) * 1000, ok)
+            return ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(submit, range(args.submissions)))
+        wall = time.perf_counter() - started
+        client = service._github.stats()
+        return {'flow': flow if flow == 'api' else f'git/{args.git_mode}',
+                'wall_s': wall,
+                'ok': sum(outcomes),
+                'failed': len(outcomes) - sum(outcomes),
+                'latency': latencies.snapshot()['submission'],
+                'server': server.stats(),
+                'client_retries': sum(e['retries'] for e in client['endpoints'].values()),
+                'cache': client['cache']}
+    finally:
+        server.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--flow', choices=['git', 'api', 'both'], default='both')
+    parser.add_argument('--git-mode', choices=['plumbing', 'worktree'], default='plumbing')
+    parser.add_argument('--submissions', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=40.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=5000)
+    parser.add_argument('--rate-window', type=float, default=3600.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print raw results as JSON')
+    args = parser.parse_args()
+
+    os.environ.update({'AUTON_REPO_URL': 'https://github.example/GDT-CDMS/automation_utilities',
+                       'GITHUB_TOKEN': 'load-test', 'AUTON_GITHUB_CACHE_DB': '',
+                       'AUTON_WORKTREE_POOL_SIZE': str(args.concurrency)})
+    from services import github_pr_service as service
+
+    flows = ['git', 'api'] if args.flow == 'both' else [args.flow]
+    results = [_run_flow(service, flow, args) for flow in flows]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.submissions} submissions, concurrency {args.concurrency}, "
+          f"API latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate}")
+    print(f"{'flow':>13} {'subs/s':>7} {'ok':>5} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'API calls':>9} {'304s':>5} {'errors':>6} {'retries':>7} {'403 RL':>6}")
+    for r in results:
+        lat, srv = r['latency'], r['server']
+        print(f"{r['flow']:>13} {r['ok'] / r['wall_s']:>7.1f} {r['ok']:>5} {r['failed']:>5} "
+              f"{lat['p50_ms']:>8.0f} {lat['p95_ms']:>8.0f} {lat['p99_ms']:>8.0f} {srv['requests']:>9} "
+              f"{srv['not_modified']:>5} {srv['injected_errors']:>6} {r['client_retries']:>7} {srv['rate_limited']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Concurrent PR submissions from several processes against one repository.
+
+Simulates gunicorn workers: --processes worker processes, each running
+--threads submissions at a time, all sharing one clone (and one worktree
+pool directory) of a throwaway bare origin. Every submission fetches
+(AUTON_FETCH_MIN_INTERVAL=0), commits one utility file and pushes its own
+branch; PRs are opened against benchmarks/fake_ghe.py serving the same origin.
+
+Afterwards every branch is checked on the origin for exactly the file its
+submission wrote. Exit status is non-zero if any submission failed.
+
+Usage: python benchmarks/stress_concurrent_pr.py [--processes 4] [--threads 4]
+           [--submissions 8] [--flow plumbing|worktree|both]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_ghe import FakeGHE  # noqa: E402
+from services.git_plumbing import run_git  # noqa: E402
+
+
+def _make_repo(root: str) -> str:
+    origin = os.path.join(root, 'origin.git')
+    repo = os.path.join(root, 'repo')
+    run_git(['init', '--quiet', '--bare', '-b', 'main', origin], root)
+    run_git(['clone', '--quiet', origin, repo], root)
+    os.makedirs(os.path.join(repo, 'static', 'utilities'))
+    with open(os.path.join(repo, 'static', 'utilities', 'seed.json'), 'w', encoding='utf-8') as f:
+        json.dump({'id': 'seed'}, f)
+    run_git(['add', '.'], repo)
+    run_git(['-c', 'user.name=stress', '-c', 'user.email=stress@example', 'commit', '--quiet', '-m', 'seed'], repo)
+    run_git(['push', '--quiet', 'origin', 'main'], repo)
+    return repo
+
+
+def _worker(args) -> list:
+    repo, flow, worker, threads, submissions = args
+    os.environ['AUTON_GIT_PLUMBING'] = 'true' if flow == 'plumbing' else 'false'
+    from services import github_pr_service as service
+    from services.git_plumbing import GitPlumbing
+    # Point the service at the scratch clone instead of the dashboard's own repo
+    service.REPO_ROOT = repo
+    service._git = GitPlumbing(repo)
+
+    def submit(n: int) -> dict:
+        uid = f'{flow}-w{worker}-{n}'
+        started = time.perf_counter()
+        result = service.create_utility_pr({'id': uid, 'title': f'Stress {uid}'}, uid,
+                                           f'static/utilities/{uid}.json', 'main', 'main')
+        return {'id': uid, 'ok': bool(result.get('pr')), 'head': (result.get('pr') or {}).get('head'),
+                'ms': (time.perf_counter() - started) * 1000,
+                'failed_steps': [s for s in result['steps'] if not s['ok']]}
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(submit, range(submissions)))
+    stats = service.worktree_pool().stats()
+    for r in results:
+        r['lock'] = stats['lock']
+    return results
+
+
+def _verify(repo: str, result: dict) -> bool:
+    if not result['ok'] or not result['head']:
+        return False
+    ok, out = run_git(['--git-dir', os.path.join(os.path.dirname(repo), 'origin.git'), 'show',
+                       f"refs/heads/{result['head']}:static/utilities/{result['id']}.json"], repo)
+    return ok and json.loads(out).get('id') == result['id']
+
+
+def _run_flow(flow: str, args) -> bool:
+    root = tempfile.mkdtemp(prefix='pr-stress-')
+    server = None
+    try:
+        repo = _make_repo(root)
+        server = FakeGHE(os.path.join(root, 'origin.git'))
+        os.environ.update({'AUTON_REPO_URL': 'https://github.example/org/utilities', 'GITHUB_TOKEN': 'stress',
+                           'GITHUB_API_BASE': server.start(), 'AUTON_FETCH_MIN_INTERVAL': '0',
+                           'AUTON_WORKTREE_POOL_SIZE': str(args.threads), 'AUTON_GITHUB_CACHE_DB': ''})
+        jobs = [(repo, flow, w, args.threads, args.submissions) for w in range(args.processes)]
+        started = time.perf_counter()
+        with multiprocessing.get_context('spawn').Pool(args.processes) as procs:
+            results = [r for batch in procs.map(_worker, jobs) for r in batch]
+        wall = time.perf_counter() - started
+        verified = [r for r in results if _verify(repo, r)]
+        latencies = sorted(r['ms'] for r in results)
+        lock = results[-1]['lock'] if results else {}
+        print(f"{flow:>9}: {len(verified)}/{len(results)} submissions verified on origin in {wall:.1f}s "
+              f"(p50 {latencies[len(latencies) // 2]:.0f} ms, max {latencies[-1]:.0f} ms, "
+              f"repo lock waits max {lock.get('wait_ms_max', 0):.0f} ms in last worker)")
+        for r in results:
+            if r not in verified:
+                print(f"   FAILED {r['id']}: {r['failed_steps'][:2]}")
+        return len(verified) == len(results)
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=8, help='per process')
+    parser.add_argument('--flow', choices=['plumbing', 'worktree', 'both'], default='both')
+    args = parser.parse_args()
+
+    flows = ['plumbing', 'worktree'] if args.flow == 'both' else [args.flow]
+    print(f"{args.processes} processes x {args.threads} threads, {args.submissions} submissions per process")
+    ok = all([_run_flow(flow, args) for flow in flows])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Content-fingerprinted URLs for static assets.
+
+AssetManifest maps logical asset names ('utilities.js') to fingerprinted
+ones ('utilities.3f9a1c07d2.js', the first hex digits of the file's SHA-256).
+Pages link to the fingerprinted URL, which changes whenever the file does,
+so the route serving it can mark the response immutable and browsers never
+ask for it again. Hashes are computed for the whole directory by build()
+(at startup) and re-computed for a file only when its size or mtime changes.
+
+resolve() maps a requested path back to the file on disk and says whether
+the response may be cached forever: the fingerprint matches the current
+content, or the file is content-addressed already (uploaded icons named by
+their SHA-256).
+"""
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+ASSET_EXTENSIONS = ('.css', '.js', '.mjs', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico',
+                    '.woff', '.woff2', '.ttf')
+
+HASH_LENGTH = 10
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+_CONTENT_ADDRESSED = re.compile(r'^[0-9a-f]{64}\.')
+_ASSET_ATTR = re.compile(r'''(?P<attr>\b(?:href|src)\s*=\s*["'])(?P<url>[^"'?#]+)(?=["'])''', re.I)
+
+
+class AssetManifest:
+    """Fingerprints for the assets under directory, served at url_prefix."""
+
+    def __init__(self, directory: str, url_prefix: str, extensions: Iterable[str] = ASSET_EXTENSIONS,
+                 exclude: Iterable[str] = ()):
+        self.directory = os.path.realpath(directory)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        # Sub-directories (relative, '/'-separated) that build() does not walk
+        self.exclude = tuple(e.strip('/') + '/' for e in exclude)
+        self._lock = threading.Lock()
+        # logical name -> (size, mtime_ns, hash)
+        self._entries: Dict[str, Tuple[int, int, str]] = {}
+        self._counters = {'hashed': 0, 'lookups': 0, 'immutable_hits': 0, 'stale_hits': 0}
+
+    def build(self) -> int:
+        """Hash every asset under the directory; returns how many there are."""
+        count = 0
+        for root, dirs, files in os.walk(self.directory):
+            rel_root = os.path.relpath(root, self.directory).replace(os.sep, '/')
+            rel_root = '' if rel_root == '.' else rel_root + '/'
+            dirs[:] = [d for d in dirs if not d.startswith('.') and f'{rel_root}{d}/' not in self.exclude]
+            for filename in files:
+                if self._is_asset(filename) and self._hash(rel_root + filename) is not None:
+                    count += 1
+        return count
+
+    def fingerprinted(self, name: str) -> str:
+        """'dir/app.js' -> 'dir/app.<hash>.js'; the name unchanged if it is not a known asset.
+
+        Content-addressed files (uploaded icons) already change name with their
+        content, so they keep their name; resolve() serves them as immutable.
+        """
+        name = name.lstrip('/')
+        if _CONTENT_ADDRESSED.match(os.path.basename(name)):
+            return name
+        digest = self._hash(name) if self._is_asset(name) else None
+        if digest is None:
+            return name
+        stem, ext = os.path.splitext(name)
+        return f'{stem}.{digest}{ext}'
+
+    def url(self, name: str) -> str:
+        return f'{self.url_prefix}/{self.fingerprinted(name)}'
+
+    def resolve(self, filename: str) -> Tuple[str, bool]:
+        """(name of the file to send, whether the response is immutable) for a requested path."""
+        with self._lock:
+            self._counters['lookups'] += 1
+        if _CONTENT_ADDRESSED.match(os.path.basename(filename)):
+            return filename, True
+        match = _FINGERPRINTED.match(filename)
+        if match is None or os.path.isfile(self._path(filename)):
+            return filename, False
+        name = match.group('stem') + match.group('ext')
+        current = self._hash(name)
+        with self._lock:
+            # A page cached from before a deploy may ask for an old fingerprint: send the
+            # current file, but let it be revalidated
+            self._counters['immutable_hits' if current == match.group('hash') else 'stale_hits'] += 1
+        return name, current == match.group('hash')
+
+    def rewrite_html(self, html: str) -> str:
+        """Fingerprint href/src attributes that point at assets of this manifest."""
+        def replace(match):
+            url = match.group('url')
+            if url.startswith(self.url_prefix + '/'):
+                new = self.url(url[len(self.url_prefix) + 1:])
+            elif '://' in url or url.startswith(('/', 'data:', 'mailto:')):
+                return match.group(0)
+            else:
+                # Relative to the page, which is served from url_prefix
+                new = self.fingerprinted(url)
+            return match.group('attr') + new
+        return _ASSET_ATTR.sub(replace, html)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data['assets'] = len(self._entries)
+        data.update({'directory': self.directory, 'url_prefix': self.url_prefix})
+        return data
+
+    def _is_asset(self, name: str) -> bool:
+        return name.lower().endswith(self.extensions)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, *name.split('/'))
+
+    def _hash(self, name: str) -> Optional[str]:
+        """Fingerprint of the file, re-hashed only when its size or mtime changed; None if missing."""
+        path = os.path.realpath(self._path(name))
+        if not path.startswith(self.directory + os.sep):
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None and entry[:2] == (st.st_size, st.st_mtime_ns):
+            return entry[2]
+        sha = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    sha.update(chunk)
+        except OSError:
+            return None
+        digest = sha.hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._entries[name] = (st.st_size, st.st_mtime_ns, digest)
+            self._counters['hashed'] += 1
+        return digest
@@ -0,0 +1,115 @@
+"""Response compression with a cache of compressed variants.
+
+Negotiates gzip (and brotli when the `brotli` package is installed) from
+Accept-Encoding and keeps compressed bodies in a byte-bounded LRU keyed by the
+caller's validator (file path + ETag, catalog version, ...), so identical
+bytes are compressed once rather than on every hit.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compression overhead outweighs the win
+MIN_SIZE = 1024
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+}
+
+# Supported encodings, most preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding the client accepts (q > 0), or None."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress data; best=True spends more CPU for bodies that will be cached."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    if encoding == 'gzip':
+        # mtime=0 keeps output byte-identical for identical input
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    raise ValueError(f'unsupported encoding: {encoding}')
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """Strong ETag of the encoded representation of a resource with the given ETag."""
+    return f"{etag}-{encoding}"
+
+
+class CompressionCache:
+    """Thread-safe LRU of compressed bodies, bounded by total stored bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._size = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def get_or_compress(self, key: Hashable, data_fn, encoding: str) -> bytes:
+        """Return the cached body for (key, encoding), compressing data_fn() on a miss."""
+        cache_key = (key, encoding)
+        with self._lock:
+            body = self._entries.get(cache_key)
+            if body is not None:
+                self._entries.move_to_end(cache_key)
+                self._counters['hits'] += 1
+                return body
+        data = data_fn()
+        body = compress(data, encoding, best=True)
+        with self._lock:
+            self._counters['misses'] += 1
+            self._counters['bytes_in'] += len(data)
+            self._counters['bytes_out'] += len(body)
+            if len(body) <= self.max_bytes and cache_key not in self._entries:
+                self._entries[cache_key] = body
+                self._size += len(body)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+                    self._counters['evictions'] += 1
+        return body
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data.update({'entries': len(self._entries), 'bytes': self._size,
+                         'encodings': list(ENCODINGS)})
+            return data
@@ -0,0 +1,66 @@
+"""JSON backend selection: orjson when installed, stdlib json otherwise.
+
+Used for catalog files and snapshots and, through services/json_provider.py,
+for every JSON response.
+
+Set AUTON_JSON_BACKEND=json to force the stdlib implementation.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+if os.getenv('AUTON_JSON_BACKEND', '').lower() == 'json':
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_COMPACT = (',', ':')
+
+
+def loads(data):
+    """Parse JSON from bytes or str.
+
+    orjson is stricter than the stdlib (no NaN/Infinity, 64-bit integers only),
+    so anything it rejects is retried with json to keep stdlib semantics.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj, default=None, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, compact (or indented by 2) and with non-ASCII kept.
+
+    datetime objects are passed to default, as the stdlib does, instead of
+    orjson's ISO format. Anything orjson refuses (integers over 64 bits,
+    unsupported types) is retried with json.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass
+    kwargs = {'default': default, 'sort_keys': sort_keys}
+    if indent:
+        kwargs['indent'] = 2
+    else:
+        kwargs['separators'] = _COMPACT
+    try:
+        return json.dumps(obj, ensure_ascii=False, **kwargs).encode('utf-8')
+    except UnicodeEncodeError:
+        # Lone surrogates cannot be UTF-8 encoded; escaped output is still valid JSON
+        return json.dumps(obj, **kwargs).encode('ascii')
@@ -0,0 +1,232 @@
+"""In-process git plumbing for PR submissions.
+
+Builds the blob, tree and commit objects of a submission directly in the
+object database instead of checking out a worktree and running `git add`
+and `git commit`. Existing objects are read through one long-lived
+`git cat-file --batch` process; new objects are hashed, zlib-compressed and
+written as loose objects from Python, so pushing the resulting commit id is
+the only git process a submission still starts (besides the rate-limited
+fetch).
+"""
+import hashlib
+import os
+import subprocess
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# Mode of the files we write; an existing executable bit is kept
+BLOB_MODE = b'100644'
+TREE_MODE = b'40000'
+
+
+class GitError(Exception):
+    """Raised when an object cannot be read or written."""
+
+
+def run_git(args: List[str], cwd: str, timeout: Optional[float] = None) -> Tuple[bool, str]:
+    """Run one git command without a shell; returns (ok, combined output)."""
+    try:
+        proc = subprocess.run(['git'] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              timeout=timeout)
+    except FileNotFoundError as e:
+        # git may not be installed in the container
+        return False, str(e)
+    except subprocess.TimeoutExpired:
+        return False, f"git {args[0]} timed out after {timeout}s"
+    return proc.returncode == 0, proc.stdout.decode('utf-8', errors='ignore').strip()
+
+
+class GitPlumbing:
+    """Object-level access to the repository at repo_root; safe to share between threads."""
+
+    def __init__(self, repo_root: str):
+        self.repo_root = repo_root
+        self._lock = threading.Lock()
+        self._batch: Optional[subprocess.Popen] = None
+        self._objects_dir: Optional[str] = None
+        self._hash_name = 'sha1'
+        self._counters = {'processes': 0, 'objects_read': 0, 'objects_written': 0,
+                          'objects_existing': 0, 'commits': 0}
+
+    def available(self) -> Tuple[bool, str]:
+        """Start the cat-file process if needed; (False, reason) if the repo is unusable."""
+        try:
+            with self._lock:
+                self._ensure_batch()
+            return True, f"objects: {self._objects_dir} ({self._hash_name})"
+        except GitError as e:
+            return False, str(e)
+
+    def resolve(self, rev: str) -> Optional[str]:
+        """Commit id that rev points to, or None if it does not exist."""
+        found = self._read(f'{rev}^{{commit}}')
+        return found[0] if found else None
+
+    def commit_files(self, base: str, files: Dict[str, bytes], message: str,
+                     name: str = 'automation', email: str = 'automation@example') -> Tuple[str, bool]:
+        """Write a commit on top of base that sets each path in files to its content.
+
+        Returns (commit id, changed). When the files already have that content
+        no commit is written and base is returned with changed=False.
+        """
+        base_obj = self._read(f'{base}^{{commit}}')
+        if base_obj is None:
+            raise GitError(f'unknown revision: {base}')
+        base_sha, _, body = base_obj
+        base_tree = body.split(b'\n', 1)[0].split(b' ', 1)[1].decode('ascii')
+        tree = self.write_tree(base_tree, files)
+        if tree == base_tree:
+            return base_sha, False
+        return self.write_commit(tree, [base_sha], message, name, email), True
+
+    def write_tree(self, base_tree: Optional[str], files: Dict[str, bytes]) -> str:
+        """Tree id of base_tree (None for an empty tree) with each path in files set to its content."""
+        changes: dict = {}
+        for path, content in files.items():
+            parts = [p for p in path.replace('\\', '/').split('/') if p]
+            node = changes
+            for part in parts[:-1]:
+                node = node.setdefault(part.encode('utf-8'), {})
+            node[parts[-1].encode('utf-8')] = content
+        return self._write_tree(base_tree, changes)
+
+    def write_commit(self, tree: str, parents: List[str], message: str,
+                     name: str = 'automation', email: str = 'automation@example') -> str:
+        offset = time.localtime().tm_gmtoff
+        sign = '+' if offset >= 0 else '-'
+        stamp = f"{int(time.time())} {sign}{abs(offset) // 3600:02d}{abs(offset) % 3600 // 60:02d}"
+        signature = f"{name} <{email}> {stamp}"
+        lines = [f"tree {tree}"] + [f"parent {p}" for p in parents]
+        text = '\n'.join(lines) + f"\nauthor {signature}\ncommitter {signature}\n\n{message.rstrip()}\n"
+        sha = self._write_object(b'commit', text.encode('utf-8'))
+        self._count('commits')
+        return sha
+
+    def read_file(self, rev: str, path: str) -> Optional[Tuple[str, bytes]]:
+        """(blob id, content) of path at rev, or None if either does not exist."""
+        found = self._read(f"{rev}:{path.strip('/')}")
+        if found is None or found[1] != 'blob':
+            return None
+        return found[0], found[2]
+
+    def commit_tree(self, rev: str) -> Optional[str]:
+        """Tree id of the commit rev points to, or None."""
+        found = self._read(f'{rev}^{{commit}}')
+        if found is None:
+            return None
+        return found[2].split(b'\n', 1)[0].split(b' ', 1)[1].decode('ascii')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._batch is not None:
+                self._batch.stdin.close()
+                self._batch.wait(timeout=5)
+                self._batch = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+        data.update({'cat_file_running': self._batch is not None and self._batch.poll() is None,
+                     'object_format': self._hash_name})
+        return data
+
+    def _ensure_batch(self) -> subprocess.Popen:
+        if self._batch is not None and self._batch.poll() is None:
+            return self._batch
+        if self._objects_dir is None:
+            self._counters['processes'] += 1
+            ok, out = run_git(['rev-parse', '--git-common-dir', '--show-object-format'], self.repo_root)
+            lines = out.splitlines()
+            if not ok or not lines:
+                raise GitError(out or 'not a git repository')
+            self._objects_dir = os.path.join(self.repo_root, lines[0], 'objects')
+            # Older git prints the option back unchanged; those only know sha1
+            self._hash_name = lines[1] if len(lines) > 1 and lines[1] in ('sha1', 'sha256') else 'sha1'
+        self._counters['processes'] += 1
+        try:
+            self._batch = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self.repo_root,
+                                           stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                           stderr=subprocess.DEVNULL)
+        except FileNotFoundError as e:
+            raise GitError(str(e))
+        return self._batch
+
+    def _read(self, rev: str) -> Optional[Tuple[str, str, bytes]]:
+        """(object id, type, raw content) of rev, or None if it is missing."""
+        with self._lock:
+            proc = self._ensure_batch()
+            try:
+                proc.stdin.write(rev.encode('utf-8') + b'\n')
+                proc.stdin.flush()
+                header = proc.stdout.readline().decode('utf-8', errors='replace').split()
+                if len(header) != 3:
+                    # "<rev> missing" / "ambiguous"
+                    return None
+                sha, kind, size = header
+                data = proc.stdout.read(int(size))
+                proc.stdout.read(1)
+            except (OSError, ValueError) as e:
+                # Broken pipe: start a fresh process on the next read
+                proc.kill()
+                self._batch = None
+                raise GitError(f'cat-file failed: {e}')
+            self._counters['objects_read'] += 1
+        return sha, kind, data
+
+    def _tree_entries(self, tree_sha: Optional[str]) -> Dict[bytes, Tuple[bytes, bytes]]:
+        """name -> (mode, raw object id) of a tree object."""
+        entries: Dict[bytes, Tuple[bytes, bytes]] = {}
+        if tree_sha is None:
+            return entries
+        found = self._read(tree_sha)
+        if found is None or found[1] != 'tree':
+            raise GitError(f'not a tree: {tree_sha}')
+        data, pos = found[2], 0
+        width = hashlib.new(self._hash_name).digest_size
+        while pos < len(data):
+            space = data.index(b' ', pos)
+            nul = data.index(b'\0', space)
+            entries[data[space + 1:nul]] = (data[pos:space], data[nul + 1:nul + 1 + width])
+            pos = nul + 1 + width
+        return entries
+
+    def _write_tree(self, tree_sha: Optional[str], changes: dict) -> str:
+        entries = self._tree_entries(tree_sha)
+        for name, change in changes.items():
+            mode, raw = entries.get(name, (None, None))
+            if isinstance(change, dict):
+                subtree = raw.hex() if mode == TREE_MODE else None
+                entries[name] = (TREE_MODE, bytes.fromhex(self._write_tree(subtree, change)))
+            else:
+                keep = mode if mode in (b'100644', b'100755') else BLOB_MODE
+                entries[name] = (keep, bytes.fromhex(self._write_object(b'blob', change)))
+        # git orders entries by name, comparing tree names as if they ended in '/'
+        ordered = sorted(entries.items(), key=lambda e: e[0] + b'/' if e[1][0] == TREE_MODE else e[0])
+        body = b''.join(mode + b' ' + name + b'\0' + raw for name, (mode, raw) in ordered)
+        return self._write_object(b'tree', body)
+
+    def _write_object(self, kind: bytes, body: bytes) -> str:
+        data = kind + b' ' + str(len(body)).encode('ascii') + b'\0' + body
+        sha = hashlib.new(self._hash_name, data).hexdigest()
+        if self._objects_dir is None:
+            with self._lock:
+                self._ensure_batch()
+        path = os.path.join(self._objects_dir, sha[:2], sha[2:])
+        if os.path.exists(path) or self._read(sha) is not None:
+            # Already stored, loose or packed
+            self._count('objects_existing')
+            return sha
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(zlib.compress(data, 1))
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+        self._count('objects_written')
+        return sha
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
@@ -12,16 +12,26 @@ import os
 
 import json
 
-import subprocess
+import threading
 
-from typing import Tuple, Dict, Optional
+import time
 
-import tempfile
-
-import shutil
+from typing import Callable, List, Tuple, Dict, Optional
 
 import base64
 
+import functools
+
+from services.git_plumbing import GitError, GitPlumbing, run_git
+
+from services.http_client import GitHubClient, ResponseCache
+
+from services.pr_metrics import StageMetrics
+
+from services.repo_lock import LockTimeout, RepoLock
+
+from services.worktree_pool import WorktreePool
+
  
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -34,23 +44,83 @@ UTILITIES_DIR = os.path.join(STATIC_DIR, 'utilities')
 
  
 
-def _run(cmd: str, cwd: str = REPO_ROOT) -> Tuple[bool, str]:
+# Build submission commits in-process (push is the only git process per submission);
 
-    try:
+# set to false to stage and commit in a pooled worktree instead
 
-        out = subprocess.check_output(cmd, cwd=cwd, shell=True, stderr=subprocess.STDOUT)
+USE_GIT_PLUMBING = os.getenv('AUTON_GIT_PLUMBING', 'true').lower() not in ('0', 'false', 'no')
 
-        return True, out.decode('utf-8', errors='ignore').strip()
+ 
 
-    except subprocess.CalledProcessError as e:
+def _run(args: List[str], cwd: Optional[str] = None) -> Tuple[bool, str]:
 
-        return False, e.output.decode('utf-8', errors='ignore').strip()
+    # Arguments go straight to git, never through a shell
 
-    except FileNotFoundError as e:
+    return run_git(args, cwd or REPO_ROOT)
 
-        # git may not be installed in the container
+ 
 
-        return False, str(e)
+_git = GitPlumbing(REPO_ROOT)
+
+ 
+
+def git_plumbing() -> GitPlumbing:
+
+    return _git
+
+ 
+
+_worktree_pool = None
+
+_worktree_pool_lock = threading.Lock()
+
+ 
+
+# Seconds to queue for the cross-process repo lock before giving up on a submission
+
+REPO_LOCK_WAIT = float(os.getenv('AUTON_REPO_LOCK_WAIT', '120'))
+
+ 
+
+def worktree_pool() -> WorktreePool:
+
+    """Process-wide pool of reusable worktrees (created on first use)."""
+
+    global _worktree_pool
+
+    with _worktree_pool_lock:
+
+        if _worktree_pool is None:
+
+            _worktree_pool = WorktreePool(
+
+                REPO_ROOT,
+
+                os.getenv('AUTON_WORKTREE_DIR', os.path.join(REPO_ROOT, '.git', 'auton-worktrees')),
+
+                _run,
+
+                size=int(os.getenv('AUTON_WORKTREE_POOL_SIZE', '2')),
+
+                fetch_interval=float(os.getenv('AUTON_FETCH_MIN_INTERVAL', '30')),
+
+                # Fetches, branch creation and worktree admin from all workers queue here
+
+                lock=RepoLock(os.getenv('AUTON_REPO_LOCK_DIR', os.path.join(REPO_ROOT, '.git', 'auton-locks'))),
+
+                lock_timeout=REPO_LOCK_WAIT,
+
+            )
+
+        return _worktree_pool
+
+ 
+
+def repo_lock() -> RepoLock:
+
+    """Cross-process lock for steps that change shared state in REPO_ROOT/.git."""
+
+    return worktree_pool().lock
 
  
 
@@ -128,437 +198,651 @@ def _parse_repo(url: str) -> Tuple[str, str, str]:
 
  
 
-def _http_post(url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
-
-    import urllib.request
+# ETag cache for ref and contents lookups; set AUTON_GITHUB_CACHE_DB empty to disable
 
-    import urllib.error
+_cache_db = os.getenv('AUTON_GITHUB_CACHE_DB', os.path.join(BASE_DIR, '.cache', 'github_http_cache.sqlite3'))
 
-    data = json.dumps(body).encode('utf-8')
+ 
 
-    req = urllib.request.Request(url, data=data, headers=headers, method='POST')
+# One pooled, retrying client shared by every GitHub API call in this process
 
-    try:
+_github = GitHubClient(timeout=float(os.getenv('AUTON_GITHUB_TIMEOUT', '20')),
 
-        with urllib.request.urlopen(req, timeout=20) as resp:
+                       max_retries=int(os.getenv('AUTON_GITHUB_RETRIES', '3')),
 
-            return True, resp.read().decode('utf-8', errors='ignore')
+                       max_wait=float(os.getenv('AUTON_GITHUB_MAX_WAIT', '60')),
 
-    except urllib.error.HTTPError as e:
+                       cache=ResponseCache(_cache_db) if _cache_db else None)
 
-        return False, e.read().decode('utf-8', errors='ignore')
+ 
 
-    except Exception as e:
+def github_client() -> GitHubClient:
 
-        return False, str(e)
+    return _github
 
  
 
-def _http_get(url: str, headers: Dict[str, str]) -> Tuple[bool, str]:
+def _http_post(url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
 
-    import urllib.request
+    return _github.post(url, headers, body)
 
-    import urllib.error
+ 
 
-    req = urllib.request.Request(url, headers=headers, method='GET')
+def _http_get(url: str, headers: Dict[str, str], cached: bool = False) -> Tuple[bool, str]:
 
-    try:
+    return _github.get(url, headers, cached=cached)
 
-        with urllib.request.urlopen(req, timeout=20) as resp:
+ 
 
-            return True, resp.read().decode('utf-8', errors='ignore')
+def _http_put(url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
 
-    except urllib.error.HTTPError as e:
+    return _github.put(url, headers, body)
 
-        return False, e.read().decode('utf-8', errors='ignore')
+ 
 
-    except Exception as e:
+def _http_patch(url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
 
-        return False, str(e)
+    return _github.patch(url, headers, body)
 
  
 
-def _http_put(url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
+def _start_submission(result: dict, step) -> Optional[dict]:
 
-    import urllib.request
+    """Check configuration and decide between the git worktree and API-only flows.
 
-    import urllib.error
+    Returns the repo context, or None (with result['error'] set) when not configured.
 
-    data = json.dumps(body).encode('utf-8')
+    """
 
-    req = urllib.request.Request(url, data=data, headers=headers, method='PUT')
+    repo_url = os.getenv('AUTON_REPO_URL', '')
 
-    try:
+    token = os.environ.get('SERVICE_GITHUB_TOKEN') or os.environ.get('GITHUB_TOKEN') or ''
 
-        with urllib.request.urlopen(req, timeout=20) as resp:
+    if not repo_url:
 
-            return True, resp.read().decode('utf-8', errors='ignore')
+        result.update({'ok': False, 'error': 'AUTON_REPO_URL not configured'})
 
-    except urllib.error.HTTPError as e:
+        return None
 
-        return False, e.read().decode('utf-8', errors='ignore')
+    if not token:
 
-    except Exception as e:
+        result.update({'ok': False, 'error': 'SERVICE_GITHUB_TOKEN/GITHUB_TOKEN not configured'})
 
-        return False, str(e)
+        return None
 
  
 
-def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_branch: str, target_branch: str, commit_message: Optional[str] = None) -> dict:
+    # Detect whether we have a usable local git repo (.git present and git works)
 
-    """Commit new utility JSON into source_branch and open PR to target_branch.
+    started = time.perf_counter()
 
-    Requires SERVICE_GITHUB_TOKEN or GITHUB_TOKEN and AUTON_REPO_URL env.
+    git_dir_present = os.path.isdir(os.path.join(REPO_ROOT, '.git'))
 
-    """
+    if not git_dir_present:
 
-    result = {'ok': True, 'steps': []}
+        ok_git, out_git = False, 'no .git directory'
+
+    elif USE_GIT_PLUMBING:
+
+        ok_git, out_git = _git.available()
+
+    else:
+
+        ok_git, out_git = _run(['rev-parse', '--git-dir'])
+
+    step('git repo (probe)', ok_git, out_git, started)
 
  
 
-    def step(msg: str, ok: bool, out: str = ''):
+    use_git_flow = ok_git and git_dir_present
+
+ 
+
+    if use_git_flow:
+
+        # Fetch latest refs; rate-limited and shared between concurrent submissions
 
-        result['steps'].append({'step': msg, 'ok': ok, 'out': out})
+        started = time.perf_counter()
+
+        try:
+
+            ok, out = worktree_pool().fetch()
+
+        except LockTimeout as e:
+
+            ok, out = False, str(e)
+
+        result['timings'].append({'phase': 'fetch', 'ms': round((time.perf_counter() - started) * 1000, 2)})
+
+        step('git fetch', ok, out, started)
 
         if not ok:
 
-            result['ok'] = False
+            use_git_flow = False
+
+    else:
+
+        step('git disabled', False, 'falling back to API-only flow')
 
  
 
-    repo_url = os.getenv('AUTON_REPO_URL', '')
+    api_base, owner, repo = _parse_repo(repo_url)
 
-    token = os.environ.get('SERVICE_GITHUB_TOKEN') or os.environ.get('GITHUB_TOKEN') or ''
+    # GHE v3 API path
 
-    if not repo_url:
+    # Support GitHub.com as well as GHE; build API path accordingly
 
-        return {'ok': False, 'error': 'AUTON_REPO_URL not configured'}
+    api_root = f"{api_base}/api/v3" if 'api/v3' not in api_base else api_base
 
-    if not token:
+    return {'use_git_flow': use_git_flow, 'api_root': f"{api_root}/repos/{owner}/{repo}",
 
-        return {'ok': False, 'error': 'SERVICE_GITHUB_TOKEN/GITHUB_TOKEN not configured'}
+            'headers': _github_headers(token)}
 
  
 
-    # Detect whether we have a usable local git repo (.git present and git works)
+def _ensure_local_branch(source_branch: str, step) -> None:
 
-    git_dir_present = os.path.isdir(os.path.join(REPO_ROOT, '.git'))
+    # Ensure base branch exists locally; if not, try to track remote
+
+    ok_base, out_base = _run(['rev-parse', '--verify', '--quiet', f'refs/heads/{source_branch}'])
+
+    if not ok_base:
+
+        started = time.perf_counter()
 
-    ok_git, out_git = _run('git status') if git_dir_present else (False, 'no .git directory')
+        with repo_lock().hold(REPO_LOCK_WAIT):
 
-    step('git status (probe)', ok_git, out_git)
+            _run(['fetch', 'origin', source_branch])
+
+            ok_track, out_track = _run(['branch', '--track', source_branch, f'origin/{source_branch}'])
+
+        step('create local tracking branch', ok_track, out_track, started)
 
  
 
-    use_git_flow = ok_git and git_dir_present
+def _run_locked(args: List[str], cwd: Optional[str] = None) -> Tuple[bool, str]:
+
+    """_run under the repo lock; a lock timeout is reported as a failed command."""
+
+    try:
+
+        with repo_lock().hold(REPO_LOCK_WAIT):
+
+            return _run(args, cwd)
+
+    except LockTimeout as e:
+
+        return False, str(e)
 
  
 
-    if use_git_flow:
+def _push_branch(src: str, branch: str, step, cwd: Optional[str] = None) -> Optional[str]:
 
-        # Fetch latest refs
+    """Push src (a commit id or HEAD) to origin as branch; returns the branch name actually pushed, or None."""
 
-        ok, out = _run('git fetch origin --prune')
+    # Pushes update refs/remotes/origin/* in the shared .git, so they queue with the other writers
 
-        step('git fetch', ok, out)
+    started = time.perf_counter()
 
-        if not ok:
+    ok_push, out_push = _run_locked(['push', 'origin', f'{src}:refs/heads/{branch}'], cwd)
 
-            use_git_flow = False
+    step('git push', ok_push, out_push, started)
 
-    else:
+    if ok_push:
 
-        step('git disabled', False, 'falling back to API-only flow')
+        return branch
 
- 
+    # Handle non-fast-forward by attempting fetch and force-with-lease
 
-    # Create a unique branch name per utility
+    if 'non-fast-forward' not in (out_push or '') and 'failed to push some refs' not in (out_push or ''):
 
-    unique_branch = f"{source_branch}-{new_id}"
+        return None
 
- 
+    started = time.perf_counter()
 
-    api_base, owner, repo = _parse_repo(repo_url)
+    try:
 
-    headers = _github_headers(token)
+        with repo_lock().hold(REPO_LOCK_WAIT):
 
-    # Use provided commit_message for both commit and PR title when available; fallback to default
+            _run(['fetch', 'origin', branch], cwd)
 
-    commit_msg = commit_message or f"chore: add utility {new_util.get('title','')} ({new_id})"
+            ok_force, out_force = _run(['push', f'--force-with-lease=refs/heads/{branch}', 'origin',
 
- 
+                                        f'{src}:refs/heads/{branch}'], cwd)
 
-    if use_git_flow:
+    except LockTimeout as e:
 
-        # Use a temporary worktree to avoid switching the server's current branch
+        ok_force, out_force = False, str(e)
 
-        temp_dir = tempfile.mkdtemp(prefix='util-worktree-')
+    step('git push --force-with-lease', ok_force, out_force, started)
 
-        worktree_added = False
+    if ok_force:
 
-        try:
+        return branch
 
-            # Ensure base branch exists locally; if not, try to track remote
+    # If force push disallowed by server policy, push the same commit under a new branch name
 
-            ok_base, out_base = _run(f'git rev-parse --verify {source_branch}')
+    if 'force-pushing' not in (out_force or '') and 'pre-receive hook declined' not in (out_force or ''):
 
-            if not ok_base:
+        return None
 
-                _run(f'git fetch origin {source_branch}')
+    new_branch = f"{branch}-{int(time.time())}"
 
-                ok_track, out_track = _run(f'git branch --track {source_branch} origin/{source_branch}')
+    started = time.perf_counter()
 
-                step('create local tracking branch', ok_track, out_track)
+    ok_push2, out_push2 = _run_locked(['push', 'origin', f'{src}:refs/heads/{new_branch}'], cwd)
+
+    step('git push (alternate branch)', ok_push2, out_push2, started)
+
+    return new_branch if ok_push2 else None
 
  
 
-            # Create unique branch from base
+def _commit_files(files: List[Tuple[dict, str]], branch: str, source_branch: str, commit_msg: str,
+
+                  result: dict, step) -> Optional[str]:
 
-            ok_branch, out_branch = _run(f'git branch -f {unique_branch} {source_branch}')
+    """Commit (utility, file_rel_path) pairs on top of source_branch and push them as branch.
 
-            step('create unique source branch', ok_branch, out_branch)
+    Returns the branch name actually pushed (it may be an alternate name), or None.
 
-            if not ok_branch:
+    """
 
-                shutil.rmtree(temp_dir, ignore_errors=True)
+    if USE_GIT_PLUMBING:
 
-                return result
+        # Base on the freshly fetched remote branch; fall back to a local-only branch
 
- 
+        base = f'refs/remotes/origin/{source_branch}'
+
+        if _git.resolve(base) is None:
 
-            ok_wt, out_wt = _run(f'git worktree add "{temp_dir}" {unique_branch}')
+            base = f'refs/heads/{source_branch}'
 
-            step('git worktree add', ok_wt, out_wt)
+        started = time.perf_counter()
 
-            if not ok_wt:
+        try:
 
-                shutil.rmtree(temp_dir, ignore_errors=True)
+            sha, changed = _git.commit_files(
 
-                return result
+                base, {path: json.dumps(util, indent=2).encode('utf-8') for util, path in files}, commit_msg)
 
-            worktree_added = True
+        except GitError as e:
 
- 
+            step('git commit (plumbing)', False, str(e), started)
+
+            return None
 
-            # Paths relative to worktree root
+        result['timings'].append({'phase': 'commit', 'ms': round((time.perf_counter() - started) * 1000, 2)})
 
-            wt_file_abs = os.path.join(temp_dir, file_rel_path)
+        step('git commit (plumbing)', True, sha if changed else f'nothing to commit, pushing {sha}', started)
 
-            os.makedirs(os.path.dirname(wt_file_abs), exist_ok=True)
+        started = time.perf_counter()
+
+        pushed = _push_branch(sha, branch, step)
+
+        result['timings'].append({'phase': 'push', 'ms': round((time.perf_counter() - started) * 1000, 2)})
+
+        return pushed
 
  
 
-            # Write per-utility JSON in worktree
+    # Worktree flow: avoids switching the server's current branch and a full checkout per submission
+
+    _ensure_local_branch(source_branch, step)
+
+    checkout_started = time.perf_counter()
+
+    try:
+
+        # Reset a free worktree slot to a new branch created from base
+
+        with worktree_pool().checkout(branch, source_branch,
+
+                                      timeout=float(os.getenv('AUTON_WORKTREE_WAIT', '120')),
+
+                                      steps=result['timings']) as temp_dir:
+
+            step('checkout pooled worktree', True, temp_dir, checkout_started)
+
+            started = time.perf_counter()
 
             try:
 
-                with open(wt_file_abs, 'w', encoding='utf-8') as f:
+                for util, path in files:
 
-                    json.dump(new_util, f, indent=2)
+                    abs_path = os.path.join(temp_dir, path)
 
-                step('write per-utility json', True, wt_file_abs)
+                    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-            except Exception as e:
+                    with open(abs_path, 'w', encoding='utf-8') as f:
 
-                step('write per-utility json', False, str(e))
+                        json.dump(util, f, indent=2)
 
-                return result
+                step('write per-utility json', True, f"{len(files)} files", started)
 
- 
+            except Exception as e:
+
+                step('write per-utility json', False, str(e), started)
+
+                return None
 
-            # Stage and commit in worktree
+            started = time.perf_counter()
 
-            ok_add, out_add = _run(f'git -C "{temp_dir}" add "{file_rel_path}"')
+            ok_add, out_add = _run(['add', '--'] + [path for _, path in files], temp_dir)
 
-            step('git add (worktree)', ok_add, out_add)
+            step('git add (worktree)', ok_add, out_add, started)
 
             if not ok_add:
 
-                return result
+                return None
 
- 
+            started = time.perf_counter()
 
-            ok_commit, out_commit = _run(
+            staged, _ = _run(['diff', '--cached', '--quiet'], temp_dir)
 
-                f'git -C "{temp_dir}" diff --cached --quiet || git -C "{temp_dir}" -c user.name="automation" -c user.email="automation@example" commit -m "{commit_msg}"'
+            ok_commit, out_commit = (True, 'nothing to commit') if staged else _run(
 
-            )
+                ['-c', 'user.name=automation', '-c', 'user.email=automation@example',
+
+                 'commit', '-m', commit_msg], temp_dir)
 
-            step('git commit (worktree)', ok_commit, out_commit)
+            step('git commit (worktree)', ok_commit, out_commit, started)
 
             if not ok_commit:
 
-                return result
+                return None
+
+            return _push_branch('HEAD', branch, step, temp_dir)
+
+    except RuntimeError as e:
+
+        step('checkout pooled worktree', False, str(e), checkout_started)
+
+        return None
 
  
 
-            # Push unique source branch from worktree
+def _get_ref_sha(ctx: dict, branch: str, step) -> Optional[str]:
+
+    started = time.perf_counter()
+
+    ok_ref, out_ref = _http_get(f"{ctx['api_root']}/git/ref/heads/{branch}", ctx['headers'], cached=True)
+
+    step('get base ref', ok_ref, out_ref, started)
+
+    if not ok_ref:
+
+        return None
+
+    try:
+
+        ref_data = json.loads(out_ref)
+
+        base_sha = ref_data.get('object', {}).get('sha') or ref_data.get('sha')
+
+    except Exception:
+
+        base_sha = None
+
+    if not base_sha:
+
+        step('parse base ref sha', False, out_ref)
+
+    return base_sha
+
+ 
 
-            ok_push, out_push = _run(f'git -C "{temp_dir}" push -u origin {unique_branch}')
+def _set_branch_ref(ctx: dict, branch: str, sha: str, step) -> bool:
 
-            step('git push (worktree)', ok_push, out_push)
+    """Create refs/heads/<branch> at sha, or force-move it there if it already exists."""
 
-            if not ok_push:
+    started = time.perf_counter()
 
-                # Handle non-fast-forward by attempting fetch and force-with-lease
+    ok_cr, out_cr = _http_post(f"{ctx['api_root']}/git/refs", ctx['headers'], {
 
-                if 'non-fast-forward' in (out_push or '') or 'failed to push some refs' in (out_push or ''):
+        'ref': f'refs/heads/{branch}',
 
-                    _run(f'git -C "{temp_dir}" fetch origin {unique_branch}')
+        'sha': sha
 
-                    ok_force, out_force = _run(f'git -C "{temp_dir}" push --force-with-lease -u origin {unique_branch}')
+    })
 
-                    step('git push --force-with-lease (worktree)', ok_force, out_force)
+    step('create branch ref', ok_cr, out_cr, started)
 
-                    if not ok_force:
+    if not ok_cr:
 
-                        # If force push disallowed by server policy, create a new branch name and push that
+        if 'Reference already exists' not in out_cr:
 
-                        if 'force-pushing' in (out_force or '') or 'pre-receive hook declined' in (out_force or ''):
+            return False
 
-                            import time
+        started = time.perf_counter()
 
-                            new_branch = f"{unique_branch}-{int(time.time())}"
+        ok_update, out_update = _http_patch(f"{ctx['api_root']}/git/refs/heads/{branch}", ctx['headers'],
 
-                            ok_new, out_new = _run(f'git -C "{temp_dir}" branch -f {new_branch}')
+                                            {'sha': sha, 'force': True})
 
-                            step('create alternate branch name', ok_new, out_new)
+        step('update existing branch ref', ok_update, out_update, started)
 
-                            if not ok_new:
+        if not ok_update:
 
-                                return result
+            return False
 
-                            ok_set, out_set = _run(f'git -C "{temp_dir}" checkout {new_branch}')
+    # The branch now points somewhere new; don't serve its old ref from the cache
 
-                            step('switch worktree to alternate branch', ok_set, out_set)
+    _github.invalidate(f"{ctx['api_root']}/git/ref/heads/{branch}")
 
-                            if not ok_set:
+    return True
 
-                                return result
+ 
 
-                            ok_push2, out_push2 = _run(f'git -C "{temp_dir}" push -u origin {new_branch}')
+def _open_pr(ctx: dict, result: dict, step, head: str, base: str, title: str, body: str) -> dict:
 
-                            step('git push (alternate branch)', ok_push2, out_push2)
+    """Open the PR head -> base and attach its metadata to result."""
 
-                            if not ok_push2:
+    started = time.perf_counter()
 
-                                return result
+    ok, out = _http_post(f"{ctx['api_root']}/pulls", ctx['headers'], {
 
-                            # Update head branch reference for PR creation
+        'title': title,
 
-                            unique_branch = new_branch
+        'head': head,
 
-                        else:
+        'base': base,
 
-                            return result
+        'body': body,
 
-                else:
+        'maintainer_can_modify': True,
 
-                    return result
+        'draft': False
 
-        finally:
+    })
 
-            if worktree_added:
+    step('create PR', ok, out, started)
 
-                _run(f'git worktree remove "{temp_dir}" --force')
+    if not ok:
 
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        return result
 
  
 
-        # Do NOT write to or commit in the app's local working copy.
+    # Attach PR metadata if available
 
-        # Visibility must only change after PR merge into target_branch.
+    try:
 
-        step('skip local write/commit', True, 'no changes to running repo')
+        data = json.loads(out)
 
-    else:
+        result['pr'] = {
 
-        # API-only flow: create branch from target, commit file via contents API, then open PR
+            'url': data.get('html_url') or data.get('url'),
 
-        # 1) Get target branch ref
+            'number': data.get('number'),
 
-        refs_base = f"{api_base}/api/v3" if 'api/v3' not in api_base else api_base
+            'head': data.get('head', {}).get('ref'),
 
-        ref_url = f"{refs_base}/repos/{owner}/{repo}/git/ref/heads/{target_branch}"
+            'base': data.get('base', {}).get('ref')
 
-        ok_ref, out_ref = _http_get(ref_url, headers)
+        }
 
-        step('get base ref', ok_ref, out_ref)
+    except Exception:
 
-        if not ok_ref:
+        result['pr_raw'] = out
 
-            return result
+ 
 
-        try:
+    return result
 
-            ref_data = json.loads(out_ref)
+ 
 
-            base_sha = ref_data.get('object', {}).get('sha') or ref_data.get('sha')
+# Per-step latency histograms across all submissions in this process
 
-        except Exception:
+_metrics = StageMetrics()
 
-            base_sha = None
+ 
 
-        if not base_sha:
+def pipeline_metrics() -> StageMetrics:
 
-            step('parse base ref sha', False, out_ref)
+    return _metrics
+
+ 
+
+def _timed_submission(stage: str):
+
+    """Record a submission's end-to-end duration under stage."""
+
+    def decorate(fn):
+
+        @functools.wraps(fn)
+
+        def wrapper(*args, **kwargs):
+
+            started = time.perf_counter()
+
+            result = fn(*args, **kwargs)
+
+            _metrics.observe(stage, (time.perf_counter() - started) * 1000, result.get('ok', False))
 
             return result
 
+        return wrapper
+
+    return decorate
+
  
 
-        # 2) Create or update branch ref to point to latest target branch
+def _new_result(on_step: Optional[Callable[[dict], None]]):
 
-        create_ref_url = f"{refs_base}/repos/{owner}/{repo}/git/refs"
+    result = {'ok': True, 'steps': [], 'timings': []}
 
-        ok_cr, out_cr = _http_post(create_ref_url, headers, {
+    origin = time.perf_counter()
 
-            'ref': f'refs/heads/{unique_branch}',
+ 
 
-            'sha': base_sha
+    def step(msg: str, ok: bool, out: str = '', started: Optional[float] = None):
 
-        })
+        # started is the perf_counter() reading taken just before the operation; steps
 
-        step('create branch ref', ok_cr, out_cr)
+        # without one (parse failures, skips) are bookkeeping and take no time
 
-        
+        now = time.perf_counter()
 
-        # If branch already exists, update it to point to latest target branch SHA
+        began = now if started is None else started
 
-        if not ok_cr and 'Reference already exists' in out_cr:
+        entry = {'step': msg, 'ok': ok, 'out': out,
 
-            update_ref_url = f"{refs_base}/repos/{owner}/{repo}/git/refs/heads/{unique_branch}"
+                 'offset_ms': round((began - origin) * 1000, 3),
 
-            import urllib.request
+                 'ms': round((now - began) * 1000, 3)}
 
-            import urllib.error
+        if started is not None:
 
-            data = json.dumps({'sha': base_sha, 'force': True}).encode('utf-8')
+            _metrics.observe(msg, entry['ms'], ok)
 
-            req = urllib.request.Request(update_ref_url, data=data, headers=headers, method='PATCH')
+        result['steps'].append(entry)
 
-            try:
+        if not ok:
 
-                with urllib.request.urlopen(req, timeout=20) as resp:
+            result['ok'] = False
 
-                    ok_update = True
+        if on_step is not None:
 
-                    out_update = resp.read().decode('utf-8', errors='ignore')
+            on_step(entry)
 
-            except Exception as e:
+ 
+
+    return result, step
+
+ 
+
+@_timed_submission('submission')
 
-                ok_update = False
+def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_branch: str, target_branch: str, commit_message: Optional[str] = None, on_step: Optional[Callable[[dict], None]] = None) -> dict:
 
-                out_update = str(e)
+    """Commit new utility JSON into source_branch and open PR to target_branch.
+
+    Requires SERVICE_GITHUB_TOKEN or GITHUB_TOKEN and AUTON_REPO_URL env.
+
+    on_step, when given, is called with each step entry as soon as it is recorded.
+
+    """
+
+    result, step = _new_result(on_step)
+
+    ctx = _start_submission(result, step)
+
+    if ctx is None:
+
+        return result
+
+ 
+
+    # Create a unique branch name per utility
+
+    unique_branch = f"{source_branch}-{new_id}"
+
+ 
+
+    # Use provided commit_message for both commit and PR title when available; fallback to default
+
+    commit_msg = commit_message or f"chore: add utility {new_util.get('title','')} ({new_id})"
+
+ 
+
+    if ctx['use_git_flow']:
+
+        pushed = _commit_files([(new_util, file_rel_path)], unique_branch, source_branch, commit_msg, result, step)
+
+        if pushed is None:
+
+            return result
+
+        # Head branch for PR creation (may be an alternate name)
+
+        unique_branch = pushed
+
+ 
+
+        # Do NOT write to or commit in the app's local working copy.
+
+        # Visibility must only change after PR merge into target_branch.
+
+        step('skip local write/commit', True, 'no changes to running repo')
+
+    else:
+
+        # API-only flow: create branch from target, commit file via contents API, then open PR
+
+        # 1) Get target branch ref
+
+        base_sha = _get_ref_sha(ctx, target_branch, step)
+
+        if not base_sha:
 
-            step('update existing branch ref', ok_update, out_update)
+            return result
 
-            if not ok_update:
+ 
 
-                return result
+        # 2) Create or update branch ref to point to latest target branch
 
-        elif not ok_cr:
+        if not _set_branch_ref(ctx, unique_branch, base_sha, step):
 
             return result
 
@@ -566,11 +850,13 @@ def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_br
 
         # 3) Check if file exists on TARGET branch to get SHA (required for updates)
 
-        contents_url = f"{refs_base}/repos/{owner}/{repo}/contents/{file_rel_path}"
+        contents_url = f"{ctx['api_root']}/contents/{file_rel_path}"
 
         file_sha = None
 
-        ok_get, out_get = _http_get(f"{contents_url}?ref={target_branch}", headers)
+        started = time.perf_counter()
+
+        ok_get, out_get = _http_get(f"{contents_url}?ref={target_branch}", ctx['headers'], cached=True)
 
         if ok_get:
 
@@ -580,17 +866,17 @@ def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_br
 
                 file_sha = existing_file.get('sha')
 
-                step('get existing file sha', True, f"sha: {file_sha}")
+                step('get existing file sha', True, f"sha: {file_sha}", started)
 
             except Exception:
 
-                step('get existing file sha', False, 'file may not exist yet')
+                step('get existing file sha', False, 'file may not exist yet', started)
 
         else:
 
-            step('get existing file sha', False, 'file does not exist, will create new')
+            step('get existing file sha', False, 'file does not exist, will create new', started)
 
-        
+ 
 
         # 4) Commit file via contents API
 
@@ -608,7 +894,7 @@ def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_br
 
         }
 
-        
+ 
 
         # Include SHA if file exists (required for updates)
 
@@ -616,83 +902,181 @@ def create_utility_pr(new_util: dict, new_id: str, file_rel_path: str, source_br
 
             commit_body['sha'] = file_sha
 
-        
+ 
 
-        ok_put, out_put = _http_put(contents_url, headers, commit_body)
+        started = time.perf_counter()
 
-        step('commit file (contents API)', ok_put, out_put)
+        ok_put, out_put = _http_put(contents_url, ctx['headers'], commit_body)
+
+        step('commit file (contents API)', ok_put, out_put, started)
 
         if not ok_put:
 
             return result
 
+        _github.invalidate(contents_url)
+
  
 
     # Create PR to target_branch
 
-    pr_title = commit_msg
+    return _open_pr(ctx, result, step, unique_branch, target_branch, commit_msg,
 
-    pr_body = 'Automated submission from Utilities Dashboard. Please review and merge.'
+                    'Automated submission from Utilities Dashboard. Please review and merge.')
 
  
 
-    # GHE v3 API path
+@_timed_submission('batch submission')
 
-    # Support GitHub.com as well as GHE; build API path accordingly
+def create_batch_pr(utilities: List[Tuple[dict, str]], batch_id: str, source_branch: str, target_branch: str, commit_message: Optional[str] = None, on_step: Optional[Callable[[dict], None]] = None) -> dict:
 
-    pr_base = f"{api_base}/api/v3" if 'api/v3' not in api_base else api_base
+    """Commit several utility JSON files as one commit on one branch and open a single PR.
 
-    pr_url = f"{pr_base}/repos/{owner}/{repo}/pulls"
+    utilities is a list of (utility, file_rel_path). The API-only flow builds the commit
 
-    body = {
+    with the Git Data API (one tree + one commit) instead of one contents API call per file.
 
-        'title': pr_title,
+    """
 
-        'head': unique_branch,
+    result, step = _new_result(on_step)
 
-        'base': target_branch,
+    if not utilities:
 
-        'body': pr_body,
+        result.update({'ok': False, 'error': 'empty batch'})
 
-        'maintainer_can_modify': True,
+        return result
 
-        'draft': False
+    ctx = _start_submission(result, step)
 
-    }
+    if ctx is None:
 
-    ok, out = _http_post(pr_url, headers, body)
+        return result
 
-    step('create PR', ok, out)
+ 
 
-    if not ok:
+    batch_branch = f"{source_branch}-batch-{batch_id}"
 
-        return result
+    titles = [util.get('title') or util.get('id') or path for util, path in utilities]
+
+    commit_msg = commit_message or f"chore: add {len(utilities)} utilities"
+
+    pr_body = '\n'.join(
+
+        ['Automated batch submission from Utilities Dashboard. Please review and merge.', '']
+
+        + [f"- {title} (`{path}`)" for title, (_, path) in zip(titles, utilities)]
+
+    )
 
  
 
-    # Attach PR metadata if available
+    if ctx['use_git_flow']:
 
-    try:
+        pushed = _commit_files(utilities, batch_branch, source_branch, commit_msg, result, step)
 
-        data = json.loads(out)
+        if pushed is None:
 
-        result['pr'] = {
+            return result
 
-            'url': data.get('html_url') or data.get('url'),
+        batch_branch = pushed
 
-            'number': data.get('number'),
+        step('skip local write/commit', True, 'no changes to running repo')
 
-            'head': data.get('head', {}).get('ref'),
+    else:
 
-            'base': data.get('base', {}).get('ref')
+        # API-only flow: one tree and one commit on top of target, then point the branch at it
 
-        }
+        base_sha = _get_ref_sha(ctx, target_branch, step)
 
-    except Exception:
+        if not base_sha:
 
-        result['pr_raw'] = out
+            return result
+
+        started = time.perf_counter()
+
+        ok_bc, out_bc = _http_get(f"{ctx['api_root']}/git/commits/{base_sha}", ctx['headers'])
+
+        step('get base commit', ok_bc, '' if ok_bc else out_bc, started)
+
+        if not ok_bc:
+
+            return result
+
+        try:
+
+            base_tree = json.loads(out_bc)['tree']['sha']
+
+        except Exception:
+
+            step('parse base tree sha', False, out_bc)
+
+            return result
+
+        started = time.perf_counter()
+
+        ok_tree, out_tree = _http_post(f"{ctx['api_root']}/git/trees", ctx['headers'], {
+
+            'base_tree': base_tree,
+
+            'tree': [{'path': path, 'mode': '100644', 'type': 'blob',
+
+                      'content': json.dumps(util, indent=2)} for util, path in utilities]
+
+        })
+
+        step('create tree (Git Data API)', ok_tree, out_tree if not ok_tree else f"{len(utilities)} files",
+
+             started)
+
+        if not ok_tree:
+
+            return result
+
+        started = time.perf_counter()
+
+        try:
+
+            ok_commit, out_commit = _http_post(f"{ctx['api_root']}/git/commits", ctx['headers'], {
+
+                'message': commit_msg,
+
+                'tree': json.loads(out_tree)['sha'],
+
+                'parents': [base_sha],
+
+                'committer': {'name': 'automation', 'email': 'automation@example'}
+
+            })
+
+        except Exception as e:
+
+            ok_commit, out_commit = False, f'unexpected tree response: {e}'
+
+        step('create commit (Git Data API)', ok_commit, out_commit, started)
+
+        if not ok_commit:
+
+            return result
+
+        try:
+
+            commit_sha = json.loads(out_commit)['sha']
+
+        except Exception:
+
+            step('parse commit sha', False, out_commit)
+
+            return result
+
+        if not _set_branch_ref(ctx, batch_branch, commit_sha, step):
+
+            return result
+
+        for _, path in utilities:
+
+            _github.invalidate(f"{ctx['api_root']}/contents/{path}")
 
  
 
-    return result
+    return _open_pr(ctx, result, step, batch_branch, target_branch, commit_msg, pr_body)
 
@@ -0,0 +1,273 @@
+"""Shared HTTP client for the GitHub API.
+
+One requests.Session with per-host keep-alive connection pools replaces the
+per-call urllib connections. Transient failures (connection errors, 502/503/
+504, 429 and GitHub's secondary rate limits) are retried with jittered
+exponential backoff, waiting for Retry-After or X-RateLimit-Reset when the
+server says how long. Methods that are not idempotent (POST pulls, git/refs,
+git/commits) may already have been applied when a 5xx or a broken
+connection comes back, so they are only retried when the server refused them
+outright (429, secondary rate limit) or the connection was never opened.
+Every call is timed per endpoint.
+
+GETs made with cached=True are conditional: the ETag and body of the last 200
+are kept in a small SQLite cache keyed by URL and sent back as If-None-Match,
+so an unchanged ref or file costs a 304, which GitHub does not count against
+the rate limit.
+"""
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Safe to repeat: 5xx responses and dropped connections are retried for these only
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'PATCH', 'DELETE'}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+_REPO_PATH_RE = re.compile(r'/repos/[^/]+/[^/]+/([^/?]+)(?:/([^/?]+))?')
+
+
+def never_sent(exc: requests.RequestException) -> bool:
+    """True when exc means no connection was opened, so the server cannot have seen the request."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.ConnectionError) or not exc.args:
+        return False
+    # requests wraps urllib3's MaxRetryError; refused connections and DNS failures carry NewConnectionError
+    reason = getattr(exc.args[0], 'reason', exc.args[0])
+    return isinstance(reason, NewConnectionError)
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Metrics key: method plus the GitHub resource, e.g. 'POST git/trees'."""
+    m = _REPO_PATH_RE.search(url)
+    if not m:
+        return f'{method} other'
+    resource = m.group(1)
+    if resource == 'git' and m.group(2):
+        resource = f'git/{m.group(2)}'
+    return f'{method} {resource}'
+
+
+class ResponseCache:
+    """Persistent URL -> (ETag, body) store for conditional GETs, newest max_entries kept."""
+
+    def __init__(self, db_path: str, max_entries: int = 500):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidated': 0}
+        self.init_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def init_database(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_stored ON http_cache(stored_at)')
+
+    def lookup(self, url: str) -> Optional[Tuple[str, str]]:
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT etag, body FROM http_cache WHERE url = ?', (url,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def store(self, url: str, etag: str, body: str) -> None:
+        with self.get_connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO http_cache (url, etag, body, stored_at) VALUES (?, ?, ?, ?)',
+                         (url, etag, body, time.time()))
+            conn.execute('DELETE FROM http_cache WHERE url NOT IN '
+                         '(SELECT url FROM http_cache ORDER BY stored_at DESC LIMIT ?)', (self.max_entries,))
+        self.count('stores')
+
+    def invalidate(self, url: str) -> int:
+        """Drop url and every cached variant of it (same URL with a query string)."""
+        with self.get_connection() as conn:
+            removed = conn.execute("DELETE FROM http_cache WHERE url = ? OR substr(url, 1, ?) = ?",
+                                   (url, len(url) + 1, url + '?')).rowcount
+        with self._lock:
+            self._counters['invalidated'] += removed
+        return removed
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self.get_connection() as conn:
+            entries = conn.execute('SELECT COUNT(*) FROM http_cache').fetchone()[0]
+        with self._lock:
+            return dict(self._counters, entries=entries, max_entries=self.max_entries)
+
+
+class GitHubClient:
+    """Thread-safe pooled client; request() returns (ok, body text) like the old helpers."""
+
+    def __init__(self, timeout: float = 20.0, max_retries: int = 3, backoff: float = 0.5,
+                 max_wait: float = 60.0, pool_size: int = 10, cache: Optional[ResponseCache] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Base delay for exponential backoff (full jitter)
+        self.backoff = backoff
+        # Upper bound on any single wait, including server-requested ones
+        self.max_wait = max_wait
+        # Conditional GET cache; None disables it
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        # endpoint -> {'calls', 'errors', 'retries', 'total_ms', 'max_ms', 'last_status'}
+        self._metrics: Dict[str, dict] = {}
+        self._rate_limit: Dict[str, Optional[str]] = {}
+
+    def get(self, url: str, headers: Dict[str, str], cached: bool = False) -> Tuple[bool, str]:
+        """GET url; with cached=True revalidate a stored copy via If-None-Match."""
+        entry = self.cache.lookup(url) if cached and self.cache is not None else None
+        if entry is not None:
+            headers = dict(headers, **{'If-None-Match': entry[0]})
+        ok, text, resp = self._send('GET', url, headers)
+        if resp is None or not cached or self.cache is None:
+            return ok, text
+        if resp.status_code == 304 and entry is not None:
+            self.cache.count('hits')
+            return True, entry[1]
+        self.cache.count('misses')
+        if ok and resp.headers.get('ETag'):
+            self.cache.store(url, resp.headers['ETag'], text)
+        return ok, text
+
+    def invalidate(self, url: str) -> None:
+        """Forget cached responses for url after we changed what it points at."""
+        if self.cache is not None:
+            self.cache.invalidate(url)
+
+    def post(self, url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
+        return self.request('POST', url, headers, body)
+
+    def put(self, url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
+        return self.request('PUT', url, headers, body)
+
+    def patch(self, url: str, headers: Dict[str, str], body: dict) -> Tuple[bool, str]:
+        return self.request('PATCH', url, headers, body)
+
+    def request(self, method: str, url: str, headers: Dict[str, str],
+                body: Optional[dict] = None) -> Tuple[bool, str]:
+        """Send one API call, retrying transient failures; (True, text) on 2xx."""
+        ok, text, _ = self._send(method, url, headers, body)
+        return ok, text
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], body: Optional[dict] = None):
+        """request() that also returns the final response (None on connection failure)."""
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        key = endpoint_name(method, url)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.request(method, url, headers=headers, data=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                resp, error = None, str(e)
+                # A POST that reached the server may have been applied; don't send it twice
+                final = method not in IDEMPOTENT_METHODS and not never_sent(e)
+            else:
+                error, final = None, False
+                self._note_rate_limit(resp)
+            wait = None
+            if attempt < self.max_retries and not final:
+                wait = self._retry_delay(method, resp, attempt)
+            if wait is None:
+                break
+            attempt += 1
+            time.sleep(wait)
+        ok = resp is not None and (200 <= resp.status_code < 300 or resp.status_code == 304)
+        self._record(key, (time.perf_counter() - started) * 1000, ok, attempt,
+                     resp.status_code if resp is not None else None)
+        if resp is None:
+            return False, error, None
+        return 200 <= resp.status_code < 300, resp.text, resp
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for key, m in self._metrics.items():
+                endpoints[key] = dict(m, avg_ms=round(m['total_ms'] / m['calls'], 2),
+                                      total_ms=round(m['total_ms'], 2), max_ms=round(m['max_ms'], 2))
+            data = {'endpoints': endpoints, 'rate_limit': dict(self._rate_limit)}
+        data['cache'] = self.cache.stats() if self.cache is not None else None
+        return data
+
+    def _retry_delay(self, method: str, resp, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the outcome is final."""
+        if resp is not None:
+            status = resp.status_code
+            limited = status == 429 or (status == 403 and self._rate_limited(resp))
+            # A 5xx on a POST may come after the write went through: only rate limits are safe to repeat
+            if not limited and (method not in IDEMPOTENT_METHODS
+                                or (status not in RETRY_STATUSES and status != 500)):
+                return None
+            retry_after = resp.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(max(0.0, float(retry_after)), self.max_wait)
+                except ValueError:
+                    pass
+            reset = resp.headers.get('X-RateLimit-Reset')
+            if limited and reset and resp.headers.get('X-RateLimit-Remaining') == '0':
+                try:
+                    return min(max(0.0, float(reset) - time.time()) + random.uniform(0, 1), self.max_wait)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.max_wait, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def _rate_limited(resp) -> bool:
+        if resp.headers.get('X-RateLimit-Remaining') == '0' or resp.headers.get('Retry-After'):
+            return True
+        return 'rate limit' in (resp.text or '').lower()
+
+    def _note_rate_limit(self, resp) -> None:
+        if 'X-RateLimit-Remaining' in resp.headers:
+            with self._lock:
+                self._rate_limit = {'limit': resp.headers.get('X-RateLimit-Limit'),
+                                    'remaining': resp.headers.get('X-RateLimit-Remaining'),
+                                    'reset': resp.headers.get('X-RateLimit-Reset')}
+
+    def _record(self, key: str, ms: float, ok: bool, retries: int, status: Optional[int]) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(key, {'calls': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0,
+                                               'max_ms': 0.0, 'last_status': None})
+            m['calls'] += 1
+            m['errors'] += 0 if ok else 1
+            m['retries'] += retries
+            m['total_ms'] += ms
+            m['max_ms'] = max(m['max_ms'], ms)
+            m['last_status'] = status
@@ -0,0 +1,228 @@
+"""Content-addressed storage for uploaded utility icons.
+
+Uploads are streamed to disk in chunks while their SHA-256 is computed, and
+rejected as soon as they exceed max_bytes. Each icon is stored once, as
+<sha256>.<ext>, so uploading the same logo again returns the existing URL.
+
+Raster icons also get a variant downscaled to fit `size` pixels (cards show
+icons at 32-40 CSS px, so 128 covers high-DPI screens). It is re-encoded
+with optimization and used as the icon URL when it is smaller than the
+original. Variants need Pillow and are skipped when it is not installed.
+SVGs are minified instead. A <sha256>.json manifest next to the files
+records what was produced.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+
+# Extension -> (stored extension, accepted leading bytes)
+FORMATS = {
+    'png': ('png', (b'\x89PNG\r\n\x1a\n',)),
+    'jpg': ('jpg', (b'\xff\xd8\xff',)),
+    'jpeg': ('jpg', (b'\xff\xd8\xff',)),
+    'svg': ('svg', ()),
+}
+
+_SVG_STRIP = [
+    re.compile(r'<\?xml.*?\?>', re.S),
+    re.compile(r'<!DOCTYPE[^>]*>', re.S | re.I),
+    re.compile(r'<!--.*?-->', re.S),
+    re.compile(r'<metadata\b.*?</metadata>', re.S),
+    re.compile(r'<sodipodi:namedview\b.*?(/>|</sodipodi:namedview>)', re.S),
+]
+_SVG_ACTIVE = re.compile(rb'<script|\bon[a-z]+\s*=|javascript:', re.I)
+
+
+class InvalidIcon(ValueError):
+    """The upload is not an image of the type its name claims."""
+
+
+class IconTooLarge(ValueError):
+    """The upload exceeds the configured maximum size."""
+
+
+def minify_svg(text: str) -> str:
+    """Drop prolog, comments and editor metadata and collapse whitespace."""
+    for pattern in _SVG_STRIP:
+        text = pattern.sub('', text)
+    # Whitespace between tags is significant inside <text>; leave those SVGs' layout alone
+    if '<text' not in text:
+        text = re.sub(r'>\s+<', '><', text)
+    return re.sub(r'\s{2,}', ' ', text).strip()
+
+
+class IconStore:
+    """Stores icons under icons_dir by content hash; URLs are prefixed with url_prefix."""
+
+    def __init__(self, icons_dir: str, url_prefix: str = 'static/icons', max_bytes: int = 2 * 1024 * 1024,
+                 size: int = 128):
+        self.icons_dir = icons_dir
+        self.url_prefix = url_prefix.rstrip('/')
+        self.max_bytes = max_bytes
+        self.size = size
+        self._lock = threading.Lock()
+        self._counters = {'stored': 0, 'duplicates': 0, 'rejected': 0, 'bytes_in': 0, 'bytes_saved': 0}
+        os.makedirs(icons_dir, exist_ok=True)
+
+    def save(self, stream: BinaryIO, filename: str) -> dict:
+        """Store the upload read from stream; returns its manifest plus 'duplicate'."""
+        ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if ext not in FORMATS:
+            raise InvalidIcon('Invalid file type. Only PNG, JPG, and SVG are allowed.')
+        ext, magics = FORMATS[ext]
+        tmp_path, digest, size = self._receive(stream)
+        try:
+            with open(tmp_path, 'rb') as f:
+                data = f.read()
+            if magics and not data.startswith(magics):
+                raise InvalidIcon(f'File content is not a valid {ext.upper()} image')
+            if ext == 'svg' and (b'<svg' not in data[:4096] or _SVG_ACTIVE.search(data)):
+                raise InvalidIcon('SVG must be a plain image without scripts or event handlers')
+            manifest = self._duplicate(digest)
+            if manifest is not None:
+                return manifest
+            # Image work runs unlocked; only the manifest check and the writes are serialized
+            stored = self._optimize(data, ext)
+            with self._lock:
+                manifest = self._duplicate(digest, locked=True)
+                if manifest is not None:
+                    return manifest
+                manifest = self._store(digest, ext, data, tmp_path, stored)
+                self._counters['stored'] += 1
+                self._counters['bytes_in'] += size
+                self._counters['bytes_saved'] += size - manifest['bytes']
+            return dict(manifest, duplicate=False)
+        except InvalidIcon:
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+        data.update({'max_bytes': self.max_bytes, 'size': self.size, 'variants': Image is not None})
+        return data
+
+    def _receive(self, stream: BinaryIO):
+        """Copy stream to a temp file in icons_dir, hashing as it goes; IconTooLarge past max_bytes."""
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix='.upload-', dir=self.icons_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise IconTooLarge(f'File too large. Maximum size is {self.max_bytes // 1024} KB.')
+                    sha.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            with self._lock:
+                self._counters['rejected'] += 1
+            os.unlink(tmp_path)
+            raise
+        if size == 0:
+            with self._lock:
+                self._counters['rejected'] += 1
+            os.unlink(tmp_path)
+            raise InvalidIcon('Empty file')
+        return tmp_path, sha.hexdigest(), size
+
+    def _duplicate(self, digest: str, locked: bool = False) -> Optional[dict]:
+        """The stored icon's manifest (marked duplicate) if this content is already stored."""
+        manifest = self._read_manifest(digest)
+        if manifest is None:
+            return None
+        if locked:
+            self._counters['duplicates'] += 1
+        else:
+            with self._lock:
+                self._counters['duplicates'] += 1
+        return dict(manifest, duplicate=True)
+
+    def _read_manifest(self, digest: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.icons_dir, f'{digest}.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.icons_dir, manifest.get('filename', ''))):
+            return None
+        return manifest
+
+    def _write(self, name: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(prefix='.write-', dir=self.icons_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates 0600; icons are public static files
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, os.path.join(self.icons_dir, name))
+
+    def _optimize(self, data: bytes, ext: str) -> Optional[bytes]:
+        """Minified SVG or downscaled raster variant; None when there is nothing smaller to store."""
+        if ext == 'svg':
+            try:
+                text = data.decode('utf-8')
+            except UnicodeDecodeError:
+                # Another encoding (declared in the prolog minify_svg strips): keep the bytes as uploaded
+                return None
+            minified = minify_svg(text).encode('utf-8')
+            return minified if len(minified) < len(data) else None
+        variant = self._resize(data, ext)
+        return variant if variant is not None and len(variant) < len(data) else None
+
+    def _store(self, digest: str, ext: str, data: bytes, tmp_path: str, optimized: Optional[bytes]) -> dict:
+        original = f'{digest}.{ext}'
+        manifest = {'sha256': digest, 'original': original, 'original_bytes': len(data), 'variants': {}}
+        best, best_bytes = original, len(data)
+        if ext == 'svg' and optimized is not None:
+            self._write(original, optimized)
+            best_bytes = len(optimized)
+        else:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(self.icons_dir, original))
+            if optimized is not None:
+                name = f'{digest}.{self.size}.{ext}'
+                self._write(name, optimized)
+                manifest['variants'][str(self.size)] = f'{self.url_prefix}/{name}'
+                best, best_bytes = name, len(optimized)
+        manifest.update({'filename': best, 'bytes': best_bytes, 'url': f'{self.url_prefix}/{best}',
+                         'original_url': f'{self.url_prefix}/{original}'})
+        # The manifest goes last: its presence means every file above is complete
+        self._write(f'{digest}.json', json.dumps(manifest, indent=2).encode('utf-8'))
+        return manifest
+
+    def _resize(self, data: bytes, ext: str) -> Optional[bytes]:
+        """Downscale to fit size x size and re-encode optimized; None without Pillow, InvalidIcon on a bad image."""
+        if Image is None:
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.load()
+                img.thumbnail((self.size, self.size), Image.LANCZOS)
+                out = io.BytesIO()
+                if ext == 'png':
+                    img.save(out, 'PNG', optimize=True)
+                else:
+                    img.convert('RGB').save(out, 'JPEG', quality=85, optimize=True, progressive=True)
+                return out.getvalue()
+        except Exception:
+            raise InvalidIcon(f'File content is not a valid {ext.upper()} image') from None
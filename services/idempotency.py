@@ -0,0 +1,129 @@
+"""Deduplication of repeated submissions.
+
+A submission is identified by its Idempotency-Key header, or, without one,
+by a fingerprint of its normalized payload. The first request claims the
+key in SQLite (so concurrent duplicates across worker processes see the
+claim), and its response is stored once it is known; repeats within the
+TTL get that stored response back instead of running the submission again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+# claim() outcomes
+NEW = 'new'
+PENDING = 'pending'
+DONE = 'done'
+MISMATCH = 'mismatch'
+
+
+def fingerprint(payload, ignore: Iterable[str] = ('id',)) -> str:
+    """Stable hash of a JSON payload: keys sorted, strings stripped, ignored keys dropped at any depth."""
+    skip = set(ignore)
+
+    def normalize(value):
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items() if k not in skip}
+        if isinstance(value, list):
+            return [normalize(v) for v in value]
+        if isinstance(value, str):
+            return value.strip()
+        return value
+
+    canonical = json.dumps(normalize(payload), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """Bounded TTL store of key -> (payload fingerprint, stored response)."""
+
+    def __init__(self, db_path: str, max_entries: int = 5000, pending_timeout: float = 30.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        # A claim with no response after this many seconds was abandoned (crash) and is taken over
+        self.pending_timeout = pending_timeout
+        self.init_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def init_database(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status_code INTEGER,
+                    response TEXT,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency(expires_at)')
+
+    def claim(self, key: str, fp: str, ttl: float) -> Tuple[str, Optional[dict]]:
+        """Claim key for a new submission.
+
+        Returns (NEW, None) if the caller should run the submission and then
+        call complete() or release(); (DONE, stored) with the first response;
+        (PENDING, None) while the first request is still running; or
+        (MISMATCH, None) if the key was used for a different payload.
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM idempotency WHERE expires_at <= ?', (now,))
+            inserted = conn.execute('INSERT OR IGNORE INTO idempotency (key, fingerprint, created_at, expires_at) '
+                                    'VALUES (?, ?, ?, ?)', (key, fp, now, now + ttl)).rowcount
+            if inserted:
+                conn.execute('DELETE FROM idempotency WHERE key NOT IN '
+                             '(SELECT key FROM idempotency ORDER BY created_at DESC LIMIT ?)', (self.max_entries,))
+                return NEW, None
+            row = conn.execute('SELECT * FROM idempotency WHERE key = ?', (key,)).fetchone()
+            if (row is not None and row['status_code'] is None and row['fingerprint'] == fp
+                    and now - row['created_at'] > self.pending_timeout):
+                taken = conn.execute('UPDATE idempotency SET created_at = ? WHERE key = ? AND created_at = ?',
+                                     (now, key, row['created_at'])).rowcount
+                if taken:
+                    return NEW, None
+        if row is None:
+            # Expired and removed by another process in between; try again
+            return self.claim(key, fp, ttl)
+        if row['fingerprint'] != fp:
+            return MISMATCH, None
+        if row['status_code'] is None:
+            return PENDING, None
+        return DONE, {'status_code': row['status_code'], 'response': json.loads(row['response']),
+                      'created_at': row['created_at']}
+
+    def complete(self, key: str, status_code: int, response: dict) -> None:
+        """Store the response of a claimed submission for later repeats."""
+        with self.get_connection() as conn:
+            conn.execute('UPDATE idempotency SET status_code = ?, response = ? WHERE key = ?',
+                         (status_code, json.dumps(response), key))
+
+    def release(self, key: str) -> None:
+        """Drop a claim so the next request with this key runs again."""
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM idempotency WHERE key = ?', (key,))
+
+    def stats(self) -> dict:
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT COUNT(*) AS entries, SUM(status_code IS NULL) AS pending '
+                               'FROM idempotency WHERE expires_at > ?', (time.time(),)).fetchone()
+        return {'entries': row['entries'], 'pending': row['pending'] or 0, 'max_entries': self.max_entries}
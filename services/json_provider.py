@@ -0,0 +1,46 @@
+"""Flask JSON provider backed by services.fast_json.
+
+Responses are serialized straight to bytes with orjson when it is installed,
+and with the stdlib (non-ASCII kept, compact separators) otherwise. Keys are
+emitted in insertion order rather than sorted. Types Flask handles beyond
+plain JSON (dates as HTTP dates, Decimal, UUID, dataclasses, __html__) go
+through Flask's default hook, so the output matches the stock provider
+apart from key order and escaping.
+"""
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+from services import fast_json
+
+# dumps() keyword arguments fast_json.dumps can honour; anything else goes to the stdlib
+_FAST_KWARGS = {'default', 'sort_keys', 'indent', 'separators', 'ensure_ascii'}
+_COMPACT = (',', ':')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify()/request.get_json() through orjson, with a stdlib fallback."""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # fast_json writes compact or 2-space indented output only; other layouts go to the stdlib
+        separators = kwargs.get('separators')
+        if (set(kwargs) - _FAST_KWARGS or kwargs.get('ensure_ascii') or kwargs.get('indent') not in (None, 2)
+                or (separators is not None and (kwargs.get('indent') or tuple(separators) != _COMPACT))):
+            return super().dumps(obj, **kwargs)
+        return fast_json.dumps(obj, default=kwargs.get('default', self.default),
+                               sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                               indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return fast_json.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = fast_json.dumps(obj, default=self.default, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,115 @@
+"""Bounded, append-only log of PR submission events in SQLite.
+
+Every PR trigger and attempt is appended as its own row, in one transaction
+per event, so concurrent writers (threads or gunicorn workers) never see or
+leave a half-written record. The log is a ring buffer: once it holds
+max_events rows, each append drops the oldest. Events are indexed by
+utility id (a batch event is indexed under each of its utilities) and by
+time, which keeps GET /api/pr/events?utility=&since= cheap.
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+
+def parse_since(value: str) -> float:
+    """Epoch seconds from an ISO-8601 timestamp or a number of epoch seconds; ValueError otherwise."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    stamp = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.timestamp()
+
+
+class PREventLog:
+    """Ring buffer of the last max_events PR events."""
+
+    def __init__(self, db_path: str, max_events: int = 5000):
+        self.db_path = db_path
+        self.max_events = max(1, max_events)
+        self.init_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def init_database(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pr_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    event TEXT NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pr_event_utilities (
+                    utility_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (utility_id, seq)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pr_events_ts ON pr_events(ts)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pr_event_utilities_seq ON pr_event_utilities(seq)')
+
+    def append(self, kind: str, event: dict, utility_ids: Iterable[str] = ()) -> int:
+        """Append one event atomically and return its sequence number."""
+        # Microsecond precision, so the ISO timestamp we return round-trips through ?since=
+        ts = round(time.time(), 6)
+        ids = sorted({str(u) for u in utility_ids if u})
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            seq = conn.execute('INSERT INTO pr_events (ts, kind, event) VALUES (?, ?, ?)',
+                               (ts, kind, json.dumps(event, default=str))).lastrowid
+            conn.executemany('INSERT OR IGNORE INTO pr_event_utilities (utility_id, seq) VALUES (?, ?)',
+                             [(u, seq) for u in ids])
+            # seq only grows, so everything max_events or more behind the new row is the overflow
+            oldest = seq - self.max_events
+            if oldest > 0:
+                conn.execute('DELETE FROM pr_events WHERE seq <= ?', (oldest,))
+                conn.execute('DELETE FROM pr_event_utilities WHERE seq <= ?', (oldest,))
+        return seq
+
+    def events(self, utility: Optional[str] = None, since: Optional[float] = None, limit: int = 100) -> List[dict]:
+        """Newest first; optionally only one utility's events and/or those after since (epoch seconds)."""
+        where, args = [], []
+        if utility:
+            where.append('e.seq IN (SELECT seq FROM pr_event_utilities WHERE utility_id = ?)')
+            args.append(utility)
+        if since is not None:
+            where.append('e.ts > ?')
+            args.append(since)
+        sql = 'SELECT e.seq, e.ts, e.kind, e.event FROM pr_events e'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY e.seq DESC LIMIT ?'
+        with self.get_connection() as conn:
+            rows = conn.execute(sql, args + [limit]).fetchall()
+        return [{'seq': row['seq'],
+                 'timestamp': datetime.fromtimestamp(row['ts'], timezone.utc).isoformat(),
+                 'kind': row['kind'],
+                 'event': json.loads(row['event'])} for row in rows]
+
+    def stats(self) -> dict:
+        with self.get_connection() as conn:
+            count, first, last = conn.execute('SELECT COUNT(*), MIN(seq), MAX(seq) FROM pr_events').fetchone()
+        return {'events': count, 'first_seq': first, 'last_seq': last, 'max_events': self.max_events}
@@ -0,0 +1,332 @@
+"""Background PR submission jobs persisted in SQLite.
+
+Routes enqueue a job and return immediately; a bounded thread pool runs the
+registered handler for the job's kind and the job row is updated after every
+step, so GET /api/pr/jobs/<id> shows live progress. Payloads are stored with
+the job, so queued work survives a restart. Kinds registered with a batch
+handler can coalesce jobs that arrive within a short time window into one run.
+
+Several processes can share one job database. A running job carries a lease
+(owner and claimed_until) that its process renews while it works; a job is
+only taken over by another process, or re-run on the next start, once that
+lease has expired, i.e. its owner died. The executor starts on start() or on
+the first submit(), never on construction.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# handler(payload, on_step) -> result dict; on_step(step) reports each step as it completes
+Handler = Callable[[dict, Callable[[dict], None]], dict]
+# batch_handler(payloads, on_step) -> one result dict per payload, in order
+BatchHandler = Callable[[List[dict], Callable[[dict], None]], List[dict]]
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+# A job interrupted this many times (its owner died mid-run) is failed instead of re-run
+MAX_ATTEMPTS = 3
+
+# Columns added after the first release; created on existing databases by init_database()
+_LEASE_COLUMNS = {'owner': 'TEXT', 'claimed_until': 'REAL'}
+
+
+class QueueFull(Exception):
+    """Raised by submit() when max_pending jobs are already waiting or running."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PRJobQueue:
+    """Bounded pool of PR jobs with SQLite persistence."""
+
+    def __init__(self, db_path: str, workers: int = 2, max_pending: int = 100,
+                 keep_finished: int = 1000, lease: float = 60.0):
+        self.db_path = db_path
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        # Finished jobs beyond this many (newest kept) are deleted
+        self.keep_finished = keep_finished
+        # Seconds a running job stays ours without a heartbeat; renewed every lease / 3
+        self.lease = lease
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._handlers: Dict[str, Handler] = {}
+        # kind -> (batch_handler, window seconds, max jobs per batch)
+        self._batching: Dict[str, tuple] = {}
+        # kind -> {'jobs': [(id, payload)], 'full': Event} while a worker collects a batch
+        self._collecting: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self.init_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def init_database(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pr_jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    payload TEXT NOT NULL,
+                    steps TEXT NOT NULL DEFAULT '[]',
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    owner TEXT,
+                    claimed_until REAL
+                )
+            ''')
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(pr_jobs)')}
+            for column, decl in _LEASE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE pr_jobs ADD COLUMN {column} {decl}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pr_jobs_status ON pr_jobs(status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pr_jobs_created ON pr_jobs(created_at)')
+
+    def register(self, kind: str, handler: Handler, batch_handler: Optional[BatchHandler] = None,
+                 batch_window: float = 0.0, batch_max: int = 50) -> None:
+        """Register the handler for a job kind.
+
+        With a batch_handler and batch_window > 0, jobs of this kind arriving
+        within batch_window seconds of each other (up to batch_max) run as one
+        batch_handler call; each job gets its own entry of the returned list.
+        """
+        self._handlers[kind] = handler
+        if batch_handler is not None and batch_window > 0:
+            self._batching[kind] = (batch_handler, batch_window, max(1, batch_max))
+        else:
+            self._batching.pop(kind, None)
+
+    def start(self) -> None:
+        """Start the worker pool and the lease heartbeat, and schedule queued or orphaned jobs.
+
+        Jobs another live process is running keep their lease and are left alone.
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pr-job')
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='pr-job-lease', daemon=True)
+            self._heartbeat.start()
+        self._reclaim_expired()
+        with self.get_connection() as conn:
+            rows = conn.execute('SELECT id FROM pr_jobs WHERE status = ? ORDER BY created_at', (QUEUED,)).fetchall()
+        self._schedule([row['id'] for row in rows])
+
+    def submit(self, kind: str, payload: dict) -> str:
+        """Persist a job and schedule it; returns the job id."""
+        if kind not in self._handlers:
+            raise ValueError(f'unknown job kind: {kind}')
+        self.start()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f'{self._pending} PR jobs already pending')
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        try:
+            with self.get_connection() as conn:
+                conn.execute('INSERT INTO pr_jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                             (job_id, kind, QUEUED, json.dumps(payload), _now()))
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT * FROM pr_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        with self.get_connection() as conn:
+            rows = conn.execute('SELECT * FROM pr_jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [self._to_dict(row, with_payload=False) for row in rows]
+
+    def stats(self) -> dict:
+        with self.get_connection() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM pr_jobs GROUP BY status').fetchall())
+        return {'workers': self.workers, 'pending': self._pending,
+                'max_pending': self.max_pending, 'by_status': counts}
+
+    def _schedule(self, job_ids: List[str]) -> None:
+        for job_id in job_ids:
+            with self._lock:
+                self._pending += 1
+            self._executor.submit(self._run, job_id)
+
+    def _reclaim_expired(self) -> List[str]:
+        """Requeue running jobs whose lease expired (owner died); fail those out of attempts.
+
+        Returns the ids put back in the queue.
+        """
+        now = time.time()
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Rows from before leases existed have no claimed_until; their owner is gone too
+            expired = 'status = ? AND (claimed_until IS NULL OR claimed_until <= ?)'
+            conn.execute(f'UPDATE pr_jobs SET status = ?, error = ?, finished_at = ?, claimed_until = NULL '
+                         f'WHERE {expired} AND attempts >= ?',
+                         (FAILED, 'interrupted too many times', _now(), RUNNING, now, MAX_ATTEMPTS))
+            rows = conn.execute(f'SELECT id FROM pr_jobs WHERE {expired} ORDER BY created_at',
+                                (RUNNING, now)).fetchall()
+            conn.executemany('UPDATE pr_jobs SET status = ?, owner = NULL, claimed_until = NULL WHERE id = ?',
+                             [(QUEUED, row['id']) for row in rows])
+        return [row['id'] for row in rows]
+
+    def _heartbeat_loop(self) -> None:
+        """Renew the leases of jobs this process runs and pick up jobs orphaned by others."""
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                with self.get_connection() as conn:
+                    conn.execute('UPDATE pr_jobs SET claimed_until = ? WHERE owner = ? AND status = ?',
+                                 (time.time() + self.lease, self.owner, RUNNING))
+                self._schedule(self._reclaim_expired())
+            except Exception as e:
+                print(f"⚠️ PR job lease heartbeat failed: {e}")
+
+    def _run(self, job_id: str) -> None:
+        try:
+            row = self._claim(job_id)
+            if row is None:
+                return
+            kind = row['kind']
+            jobs = [(job_id, json.loads(row['payload']))]
+            if kind in self._batching:
+                jobs = self._collect(kind, jobs)
+                if not jobs:
+                    # Handed over to the worker already collecting this kind
+                    return
+            ids = [jid for jid, _ in jobs]
+            steps: List[dict] = []
+
+            def on_step(step: dict) -> None:
+                steps.append(step)
+                with self.get_connection() as conn:
+                    conn.executemany('UPDATE pr_jobs SET steps = ? WHERE id = ? AND owner = ?',
+                                     [(json.dumps(steps), jid, self.owner) for jid in ids])
+
+            try:
+                if len(jobs) > 1:
+                    handler, _, _ = self._batching[kind]
+                    results = handler([payload for _, payload in jobs], on_step)
+                else:
+                    results = [self._handlers[kind](jobs[0][1], on_step)]
+                outcomes = [(SUCCEEDED if r.get('ok', True) else FAILED, r, r.get('error')) for r in results]
+            except Exception as e:
+                outcomes = [(FAILED, None, f'{type(e).__name__}: {e}')] * len(jobs)
+            with self.get_connection() as conn:
+                # A job whose lease lapsed (e.g. this process was suspended) belongs to its new owner now
+                conn.executemany('UPDATE pr_jobs SET status = ?, result = ?, error = ?, steps = ?, finished_at = ?, '
+                                 'claimed_until = NULL WHERE id = ? AND owner = ?',
+                                 [(status, json.dumps(result) if result is not None else None, error,
+                                   json.dumps(steps), _now(), jid, self.owner)
+                                  for jid, (status, result, error) in zip(ids, outcomes)])
+            self._prune()
+        except Exception as e:
+            print(f"⚠️ PR job {job_id} could not be recorded: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _claim(self, job_id: str):
+        """Lease a queued job to this process; None if another worker (or process) already has it."""
+        with self.get_connection() as conn:
+            claimed = conn.execute('UPDATE pr_jobs SET status = ?, started_at = ?, attempts = attempts + 1, '
+                                   "steps = '[]', owner = ?, claimed_until = ? WHERE id = ? AND status = ?",
+                                   (RUNNING, _now(), self.owner, time.time() + self.lease,
+                                    job_id, QUEUED)).rowcount
+            if not claimed:
+                return None
+            return conn.execute('SELECT kind, payload FROM pr_jobs WHERE id = ?', (job_id,)).fetchone()
+
+    def _collect(self, kind: str, jobs: List[tuple]) -> List[tuple]:
+        """Coalesce claimed jobs of a batchable kind for up to its time window.
+
+        The first worker to get a job of the kind becomes the collector; jobs
+        other workers pick up meanwhile are handed to it (those workers get []
+        back). Still-queued rows of the kind are claimed at the end so jobs
+        waiting behind busy workers join the batch too.
+        """
+        _, window, max_items = self._batching[kind]
+        with self._lock:
+            group = self._collecting.get(kind)
+            if group is not None:
+                group['jobs'].extend(jobs)
+                if len(group['jobs']) >= max_items:
+                    group['full'].set()
+                return []
+            group = self._collecting[kind] = {'jobs': list(jobs), 'full': threading.Event()}
+        group['full'].wait(window)
+        with self._lock:
+            del self._collecting[kind]
+            jobs = group['jobs']
+        room = max_items - len(jobs)
+        if room > 0:
+            with self.get_connection() as conn:
+                rows = conn.execute('SELECT id FROM pr_jobs WHERE kind = ? AND status = ? '
+                                    'ORDER BY created_at LIMIT ?', (kind, QUEUED, room)).fetchall()
+            for row in rows:
+                claimed = self._claim(row['id'])
+                if claimed is not None:
+                    jobs.append((row['id'], json.loads(claimed['payload'])))
+        return jobs
+
+    def _prune(self) -> None:
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM pr_jobs WHERE status IN (?, ?) AND id NOT IN '
+                         '(SELECT id FROM pr_jobs WHERE status IN (?, ?) ORDER BY created_at DESC LIMIT ?)',
+                         FINISHED + FINISHED + (self.keep_finished,))
+
+    @staticmethod
+    def _to_dict(row, with_payload: bool = True) -> dict:
+        data = {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'steps': json.loads(row['steps'] or '[]'),
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'owner': row['owner'],
+        }
+        if with_payload:
+            data['payload'] = json.loads(row['payload'])
+        return data
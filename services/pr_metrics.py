@@ -0,0 +1,64 @@
+"""In-process latency metrics for the PR pipeline.
+
+Each named stage (git fetch, git push, create PR, ...) keeps its most recent
+durations in a fixed-size window; percentiles are computed from that window
+when metrics are read, so they describe current behaviour rather than the
+whole process lifetime. Counts, errors and totals cover the whole lifetime.
+"""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+WINDOW = 1024
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageMetrics:
+    """Thread-safe per-stage duration histograms."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        # stage -> {'count', 'errors', 'total_ms', 'max_ms'} since start
+        self._totals: Dict[str, dict] = {}
+
+    def observe(self, stage: str, ms: float, ok: bool = True) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            samples.append(ms)
+            t = self._totals[stage]
+            t['count'] += 1
+            t['errors'] += 0 if ok else 1
+            t['total_ms'] += ms
+            t['max_ms'] = max(t['max_ms'], ms)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """stage -> count, errors, avg/max and p50/p95/p99 (ms) over the recent window."""
+        with self._lock:
+            data = {stage: (sorted(samples), dict(self._totals[stage]))
+                    for stage, samples in self._samples.items()}
+        out = {}
+        for stage, (ordered, t) in data.items():
+            entry = {'count': t['count'], 'errors': t['errors'],
+                     'avg_ms': round(t['total_ms'] / t['count'], 2), 'max_ms': round(t['max_ms'], 2),
+                     'window': len(ordered)}
+            for pct in PERCENTILES:
+                entry[f'p{pct}_ms'] = round(_percentile(ordered, pct), 2)
+            out[stage] = entry
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
@@ -0,0 +1,172 @@
+"""Cross-process fair lock for steps that mutate the shared .git directory.
+
+Several server processes (gunicorn workers) share one repository; fetches,
+branch creation and worktree administration from two of them at once fight
+over index.lock, packed-refs and .git/worktrees. RepoLock serializes those
+steps in arrival order:
+
+- a waiter takes a numbered ticket (a file in the lock directory, created
+  under a short flock on a counter file) and keeps its ticket flock'ed for
+  as long as it waits or holds the lock;
+- the holder is the lowest ticket; everyone else waits for the ticket just
+  ahead of them to disappear;
+- a ticket whose flock can be taken belongs to a process that died, and is
+  removed by the next waiter.
+
+flock locks belong to open file descriptions, so threads of one process
+queue the same way as separate processes. Without fcntl (Windows) the lock
+falls back to a process-local mutex per lock directory and name, which still
+serializes threads but not separate processes.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+_local_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+class LockTimeout(RuntimeError):
+    """Raised when the lock is not acquired within the requested timeout."""
+
+
+class RepoLock:
+    """Named FIFO lock shared by every process that uses the same lock directory."""
+
+    def __init__(self, lock_dir: str, name: str = 'repo', poll: float = 0.01, max_poll: float = 0.05):
+        self.lock_dir = lock_dir
+        self.name = name
+        self.poll = poll
+        self.max_poll = max_poll
+        self._stats_lock = threading.Lock()
+        self._counters = {'acquired': 0, 'contended': 0, 'timeouts': 0, 'stale_removed': 0,
+                          'wait_ms_total': 0.0, 'wait_ms_max': 0.0, 'held_ms_total': 0.0}
+
+    @contextmanager
+    def hold(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold the lock for the duration of the block; LockTimeout after timeout seconds of waiting."""
+        started = time.perf_counter()
+        with (self._queue if fcntl is not None else self._local)(started, timeout):
+            acquired = time.perf_counter()
+            waited = (acquired - started) * 1000
+            with self._stats_lock:
+                self._counters['acquired'] += 1
+                self._counters['wait_ms_total'] += waited
+                self._counters['wait_ms_max'] = max(self._counters['wait_ms_max'], waited)
+            try:
+                yield
+            finally:
+                with self._stats_lock:
+                    self._counters['held_ms_total'] += (time.perf_counter() - acquired) * 1000
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = {k: round(v, 2) if isinstance(v, float) else v for k, v in self._counters.items()}
+        data.update({'name': self.name, 'lock_dir': self.lock_dir, 'queued': len(self._tickets())})
+        return data
+
+    @contextmanager
+    def _queue(self, started: float, timeout: Optional[float]) -> Iterator[None]:
+        """Cross-process FIFO turn via ticket files."""
+        fd, ticket = self._take_ticket()
+        try:
+            self._wait_turn(ticket, started, timeout)
+            yield
+        finally:
+            try:
+                os.unlink(os.path.join(self.lock_dir, ticket))
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    @contextmanager
+    def _local(self, started: float, timeout: Optional[float]) -> Iterator[None]:
+        """Process-local turn, used where fcntl is unavailable."""
+        with _local_locks_guard:
+            lock = _local_locks.setdefault((os.path.abspath(self.lock_dir), self.name), threading.Lock())
+        if not lock.acquire(blocking=False):
+            with self._stats_lock:
+                self._counters['contended'] += 1
+            remaining = -1 if timeout is None else max(0.0, timeout - (time.perf_counter() - started))
+            if not lock.acquire(timeout=remaining):
+                with self._stats_lock:
+                    self._counters['timeouts'] += 1
+                raise LockTimeout(f'{self.name} lock not acquired after {timeout}s')
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def _take_ticket(self):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        counter_fd = os.open(os.path.join(self.lock_dir, f'{self.name}.counter'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(counter_fd, fcntl.LOCK_EX)
+            raw = os.pread(counter_fd, 32, 0).strip()
+            seq = int(raw) + 1 if raw.isdigit() else 1
+            os.pwrite(counter_fd, f'{seq:<20d}'.encode('ascii'), 0)
+            # Lock the ticket before it becomes visible, so nobody takes it for a dead one
+            ticket = f'{self.name}.{seq:020d}.ticket'
+            tmp = os.path.join(self.lock_dir, f'{ticket}.{os.getpid()}.{threading.get_ident()}.tmp')
+            fd = os.open(tmp, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            os.rename(tmp, os.path.join(self.lock_dir, ticket))
+        finally:
+            os.close(counter_fd)
+        return fd, ticket
+
+    def _tickets(self) -> List[str]:
+        try:
+            names = os.listdir(self.lock_dir)
+        except FileNotFoundError:
+            return []
+        prefix = f'{self.name}.'
+        return sorted(n for n in names if n.startswith(prefix) and n.endswith('.ticket'))
+
+    def _wait_turn(self, ticket: str, started: float, timeout: Optional[float]) -> None:
+        delay = self.poll
+        contended = False
+        while True:
+            ahead = [t for t in self._tickets() if t < ticket]
+            if not ahead:
+                return
+            if not contended:
+                contended = True
+                with self._stats_lock:
+                    self._counters['contended'] += 1
+            if self._is_stale(ahead[-1]):
+                continue
+            if timeout is not None and time.perf_counter() - started >= timeout:
+                with self._stats_lock:
+                    self._counters['timeouts'] += 1
+                raise LockTimeout(f'{self.name} lock not acquired after {timeout}s ({len(ahead)} ahead)')
+            time.sleep(delay)
+            delay = min(self.max_poll, delay * 2)
+
+    def _is_stale(self, ticket: str) -> bool:
+        """Remove and report True if the ticket's owner no longer holds it (process died)."""
+        path = os.path.join(self.lock_dir, ticket)
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+        with self._stats_lock:
+            self._counters['stale_removed'] += 1
+        return True
@@ -0,0 +1,123 @@
+"""Background worker that keeps the served working copy in sync with Git.
+
+The request path never touches git: a daemon thread runs the sync function
+every `interval` seconds and records the outcome, so GET handlers always
+serve the last good catalog immediately.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+class RepoSyncWorker:
+    """Periodic, single-flight runner for a repo sync function.
+
+    sync_fn returns (ok, message). on_success runs after every successful sync,
+    e.g. to revalidate caches off the request path. When lock_path is set, an
+    flock on it keeps several server processes from syncing the same working
+    copy at once.
+    """
+
+    def __init__(self, sync_fn: Callable[[], Tuple[bool, str]], interval: float = 60.0,
+                 on_success: Optional[Callable[[], None]] = None, lock_path: Optional[str] = None):
+        self.sync_fn = sync_fn
+        self.interval = interval
+        self.on_success = on_success
+        self.lock_path = lock_path
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._status = {
+            'running': False,
+            'last_sync_at': None,
+            'last_duration_ms': None,
+            'last_outcome': None,
+            'last_message': '',
+            'last_success_at': None,
+            'runs': 0,
+            'failures': 0,
+            'skipped': 0,
+        }
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='repo-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        data = dict(self._status)
+        data['interval'] = self.interval
+        data['worker_alive'] = bool(self._thread and self._thread.is_alive())
+        return data
+
+    def run_once(self) -> str:
+        """Run one sync unless another is in flight; returns the outcome."""
+        if not self._run_lock.acquire(blocking=False):
+            self._status['skipped'] += 1
+            return 'skipped'
+        lock_file = None
+        try:
+            lock_file = self._acquire_file_lock()
+            if lock_file is False:
+                self._status['skipped'] += 1
+                return 'skipped'
+            self._status['running'] = True
+            started = time.perf_counter()
+            try:
+                ok, message = self.sync_fn()
+            except Exception as e:
+                ok, message = False, str(e)
+            if ok and self.on_success:
+                try:
+                    self.on_success()
+                except Exception as e:
+                    ok, message = False, f'post-sync hook failed: {e}'
+            now = datetime.now(timezone.utc).isoformat()
+            self._status.update({
+                'last_sync_at': now,
+                'last_duration_ms': round((time.perf_counter() - started) * 1000, 1),
+                'last_outcome': 'ok' if ok else 'error',
+                'last_message': message,
+            })
+            self._status['runs'] += 1
+            if ok:
+                self._status['last_success_at'] = now
+            else:
+                self._status['failures'] += 1
+            return self._status['last_outcome']
+        finally:
+            self._status['running'] = False
+            if lock_file:
+                lock_file.close()
+            self._run_lock.release()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def _acquire_file_lock(self):
+        """Return an open locked file, None when not configured, or False if busy."""
+        if not self.lock_path or fcntl is None or not os.path.isdir(os.path.dirname(self.lock_path)):
+            return None
+        f = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        return f
@@ -0,0 +1,528 @@
+"""In-process cache of the per-utility JSON catalog.
+
+Keeps parsed, normalized utilities in memory and revalidates them against
+static/utilities/ by file (mtime, size), so a GET only re-reads the files
+that actually changed since the last check. Every change produces a new
+content-derived `version` usable as a strong ETag.
+
+Optionally the catalog is compiled into a single snapshot file (items plus a
+manifest of source mtime/size/sha1) so a cold start is one read instead of N
+opens and parses; entries whose source file no longer matches the manifest
+fall back to the per-file parse.
+
+A bounded history of per-version change sets (utility ids added, modified and
+removed) lets clients that already hold version V fetch only the delta.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from services import fast_json
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('sig', 'digest', 'item')
+
+    def __init__(self, sig: Tuple[int, int], digest: str, item: dict):
+        self.sig = sig
+        self.digest = digest
+        self.item = item
+
+
+# Below this many files to (re)parse, a thread pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+SNAPSHOT_FORMAT = 'utility-catalog-snapshot'
+SNAPSHOT_SCHEMA = 1
+
+# Number of past versions whose change sets are kept for changes_since()
+HISTORY_SIZE = 256
+
+# Fields searched by the free-text `q` filter
+TEXT_FIELDS = ('title', 'description', 'type', 'source_language', 'committer', 'developer')
+
+
+def slugify(text: str) -> str:
+    return (text or '').strip().lower().replace(' ', '-')
+
+
+def _attr_key(value) -> str:
+    return str(value or '').strip().lower()
+
+
+def _item_id(name: str, item: dict) -> str:
+    # Items without an id are tracked by file name so deltas still cover them
+    uid = item.get('id') if isinstance(item, dict) else None
+    return str(uid) if uid else name
+
+
+class CatalogIndex:
+    """Lookup tables over one catalog version.
+
+    id/title/slug -> item for single lookups, plus per-attribute position lists
+    (type, source_language) and lowercased text for list filtering.
+    """
+
+    def __init__(self, items: List[dict], version: str = ''):
+        self.version = version
+        self.items = list(items)
+        self.by_id: Dict[str, dict] = {}
+        self.title_to_id: Dict[str, str] = {}
+        self.slug_to_id: Dict[str, str] = {}
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_language: Dict[str, List[int]] = {}
+        self._text: List[str] = []
+        for pos, item in enumerate(self.items):
+            self.by_type.setdefault(_attr_key(item.get('type')), []).append(pos)
+            self.by_language.setdefault(_attr_key(item.get('source_language')), []).append(pos)
+            self._text.append(' '.join(str(item.get(f) or '') for f in TEXT_FIELDS).lower())
+            uid = item.get('id')
+            if not uid:
+                continue
+            uid = str(uid)
+            # First file wins on duplicates, matching the old linear scan
+            self.by_id.setdefault(uid, item)
+            title = item.get('title')
+            if title:
+                self.title_to_id.setdefault(title, uid)
+                self.slug_to_id.setdefault(slugify(title), uid)
+        self.ids = frozenset(self.by_id)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Resolve an id, exact title or title slug to its item."""
+        key = str(key)
+        if key in self.by_id:
+            return self.by_id[key]
+        uid = self.title_to_id.get(key) or self.slug_to_id.get(slugify(key))
+        return self.by_id.get(uid) if uid else None
+
+    def filter(self, type_: Optional[str] = None, source_language: Optional[str] = None,
+               q: Optional[str] = None) -> List[dict]:
+        """Return items matching all given filters, in catalog order.
+
+        type_ and source_language are case-insensitive exact matches and accept
+        comma-separated alternatives; q requires every whitespace-separated term
+        to appear somewhere in TEXT_FIELDS.
+        """
+        positions = None
+        for table, value in ((self.by_type, type_), (self.by_language, source_language)):
+            if not value:
+                continue
+            matched = set()
+            for alt in value.split(','):
+                matched.update(table.get(_attr_key(alt), ()))
+            positions = matched if positions is None else positions & matched
+        candidates = sorted(positions) if positions is not None else range(len(self.items))
+        terms = (q or '').lower().split()
+        if terms:
+            candidates = [p for p in candidates if all(t in self._text[p] for t in terms)]
+        return [self.items[p] for p in candidates]
+
+
+class CatalogSnapshot(NamedTuple):
+    """One catalog version: its validators and the items/index they describe."""
+    version: str
+    last_modified: float
+    items: List[dict]
+    index: CatalogIndex
+
+
+class UtilityCatalog:
+    """Cache of <directory>/*.json keyed by file name.
+
+    Items returned by items() are shared between callers and must be treated
+    as read-only.
+    """
+
+    def __init__(self, directory: str, normalize: Optional[Callable[[dict], dict]] = None,
+                 check_interval: float = 1.0, snapshot_path: Optional[str] = None,
+                 load_workers: int = 8, history_size: int = HISTORY_SIZE):
+        self.directory = directory
+        # Max threads used to open and parse files on a cold or bulk reload
+        self.load_workers = max(1, load_workers)
+        self.snapshot_path = snapshot_path
+        self.normalize = normalize or (lambda item: item)
+        # Minimum seconds between filesystem checks; 0 checks on every read
+        self.check_interval = check_interval
+        self.generation = 0
+        # sha256 over (file name, content digest) pairs; identical across processes
+        self.version = ''
+        # POSIX timestamp of the newest file or directory entry change
+        self.last_modified = 0.0
+        self._dir_mtime_ns = 0
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._errors: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # file name -> signature last logged as malformed, so each broken version is reported once
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._items: List[dict] = []
+        self._index: Optional[CatalogIndex] = None
+        self._listeners: List[Callable[[Dict[str, dict], List[str]], None]] = []
+        # file name -> utility id, as of the current version
+        self._ids: Dict[str, str] = {}
+        # Oldest first: {'from', 'version', 'generation', 'at', 'added', 'modified', 'removed'}
+        self._history: deque = deque(maxlen=max(1, history_size))
+        self._last_check = 0.0
+        self._snapshot_version = None
+        self._snapshot_loaded = False
+        self._last_load: dict = {}
+        self._counters = {'hits': 0, 'misses': 0, 'reloads': 0, 'checks': 0,
+                          'files_parsed': 0, 'parse_errors': 0,
+                          'snapshot_hits': 0, 'snapshot_writes': 0, 'snapshot_errors': 0}
+
+    def items(self) -> List[dict]:
+        """Return all utilities in file name order, revalidating if due."""
+        with self._lock:
+            if self.revalidate():
+                self._counters['misses'] += 1
+            else:
+                self._counters['hits'] += 1
+            return self._items
+
+    def index(self) -> CatalogIndex:
+        """Return the lookup index for the current version, building it at most once."""
+        with self._lock:
+            items = self.items()
+            if self._index is None or self._index.version != self.version:
+                self._index = CatalogIndex(items, self.version)
+            return self._index
+
+    @contextmanager
+    def reading(self) -> Iterator[CatalogSnapshot]:
+        """Revalidate, then hold the catalog lock so no reload (or listener run) interleaves.
+
+        Use it when the payload depends on state kept in step by listeners, such
+        as the search index; otherwise snapshot() is enough.
+        """
+        with self._lock:
+            index = self.index()
+            yield CatalogSnapshot(self.version, self.last_modified, self._items, index)
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Version, Last-Modified time, items and index taken together under the lock."""
+        with self.reading() as snap:
+            return snap
+
+    def subscribe(self, listener: Callable[[Dict[str, dict], List[str]], None]) -> None:
+        """Call listener(upserts, removed) with file-name keys after every reload.
+
+        The listener is primed immediately with the current contents so derived
+        structures (e.g. a search index) can be maintained incrementally.
+        """
+        with self._lock:
+            self.items()
+            self._listeners.append(listener)
+            listener({name: e.item for name, e in self._entries.items()}, [])
+
+    def invalidate(self) -> None:
+        """Force the next read to check the filesystem again."""
+        with self._lock:
+            self._last_check = 0.0
+
+    def revalidate(self, force: bool = False) -> bool:
+        """Re-stat the directory and reparse changed files; True if anything changed."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_check and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            self._counters['checks'] += 1
+            previous = self.version
+            upserts, removed = self._scan()
+            # The first scan always publishes a version, even for an empty directory
+            changed = bool(upserts or removed) or self.generation == 0
+            if changed:
+                names = sorted(self._entries)
+                self._items = [self._entries[name].item for name in names]
+                self.generation += 1
+                h = hashlib.sha256()
+                for name in names:
+                    h.update(f"{name}\0{self._entries[name].digest}\n".encode('utf-8'))
+                self.version = h.hexdigest()
+                newest = max([self._dir_mtime_ns] + [e.sig[0] for e in self._entries.values()])
+                self.last_modified = newest / 1e9
+                self._counters['reloads'] += 1
+                self._record_change(previous, upserts, removed)
+                if self.snapshot_path and self.version != self._snapshot_version:
+                    self.write_snapshot()
+                for listener in self._listeners:
+                    listener({name: self._entries[name].item for name in upserts}, removed)
+            return changed
+
+    def changes_since(self, version: str, snapshot: Optional[CatalogSnapshot] = None) -> Optional[dict]:
+        """Net utility-id delta from `version` to the current version.
+
+        Returns {'from', 'version', 'added', 'modified', 'removed'} (sorted id
+        lists), or None when `version` is unknown or has aged out of the
+        history and the client must resync from the full list. With a
+        snapshot, the delta ends at the snapshot's version and the catalog
+        is not revalidated, so it matches a response built from that snapshot.
+        """
+        if snapshot is None:
+            self.items()
+        with self._lock:
+            target = self.version if snapshot is None else snapshot.version
+            if version == target:
+                return {'from': version, 'version': target,
+                        'added': [], 'modified': [], 'removed': []}
+            records = list(self._history)
+            start = None
+            for pos in range(len(records) - 1, -1, -1):
+                if records[pos]['from'] == version:
+                    start = pos
+                    break
+            if start is None or not version:
+                return None
+            end = next((pos for pos in range(start, len(records)) if records[pos]['version'] == target), None)
+            if end is None:
+                return None
+            added, modified, removed = set(), set(), set()
+            for record in records[start:end + 1]:
+                for uid in record['removed']:
+                    if uid in added:
+                        added.discard(uid)
+                    else:
+                        modified.discard(uid)
+                        removed.add(uid)
+                for uid in record['added']:
+                    if uid in removed:
+                        removed.discard(uid)
+                        modified.add(uid)
+                    else:
+                        added.add(uid)
+                for uid in record['modified']:
+                    if uid not in added:
+                        modified.add(uid)
+            return {'from': version, 'version': target, 'added': sorted(added),
+                    'modified': sorted(modified), 'removed': sorted(removed)}
+
+    def history(self) -> List[dict]:
+        """Recorded change sets, oldest first."""
+        with self._lock:
+            return [dict(record) for record in self._history]
+
+    def _record_change(self, previous: str, upserts: List[str], removed: List[str]) -> None:
+        added_ids, modified_ids, removed_ids = set(), set(), set()
+        for name in removed:
+            uid = self._ids.pop(name, None)
+            if uid is not None:
+                removed_ids.add(uid)
+        for name in upserts:
+            uid = _item_id(name, self._entries[name].item)
+            old = self._ids.get(name)
+            self._ids[name] = uid
+            if old is None:
+                added_ids.add(uid)
+            elif old == uid:
+                modified_ids.add(uid)
+            else:
+                removed_ids.add(old)
+                added_ids.add(uid)
+        # Ids that moved between files (or are still served from a duplicate
+        # file) are modifications, not removals
+        moved = removed_ids & (added_ids | set(self._ids.values()))
+        removed_ids -= moved
+        added_ids -= moved
+        modified_ids |= moved
+        if not previous:
+            # The initial load is not a change clients could have missed
+            return
+        self._history.append({
+            'from': previous,
+            'version': self.version,
+            'generation': self.generation,
+            'at': datetime.now(timezone.utc).isoformat(),
+            'added': sorted(added_ids),
+            'modified': sorted(modified_ids),
+            'removed': sorted(removed_ids),
+        })
+
+    def write_snapshot(self) -> bool:
+        """Atomically (temp file + rename) write the compiled snapshot; False on error."""
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            names = sorted(self._entries)
+            payload = {
+                'format': SNAPSHOT_FORMAT,
+                'schema': SNAPSHOT_SCHEMA,
+                'version': self.version,
+                'generated_at': datetime.now(timezone.utc).isoformat(),
+                'manifest': {name: {'mtime_ns': self._entries[name].sig[0],
+                                    'size': self._entries[name].sig[1],
+                                    'sha1': self._entries[name].digest} for name in names},
+                'items': {name: self._entries[name].item for name in names},
+            }
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.snapshot_path)
+            except (OSError, TypeError, ValueError):
+                self._counters['snapshot_errors'] += 1
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return False
+            self._snapshot_version = self.version
+            self._counters['snapshot_writes'] += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data.update({
+                'generation': self.generation,
+                'version': self.version,
+                'files': len(self._entries),
+                'snapshot_version': self._snapshot_version,
+                'json_backend': fast_json.BACKEND,
+                'last_load': dict(self._last_load),
+                'errors': {name: msg for name, (_, msg) in self._errors.items()},
+                'history': len(self._history),
+                'oldest_version': self._history[0]['from'] if self._history else self.version,
+            })
+            return data
+
+    def _stat_files(self) -> Dict[str, Tuple[int, int]]:
+        os.makedirs(self.directory, exist_ok=True)
+        self._dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+        found = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.lower().endswith('.json'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found[entry.name] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def _load_snapshot(self) -> Dict[str, Tuple[Tuple[int, int], str, dict]]:
+        """Read the snapshot once; returns name -> (sig, sha1, item), empty if unusable."""
+        self._snapshot_loaded = True
+        if not self.snapshot_path:
+            return {}
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                payload = fast_json.loads(f.read())
+            if payload.get('format') != SNAPSHOT_FORMAT or payload.get('schema') != SNAPSHOT_SCHEMA:
+                return {}
+            manifest = payload['manifest']
+            items = payload['items']
+            entries = {name: ((meta['mtime_ns'], meta['size']), meta['sha1'], items[name])
+                       for name, meta in manifest.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._counters['snapshot_errors'] += 1
+            return {}
+        self._snapshot_version = payload.get('version')
+        return entries
+
+    def _parse(self, name: str) -> Tuple[str, dict]:
+        path = os.path.join(self.directory, name)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        obj = fast_json.loads(raw)
+        if not isinstance(obj, dict):
+            raise ValueError('top-level JSON value is not an object')
+        return hashlib.sha1(raw).hexdigest(), self.normalize(obj)
+
+    def _parse_many(self, names: List[str]) -> Dict[str, Tuple[bool, object]]:
+        """Parse files, in a bounded thread pool when there are many.
+
+        Returns name -> (True, (digest, item)) or (False, error message).
+        """
+        def parse_one(name):
+            try:
+                return name, (True, self._parse(name))
+            except Exception as e:
+                return name, (False, f"{type(e).__name__}: {e}")
+
+        started = time.perf_counter()
+        workers = 1
+        if len(names) >= PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            # Reads release the GIL; on a single core the pool is pure overhead
+            workers = min(self.load_workers, len(names))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catalog-load') as pool:
+                results = dict(pool.map(parse_one, names))
+        else:
+            results = dict(parse_one(name) for name in names)
+        self._last_load = {
+            'files': len(names),
+            'errors': sum(1 for ok, _ in results.values() if not ok),
+            'workers': workers,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        return results
+
+    def _scan(self) -> Tuple[List[str], List[str]]:
+        """Sync entries with the directory; returns (upserted, removed) file names."""
+        found = self._stat_files()
+        snapshot = {} if self._snapshot_loaded else self._load_snapshot()
+        upserts: List[str] = []
+        removed: List[str] = []
+        for name in list(self._entries):
+            if name not in found:
+                del self._entries[name]
+                removed.append(name)
+        for name in list(self._errors):
+            if name not in found:
+                del self._errors[name]
+                self._reported.pop(name, None)
+        to_parse: List[str] = []
+        for name, sig in found.items():
+            entry = self._entries.get(name)
+            if entry is not None and entry.sig == sig:
+                continue
+            cached = snapshot.get(name)
+            if entry is None and cached is not None and cached[0] == sig:
+                # Source unchanged since the snapshot was compiled: no open/parse
+                self._entries[name] = _Entry(sig, cached[1], cached[2])
+                self._counters['snapshot_hits'] += 1
+                upserts.append(name)
+                continue
+            failed = self._errors.get(name)
+            if failed is not None and failed[0] == sig:
+                # Same broken bytes as last time; keep serving the last good copy
+                continue
+            to_parse.append(name)
+        results = self._parse_many(to_parse) if to_parse else {}
+        for name in to_parse:
+            sig = found[name]
+            entry = self._entries.get(name)
+            ok, value = results[name]
+            self._counters['files_parsed'] += 1
+            if not ok:
+                self._counters['parse_errors'] += 1
+                self._errors[name] = (sig, value)
+                if self._reported.get(name) != sig:
+                    self._reported[name] = sig
+                    logger.warning("Skipping malformed utility file %s: %s", os.path.join(self.directory, name), value)
+                continue
+            digest, item = value
+            self._errors.pop(name, None)
+            if entry is not None and entry.digest == digest:
+                # Touched but byte-identical: keep the cached object and version
+                entry.sig = sig
+                continue
+            self._entries[name] = _Entry(sig, digest, item)
+            upserts.append(name)
+        return upserts, removed
@@ -0,0 +1,227 @@
+"""Ranked full-text search over the utility catalog.
+
+An inverted index (term -> {doc: weighted term frequency}) scored with BM25
+over field-weighted term counts. Documents are keyed by catalog file name and
+updated incrementally from UtilityCatalog.subscribe(); queries support prefix
+matching and return HTML-safe highlights.
+"""
+import heapq
+import html
+import math
+import re
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
+
+# Field -> weight applied to term counts found in that field
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'type': 1.5,
+    'source_language': 1.5,
+    'committer': 1.0,
+    'description': 1.0,
+}
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+# Score multiplier for a document matched only through a prefix expansion
+PREFIX_PENALTY = 0.7
+# Max vocabulary terms a single query prefix may expand to
+MAX_EXPANSIONS = 50
+SNIPPET_CHARS = 160
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _field_text(item: dict, field: str) -> str:
+    value = item.get(field)
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(v) for v in value)
+    return str(value or '')
+
+
+class SearchIndex:
+    """Incrementally maintained BM25 index keyed by document key."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._docs: Dict[str, dict] = {}
+        self._total_len = 0.0
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        # term -> {doc: BM25 contribution}; valid until the next update
+        self._score_cache: Dict[str, Dict[str, float]] = {}
+        # (query term, prefix) -> best contribution per doc over its expansions
+        self._query_cache: Dict[tuple, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def update(self, upserts: Dict[str, dict], removed: Iterable[str] = ()) -> None:
+        """Apply a catalog change set; usable directly as a catalog listener."""
+        with self._lock:
+            self._score_cache.clear()
+            self._query_cache.clear()
+            for key in removed:
+                self._remove(key)
+            for key, item in upserts.items():
+                self._remove(key)
+                self._add(key, item)
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> List[dict]:
+        """Return up to limit hits as {'key', 'score', 'item', 'highlights'}, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            if not self._docs:
+                return []
+            per_term = sorted((self._query_term_scores(term, prefix) for term in terms), key=len)
+            if len(per_term) == 1:
+                scores = per_term[0]
+            else:
+                scores = dict(per_term[-1])
+                for term_scores in per_term[:-1]:
+                    for key, score in term_scores.items():
+                        scores[key] = scores.get(key, 0.0) + score
+            top = heapq.nlargest(max(1, limit), scores.items(), key=itemgetter(1))
+            ranked = sorted(top, key=lambda kv: (-kv[1], kv[0]))
+            return [{
+                'key': key,
+                'score': round(score, 4),
+                'item': self._docs[key],
+                'highlights': highlight(self._docs[key], terms, prefix),
+            } for key, score in ranked]
+
+    def _query_term_scores(self, term: str, prefix: bool) -> Dict[str, float]:
+        """Best score per doc for one query term over its exact and prefix expansions."""
+        cache_key = (term, prefix)
+        best = self._query_cache.get(cache_key)
+        if best is not None:
+            return best
+        best = {}
+        for expanded, factor in self._expand(term, prefix):
+            term_scores = self._term_scores(expanded)
+            if not best and factor == 1.0:
+                best = dict(term_scores)
+                continue
+            for key, score in term_scores.items():
+                score *= factor
+                if score > best.get(key, 0.0):
+                    best[key] = score
+        self._query_cache[cache_key] = best
+        return best
+
+    def _term_scores(self, term: str) -> Dict[str, float]:
+        cached = self._score_cache.get(term)
+        if cached is not None:
+            return cached
+        n_docs = len(self._docs)
+        avg_len = self._total_len / n_docs
+        postings = self._postings[term]
+        idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        k1, b, doc_len = self.k1, self.b, self._doc_len
+        cached = {key: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len[key] / avg_len))
+                  for key, tf in postings.items()}
+        self._score_cache[term] = cached
+        return cached
+
+    def _expand(self, term: str, prefix: bool):
+        if term in self._postings:
+            yield term, 1.0
+        if not prefix:
+            return
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        i = bisect_left(self._vocab, term)
+        count = 0
+        while i < len(self._vocab) and count < MAX_EXPANSIONS and self._vocab[i].startswith(term):
+            if self._vocab[i] != term:
+                yield self._vocab[i], PREFIX_PENALTY
+                count += 1
+            i += 1
+
+    def _add(self, key: str, item: dict) -> None:
+        weighted: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(item, field)):
+                weighted[token] = weighted.get(token, 0.0) + weight
+        for token, tf in weighted.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocab_dirty = True
+            postings[key] = tf
+        length = sum(weighted.values())
+        self._doc_terms[key] = weighted
+        self._doc_len[key] = length
+        self._docs[key] = item
+        self._total_len += length
+
+    def _remove(self, key: str) -> None:
+        weighted = self._doc_terms.pop(key, None)
+        if weighted is None:
+            return
+        for token in weighted:
+            postings = self._postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                self._vocab_dirty = True
+        self._total_len -= self._doc_len.pop(key)
+        self._docs.pop(key, None)
+
+
+def _term_pattern(terms: List[str], prefix: bool):
+    """Regex matching whole tokens equal to (or, with prefix, starting with) a term."""
+    alts = '|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    tail = r'[0-9a-z]*' if prefix else r'(?![0-9a-z])'
+    return re.compile(r'(?<![0-9a-z])(?:' + alts + ')' + tail, re.IGNORECASE)
+
+
+def _mark(text: str, pattern) -> Optional[str]:
+    """HTML-escape text, wrapping matching tokens in <mark>; None if nothing matched."""
+    out = []
+    last = 0
+    for m in pattern.finditer(text):
+        out.append(html.escape(text[last:m.start()]))
+        out.append('<mark>' + html.escape(m.group()) + '</mark>')
+        last = m.end()
+    if not out:
+        return None
+    out.append(html.escape(text[last:]))
+    return ''.join(out)
+
+
+def highlight(item: dict, terms: List[str], prefix: bool = True) -> Dict[str, str]:
+    """Return {field: highlighted html} for every indexed field containing a match.
+
+    Long fields are cut to a snippet around the first match.
+    """
+    pattern = _term_pattern(terms, prefix)
+    result = {}
+    for field in FIELD_WEIGHTS:
+        text = _field_text(item, field)
+        if not text:
+            continue
+        if len(text) > SNIPPET_CHARS:
+            first = pattern.search(text)
+            if first is None:
+                continue
+            start = max(0, first.start() - SNIPPET_CHARS // 4)
+            text = ('…' if start else '') + text[start:start + SNIPPET_CHARS] + \
+                ('…' if start + SNIPPET_CHARS < len(text) else '')
+        marked = _mark(text, pattern)
+        if marked is not None:
+            result[field] = marked
+    return result
@@ -0,0 +1,293 @@
+"""Durable outbox for outgoing CI webhooks.
+
+Events are committed to SQLite when they are raised and delivered later by
+a background dispatcher, so the request or job that raised them never waits
+on the CI endpoint and a delivery that fails is retried instead of lost.
+
+Deliveries are claimed with a lease (several processes can share one
+outbox; a delivery held by a process that died is picked up again when its
+lease expires), sent with bounded concurrency, and retried with jittered
+exponential backoff. Every attempt is recorded with its latency.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+PENDING = 'pending'
+DELIVERING = 'delivering'
+DELIVERED = 'delivered'
+FAILED = 'failed'
+
+# send(url, headers, event) -> (ok, status code or None, message)
+Sender = Callable[[str, Dict[str, str], dict], Tuple[bool, Optional[int], str]]
+
+
+def post_json(url: str, headers: Dict[str, str], event: dict, timeout: float = 10.0):
+    """Default sender: POST the event as JSON."""
+    try:
+        resp = requests.post(url, data=json.dumps(event).encode('utf-8'), headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        return False, None, f'Webhook error: {e}'
+    if 200 <= resp.status_code < 300:
+        return True, resp.status_code, f'Webhook status {resp.status_code}'
+    return False, resp.status_code, f'Webhook HTTP error {resp.status_code}: {resp.text[:500]}'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class WebhookOutbox:
+    """SQLite outbox plus the dispatcher thread that drains it."""
+
+    def __init__(self, db_path: str, send: Sender = post_json, workers: int = 2, max_attempts: int = 8,
+                 base_delay: float = 5.0, max_delay: float = 600.0, lease: float = 60.0,
+                 keep_delivered: int = 1000):
+        self.db_path = db_path
+        self.send = send
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        # Retry n waits about base_delay * 2**(n-1) seconds, capped at max_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # A delivery claimed longer ago than this is considered abandoned
+        self.lease = lease
+        self.keep_delivered = keep_delivered
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self.init_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def init_database(self) -> None:
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_outbox (
+                    id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_until REAL,
+                    last_status INTEGER,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    delivered_at TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_attempts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    delivery_id TEXT NOT NULL,
+                    attempt INTEGER NOT NULL,
+                    started_at TEXT NOT NULL,
+                    ms REAL NOT NULL,
+                    ok INTEGER NOT NULL,
+                    status_code INTEGER,
+                    message TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due ON webhook_outbox(status, next_attempt_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_webhook_attempts_delivery ON webhook_attempts(delivery_id)')
+
+    def enqueue(self, url: str, event: dict) -> str:
+        """Commit an event for delivery to url; returns the delivery id."""
+        delivery_id = uuid.uuid4().hex
+        with self.get_connection() as conn:
+            conn.execute('INSERT INTO webhook_outbox (id, url, event, status, next_attempt_at, created_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?)',
+                         (delivery_id, url, json.dumps(event), PENDING, time.time(), _now()))
+        self._wake.set()
+        return delivery_id
+
+    def retry(self, delivery_id: str) -> bool:
+        """Put a failed delivery back in the queue with a fresh attempt budget."""
+        with self.get_connection() as conn:
+            updated = conn.execute('UPDATE webhook_outbox SET status = ?, attempts = 0, next_attempt_at = ? '
+                                   'WHERE id = ? AND status = ?',
+                                   (PENDING, time.time(), delivery_id, FAILED)).rowcount
+        self._wake.set()
+        return bool(updated)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='webhook')
+            self._thread = threading.Thread(target=self._dispatch_loop, name='webhook-dispatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def deliveries(self, status: Optional[str] = None, limit: int = 50) -> List[dict]:
+        """Most recent deliveries (optionally of one status), each with its attempts."""
+        with self.get_connection() as conn:
+            if status:
+                rows = conn.execute('SELECT * FROM webhook_outbox WHERE status = ? ORDER BY created_at DESC LIMIT ?',
+                                    (status, limit)).fetchall()
+            else:
+                rows = conn.execute('SELECT * FROM webhook_outbox ORDER BY created_at DESC LIMIT ?',
+                                    (limit,)).fetchall()
+            attempts: Dict[str, list] = {}
+            ids = [row['id'] for row in rows]
+            if ids:
+                marks = ','.join('?' * len(ids))
+                for a in conn.execute(f'SELECT * FROM webhook_attempts WHERE delivery_id IN ({marks}) '
+                                      'ORDER BY attempt', ids).fetchall():
+                    attempts.setdefault(a['delivery_id'], []).append({
+                        'attempt': a['attempt'], 'started_at': a['started_at'], 'ms': a['ms'],
+                        'ok': bool(a['ok']), 'status_code': a['status_code'], 'message': a['message']})
+        return [{'id': row['id'],
+                 'url': row['url'],
+                 'status': row['status'],
+                 'attempts': row['attempts'],
+                 'next_attempt_at': (datetime.fromtimestamp(row['next_attempt_at'], timezone.utc).isoformat()
+                                     if row['status'] == PENDING else None),
+                 'last_status': row['last_status'],
+                 'last_error': row['last_error'],
+                 'created_at': row['created_at'],
+                 'delivered_at': row['delivered_at'],
+                 'event': json.loads(row['event']),
+                 'history': attempts.get(row['id'], [])} for row in rows]
+
+    def stats(self) -> dict:
+        with self.get_connection() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status').fetchall())
+            latency = conn.execute('SELECT COUNT(*), AVG(ms), MAX(ms) FROM webhook_attempts').fetchone()
+        return {'by_status': counts, 'in_flight': self._in_flight, 'workers': self.workers,
+                'attempts': latency[0], 'avg_ms': round(latency[1] or 0.0, 2), 'max_ms': round(latency[2] or 0.0, 2)}
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+                for n, row in enumerate(claimed):
+                    try:
+                        self._executor.submit(self._deliver, row)
+                    except RuntimeError:
+                        # Executor shut down (stop() or interpreter exit): hand the rest back
+                        self._unclaim(claimed[n:])
+                        return
+                wait = 0.0 if claimed else self._seconds_until_due()
+            except Exception as e:
+                print(f"⚠️ Webhook dispatcher error: {e}")
+                wait = 5.0
+            if wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+
+    def _claim(self) -> list:
+        """Lease due deliveries, up to the free worker slots."""
+        with self._lock:
+            room = self.workers - self._in_flight
+        if room <= 0:
+            return []
+        now = time.time()
+        with self.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('SELECT * FROM webhook_outbox WHERE (status = ? AND next_attempt_at <= ?) '
+                                'OR (status = ? AND claimed_until <= ?) ORDER BY next_attempt_at LIMIT ?',
+                                (PENDING, now, DELIVERING, now, room)).fetchall()
+            conn.executemany('UPDATE webhook_outbox SET status = ?, claimed_until = ? WHERE id = ?',
+                             [(DELIVERING, now + self.lease, row['id']) for row in rows])
+        with self._lock:
+            self._in_flight += len(rows)
+        return rows
+
+    def _unclaim(self, rows: list) -> None:
+        with self.get_connection() as conn:
+            conn.executemany('UPDATE webhook_outbox SET status = ?, claimed_until = NULL WHERE id = ?',
+                             [(PENDING, row['id']) for row in rows])
+        with self._lock:
+            self._in_flight -= len(rows)
+
+    def _seconds_until_due(self) -> float:
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE claimed_until END) '
+                               'FROM webhook_outbox WHERE status IN (?, ?)',
+                               (PENDING, PENDING, DELIVERING)).fetchone()
+        if row[0] is None:
+            # Nothing queued; enqueue() wakes the loop
+            return 60.0
+        return min(60.0, max(0.05, row[0] - time.time()))
+
+    def _deliver(self, row) -> None:
+        try:
+            headers = {'Content-Type': 'application/json'}
+            token = os.getenv('AUTON_PR_WEBHOOK_TOKEN')
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+            attempt = row['attempts'] + 1
+            started_at = _now()
+            started = time.perf_counter()
+            try:
+                ok, status_code, message = self.send(row['url'], headers, json.loads(row['event']))
+            except Exception as e:
+                ok, status_code, message = False, None, f'Webhook error: {e}'
+            ms = (time.perf_counter() - started) * 1000
+            # Client errors other than timeouts/throttling will not succeed on retry
+            permanent = status_code is not None and 400 <= status_code < 500 and status_code not in (408, 429)
+            if ok:
+                status, next_at = DELIVERED, time.time()
+            elif permanent or attempt >= self.max_attempts:
+                status, next_at = FAILED, time.time()
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                status, next_at = PENDING, time.time() + random.uniform(delay / 2, delay)
+            with self.get_connection() as conn:
+                conn.execute('INSERT INTO webhook_attempts (delivery_id, attempt, started_at, ms, ok, status_code, message) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (row['id'], attempt, started_at, round(ms, 2), int(ok), status_code, message[:1000]))
+                conn.execute('UPDATE webhook_outbox SET status = ?, attempts = ?, next_attempt_at = ?, '
+                             'claimed_until = NULL, last_status = ?, last_error = ?, delivered_at = ? WHERE id = ?',
+                             (status, attempt, next_at, status_code, None if ok else message[:1000],
+                              _now() if ok else None, row['id']))
+            if ok:
+                self._prune()
+        except Exception as e:
+            print(f"⚠️ Webhook delivery {row['id']} could not be recorded: {e}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._wake.set()
+
+    def _prune(self) -> None:
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM webhook_outbox WHERE status = ? AND id NOT IN '
+                         '(SELECT id FROM webhook_outbox WHERE status = ? ORDER BY created_at DESC LIMIT ?)',
+                         (DELIVERED, DELIVERED, self.keep_delivered))
+            conn.execute('DELETE FROM webhook_attempts WHERE delivery_id NOT IN (SELECT id FROM webhook_outbox)')
@@ -0,0 +1,233 @@
+"""Reusable git worktrees for PR submissions.
+
+Instead of `git worktree add` into a fresh temp dir (a full checkout) and
+`git worktree remove` on every submission, a fixed number of worktree slots
+live under one directory and are reset in place to the commit a submission
+starts from, so only files that differ are rewritten. Fetches from origin
+are single-flight and rate-limited, and every phase is timed.
+
+Slots are claimed with a per-slot file lock (flock, or msvcrt on Windows)
+and steps that change shared repository state (fetch, branch creation,
+worktree administration) run under a RepoLock, so several server processes
+can share one pool directory.
+"""
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.repo_lock import RepoLock
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock the slot file's first byte with msvcrt instead
+    fcntl = None
+    import msvcrt
+
+Runner = Callable[..., Tuple[bool, str]]
+
+
+class WorktreePool:
+    """Fixed-size pool of detached worktrees of the repo at repo_root.
+
+    run(args, cwd) runs git with an argument list and returns (ok, output).
+    Slots are created lazily and survive restarts; a slot that cannot be
+    reset is removed and re-created. lock defaults to a RepoLock in
+    root_dir; pass the one other repo-mutating code uses to share the queue.
+    """
+
+    def __init__(self, repo_root: str, root_dir: str, run: Runner, size: int = 2,
+                 fetch_interval: float = 30.0, lock: Optional[RepoLock] = None,
+                 lock_timeout: Optional[float] = 120.0):
+        self.repo_root = repo_root
+        self.root_dir = root_dir
+        self.size = max(1, size)
+        # Minimum seconds between two fetches from origin (by any process); 0 always fetches
+        self.fetch_interval = fetch_interval
+        self.lock = lock or RepoLock(os.path.join(root_dir, '.locks'))
+        self.lock_timeout = lock_timeout
+        self._run = run
+        self._slots = [os.path.join(root_dir, f'wt-{n}') for n in range(self.size)]
+        self._in_use = 0
+        self._fetch_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pruned = False
+        self._fetch_stamp = os.path.join(root_dir, '.last-fetch')
+        self._counters = {'acquired': 0, 'created': 0, 'reused': 0, 'recreated': 0,
+                          'fetches': 0, 'fetches_skipped': 0, 'fetch_failures': 0, 'waits': 0}
+        # phase -> {'count', 'total_ms', 'max_ms', 'last_ms'}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def fetch(self, force: bool = False) -> Tuple[bool, str]:
+        """Fetch origin unless a fetch succeeded less than fetch_interval ago.
+
+        Concurrent callers, in this process or another one, wait for the
+        fetch in flight instead of starting their own.
+        """
+        with self._fetch_lock:
+            age = self._fetch_age()
+            if not force and age is not None and age < self.fetch_interval:
+                self._count('fetches_skipped')
+                return True, f'skipped: fetched {age:.1f}s ago'
+            with self.lock.hold(self.lock_timeout):
+                # Another process may have fetched while we queued for the lock
+                age = self._fetch_age()
+                if not force and age is not None and age < self.fetch_interval:
+                    self._count('fetches_skipped')
+                    return True, f'skipped: fetched {age:.1f}s ago'
+                with self._timed('fetch'):
+                    ok, out = self._run(['fetch', 'origin', '--prune', '--no-tags'], self.repo_root)
+                if ok:
+                    os.makedirs(self.root_dir, exist_ok=True)
+                    with open(self._fetch_stamp, 'w', encoding='utf-8') as f:
+                        f.write(out)
+            self._count('fetches' if ok else 'fetch_failures')
+            return ok, out
+
+    @contextmanager
+    def checkout(self, branch: str, start_point: str, timeout: Optional[float] = None,
+                 steps: Optional[List[dict]] = None) -> Iterator[str]:
+        """Yield a worktree path with `branch` reset to start_point and checked out.
+
+        Blocks for a free slot (up to timeout seconds, RuntimeError after).
+        On exit the slot's HEAD is detached so the branch can be checked out
+        by the next slot that needs it. Phase timings are appended to steps.
+        """
+        waited = time.perf_counter()
+        path, slot_fd = self._claim_slot(timeout)
+        self._record('acquire', (time.perf_counter() - waited) * 1000, steps)
+        self._count('acquired')
+        try:
+            started = time.perf_counter()
+            ok, out = self._reset(path, branch, start_point)
+            self._record('reset', (time.perf_counter() - started) * 1000, steps)
+            if not ok:
+                raise RuntimeError(out)
+            yield path
+        finally:
+            started = time.perf_counter()
+            self._run(['checkout', '--detach', '--quiet'], path)
+            self._record('release', (time.perf_counter() - started) * 1000, steps)
+            with self._stats_lock:
+                self._in_use -= 1
+            os.close(slot_fd)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = dict(self._counters)
+            data['timings'] = {phase: {k: round(v, 2) for k, v in t.items()}
+                               for phase, t in self._timings.items()}
+        age = self._fetch_age()
+        data.update({
+            'size': self.size,
+            # Slots busy in this process; other processes hold their own
+            'in_use': self._in_use,
+            'root_dir': self.root_dir,
+            'fetch_interval': self.fetch_interval,
+            'last_fetch_age_s': round(age, 1) if age is not None else None,
+            'lock': self.lock.stats(),
+        })
+        return data
+
+    def _claim_slot(self, timeout: Optional[float]) -> Tuple[str, int]:
+        """Flock a free slot's lock file; lower slots first so warm checkouts are reused."""
+        os.makedirs(self.root_dir, exist_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.01
+        waited = False
+        while True:
+            for path in self._slots:
+                fd = os.open(f'{path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+                if not _try_lock(fd):
+                    os.close(fd)
+                    continue
+                with self._stats_lock:
+                    self._in_use += 1
+                return path, fd
+            if not waited:
+                waited = True
+                self._count('waits')
+            if deadline is not None and time.monotonic() >= deadline:
+                raise RuntimeError(f'no free worktree after {timeout}s (pool size {self.size})')
+            time.sleep(delay)
+            delay = min(0.1, delay * 2)
+
+    def _reset(self, path: str, branch: str, start_point: str) -> Tuple[bool, str]:
+        if self._is_worktree(path):
+            # Rewriting files only touches this slot, so it runs outside the repo lock
+            ok, out = self._run(['checkout', '--force', '--detach', start_point], path)
+            if ok:
+                # Drop untracked leftovers from a previous (failed) submission
+                ok, out = self._run(['clean', '-ffdq'], path)
+            if ok:
+                with self.lock.hold(self.lock_timeout):
+                    ok, out = self._run(['checkout', '-B', branch], path)
+            if ok:
+                self._count('reused')
+                return True, out
+            self._count('recreated')
+            with self.lock.hold(self.lock_timeout):
+                self._run(['worktree', 'remove', '--force', path], self.repo_root)
+        return self._create(path, branch, start_point)
+
+    def _create(self, path: str, branch: str, start_point: str) -> Tuple[bool, str]:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(self.root_dir, exist_ok=True)
+        with self.lock.hold(self.lock_timeout):
+            if not self._pruned:
+                # Forget slots registered by a previous run whose directories are gone
+                self._run(['worktree', 'prune'], self.repo_root)
+                self._pruned = True
+            ok, out = self._run(['worktree', 'add', '--force', '-B', branch, path, start_point], self.repo_root)
+        if ok:
+            self._count('created')
+        return ok, out
+
+    def _fetch_age(self) -> Optional[float]:
+        """Seconds since the last successful fetch by any process sharing root_dir."""
+        try:
+            return max(0.0, time.time() - os.path.getmtime(self._fetch_stamp))
+        except OSError:
+            return None
+
+    def _is_worktree(self, path: str) -> bool:
+        if not os.path.exists(os.path.join(path, '.git')):
+            return False
+        ok, out = self._run(['rev-parse', '--is-inside-work-tree'], path)
+        return ok and out.strip() == 'true'
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._counters[name] += 1
+
+    @contextmanager
+    def _timed(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(phase, (time.perf_counter() - started) * 1000)
+
+    def _record(self, phase: str, ms: float, steps: Optional[List[dict]] = None) -> None:
+        with self._stats_lock:
+            t = self._timings.setdefault(phase, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+            t['count'] += 1
+            t['total_ms'] += ms
+            t['max_ms'] = max(t['max_ms'], ms)
+            t['last_ms'] = ms
+        if steps is not None:
+            steps.append({'phase': phase, 'ms': round(ms, 2)})
+
+
+def _try_lock(fd: int) -> bool:
+    """Take an exclusive lock on fd without blocking; False if another holder has it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
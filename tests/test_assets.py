@@ -0,0 +1,42 @@
+"""Uploaded icons linked through asset_url() must be served by the static route."""
+import io
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app pulls in the dashboard's connector modules; skip where they are not deployed
+app_module = pytest.importorskip('app')
+from services.assets import IMMUTABLE, AssetManifest  # noqa: E402
+from services.icon_store import IconStore  # noqa: E402
+
+
+def _png(width: int = 256, height: int = 256) -> bytes:
+    """An RGB PNG with varied pixels, large enough that the downscaled variant is smaller."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    rows = b''.join(b'\x00' + bytes((x * 7 + y * 13) % 256 for x in range(width * 3)) for y in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def test_uploaded_icon_asset_url_is_served(tmp_path, monkeypatch):
+    static_dir = tmp_path / 'static'
+    store = IconStore(str(static_dir / 'icons'))
+    manifest = store.save(io.BytesIO(_png()), 'logo.png')
+    assets = AssetManifest(str(static_dir), f'/{app_module.APP_NAME}/static', exclude=('icons', 'utilities'))
+    assets.build()
+    monkeypatch.setattr(app_module, '_static_assets', assets)
+
+    with app_module.app.test_request_context():
+        url = app_module.asset_url(manifest['url'])
+    assert url == f"/{app_module.APP_NAME}/{manifest['url']}"
+
+    response = app_module.app.test_client().get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.get_data() == (static_dir / 'icons' / manifest['filename']).read_bytes()